@@ -0,0 +1,248 @@
+# src/features/corpus_ingest.py
+# Raw text -> word counts -> trie, with the counting spread over a process pool.
+#
+#   cd src && python -m features.corpus_ingest --out words.txt corpus/*.txt
+#
+# writes a word,frequency file like docs/stopwordsFreq.txt; ingest() merges
+# the counts straight into a PrefixTrie instead.
+from __future__ import annotations
+import argparse
+import heapq
+import os
+import re
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+CHUNK_BYTES = 16 * 1024 * 1024      # bytes per map task
+BLOCK_BYTES = 4 * 1024 * 1024       # bytes counted at a time in approximate mode
+
+# The words are the cores the restore tokenizers look up in the trie
+# (features.tokenizer): runs of \w, as in a '*' token, which may be joined
+# by single hyphens, as in a Glob+ token. Text is decoded as UTF-8, so
+# "café" and "naïve" stay whole. An apostrophe ends a word ("don't" ->
+# "don", "t"), because neither core class contains one, and so does a
+# hyphen that is not between two word characters.
+_WORD_RE = re.compile(r"\w+(?:-\w+)*")
+# Bytes that may continue a word when a range edge is moved (_read_range):
+# ASCII word characters, the hyphen and every byte of a multi-byte UTF-8
+# sequence, so an edge never falls inside a character or a word.
+_WORD_BYTES = (frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-")
+               | frozenset(range(0x80, 0x100)))
+
+Range = Tuple[str, int, int]        # (path, start, end) byte range of one map task
+
+
+def split_ranges(paths: Sequence[str], chunk_bytes: int = CHUNK_BYTES) -> List[Range]:
+    """Cut every file into byte ranges of about `chunk_bytes` (see _read_range for the edges)."""
+    ranges: List[Range] = []
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, size, chunk_bytes):
+            ranges.append((path, start, min(start + chunk_bytes, size)))
+    return ranges
+
+
+def _read_range(path: str, start: int, end: int) -> bytes:
+    """
+    The bytes of [start, end), moved to token boundaries: a word cut by
+    `start` belongs to the previous range and is dropped, a word cut by
+    `end` is read to its end. Every word is thus counted exactly once.
+    """
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            data = f.read(end - start + 1)
+            if data[0] in _WORD_BYTES:
+                i = 1
+                while i < len(data) and data[i] in _WORD_BYTES:
+                    i += 1
+                data = data[i:]
+            else:
+                data = data[1:]
+        else:
+            data = f.read(end - start)
+        if data and data[-1] in _WORD_BYTES:
+            tail = bytearray()
+            while True:
+                b = f.read(1)
+                if not b or b[0] not in _WORD_BYTES:
+                    break
+                tail += b
+            data += tail
+    return data
+
+
+def _words(data: bytes) -> List[str]:
+    # a range ends on ASCII bytes, so only invalid input is replaced (U+FFFD splits words)
+    return _WORD_RE.findall(data.decode("utf-8", errors="replace").lower())
+
+
+class SpaceSaving:
+    """
+    Bounded-memory heavy-hitter counts (Space-Saving, kept as a mergeable
+    summary). At most `capacity` words are tracked; `floor` bounds the true
+    count of any word not tracked, and a tracked word's estimate is at most
+    error(word) above its true count. Counts are added a block at a time
+    (an exact Counter of the block), and summaries of different byte ranges
+    merge with the same guarantees, so the pool can reduce them like
+    Counters.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.floor = 0
+
+    def add(self, block: Dict[str, int]) -> None:
+        """Add the exact counts of one block of text."""
+        f1 = self.floor
+        est, err = self.counts, self.errors
+        for w, c in block.items():
+            n = est.get(w)
+            if n is None:
+                # an untracked word may have occurred up to `floor` times
+                est[w] = f1 + c
+                err[w] = f1
+            else:
+                est[w] = n + c
+        self._trim(est, err, f1)
+
+    def merge(self, other: "SpaceSaving") -> None:
+        c1, e1, f1 = self.counts, self.errors, self.floor
+        c2, e2, f2 = other.counts, other.errors, other.floor
+        est: Dict[str, int] = {}
+        err: Dict[str, int] = {}
+        for w in c1.keys() | c2.keys():
+            est[w] = c1.get(w, f1) + c2.get(w, f2)
+            err[w] = (e1[w] if w in c1 else f1) + (e2[w] if w in c2 else f2)
+        self._trim(est, err, f1 + f2)
+
+    def _trim(self, est: Dict[str, int], err: Dict[str, int], floor: int) -> None:
+        if len(est) > self.capacity:
+            keep = heapq.nlargest(self.capacity + 1, est.items(), key=lambda x: x[1])
+            # the dropped words counted at most as often as the first one dropped
+            floor = max(floor, keep.pop()[1])
+            est = dict(keep)
+            err = {w: err[w] for w in est}
+        self.counts, self.errors, self.floor = est, err, floor
+
+
+# --- map tasks (run in the pool's workers) ---------------------------------
+
+def _count_exact(task: Range) -> Tuple[Dict[str, int], int, int]:
+    data = _read_range(*task)
+    words = _words(data)
+    return dict(Counter(words)), len(words), len(data)
+
+
+def _count_approx(task: Tuple[str, int, int, int]) -> Tuple[SpaceSaving, int, int]:
+    path, start, end, capacity = task
+    summary = SpaceSaving(capacity)
+    tokens = nbytes = 0
+    for s in range(start, end, BLOCK_BYTES):
+        data = _read_range(path, s, min(s + BLOCK_BYTES, end))
+        words = _words(data)
+        summary.add(Counter(words))
+        tokens += len(words)
+        nbytes += len(data)
+    return summary, tokens, nbytes
+
+
+def count_words(paths: Sequence[str], workers: Optional[int] = None,
+                capacity: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES
+                ) -> Tuple[Dict[str, int], dict]:
+    """
+    Count the words of raw text files: the files are cut into byte ranges,
+    each range is counted in a worker process and the partial counts are
+    reduced as they arrive. With `capacity`, each range keeps a SpaceSaving
+    summary instead of an exact Counter, so memory stays bounded by the
+    number of words kept; the result then holds the `capacity` most
+    frequent words with estimated (over-)counts.
+    Returns (word -> count, stats).
+    """
+    t0 = time.perf_counter()
+    ranges = split_ranges(paths, chunk_bytes)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(ranges) or 1))
+    if capacity is None:
+        fn, tasks = _count_exact, ranges
+        total = Counter()
+    else:
+        fn, tasks = _count_approx, [(p, s, e, capacity) for p, s, e in ranges]
+        total = SpaceSaving(capacity)
+    tokens = nbytes = 0
+
+    def _reduce(results: Iterable) -> None:
+        nonlocal tokens, nbytes
+        for part, n, b in results:
+            if capacity is None:
+                total.update(part)
+            else:
+                total.merge(part)
+            tokens += n
+            nbytes += b
+
+    if workers == 1:
+        _reduce(map(fn, tasks))
+    else:
+        with Pool(workers) as pool:
+            _reduce(pool.imap_unordered(fn, tasks))
+
+    counts = dict(total) if capacity is None else total.counts
+    stats = {"files": len(paths), "ranges": len(ranges), "workers": workers,
+             "bytes": nbytes, "tokens": tokens, "distinct": len(counts),
+             "seconds": time.perf_counter() - t0}
+    if capacity is not None:
+        stats["capacity"] = capacity
+        stats["max_error"] = max(total.errors.values(), default=0)
+    return counts, stats
+
+
+def ingest(trie, paths: Sequence[str], workers: Optional[int] = None,
+           capacity: Optional[int] = None, min_count: int = 1) -> dict:
+    """
+    Count raw text files with count_words and add the words seen at least
+    `min_count` times to `trie` in one insert_many batch (frequencies add
+    up, as in a merge). Returns count_words' stats plus 'added'/'updated'.
+    """
+    counts, stats = count_words(paths, workers, capacity)
+    t0 = time.perf_counter()
+    added, updated = trie.insert_many((w, c) for w, c in counts.items() if c >= min_count)
+    stats.update(added=added, updated=updated, insert_seconds=time.perf_counter() - t0)
+    return stats
+
+
+def describe(stats: dict) -> str:
+    mib = stats["bytes"] / (1024 * 1024)
+    line = (f"{stats['files']} file(s), {mib:.1f} MiB in {stats['ranges']} range(s) on "
+            f"{stats['workers']} worker(s): {stats['tokens']:,} tokens, {stats['distinct']:,} "
+            f"distinct, {stats['seconds']:.1f} s ({mib / max(stats['seconds'], 1e-9):.1f} MiB/s)")
+    if "capacity" in stats:
+        line += f"; approximate (top {stats['capacity']:,}, counts at most {stats['max_error']:,} high)"
+    return line
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Count the words of raw text files into a word,frequency file.")
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--out", required=True, help="word,frequency file to write (most frequent first)")
+    ap.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    ap.add_argument("--capacity", type=int, help="keep only this many words (bounded-memory approximate mode)")
+    ap.add_argument("--min-count", type=int, default=1)
+    ap.add_argument("--chunk-mib", type=int, default=CHUNK_BYTES // (1024 * 1024))
+    args = ap.parse_args(argv)
+
+    counts, stats = count_words(args.files, args.workers, args.capacity,
+                                args.chunk_mib * 1024 * 1024)
+    with open(args.out, "w", encoding="utf-8") as f:
+        for w, c in sorted(counts.items(), key=lambda x: (-x[1], x[0])):
+            if c >= args.min_count:
+                f.write(f"{w},{c}\n")
+    print(describe(stats), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
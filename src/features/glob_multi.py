@@ -0,0 +1,138 @@
+# src/features/glob_multi.py
+# Many Glob+ patterns matched in one walk of a PrefixTrie (see features/pattern.glob_match_many).
+from __future__ import annotations
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+
+class PatternAutomaton:
+    """
+    A set of parsed Glob+ patterns as one automaton.
+
+    The patterns are first merged into a token trie, so 'th*', 'th?s' and
+    'the[mn]' share the states for 't' and 'h'. A token-trie node reached
+    through a STAR edge loops on any character, and STAR edges are also
+    followed without consuming one. The live set of token-trie nodes is
+    determinised lazily: each distinct set gets an integer state and its
+    per-character transitions are memoised, so walking a trie costs one
+    dict lookup per edge no matter how many patterns are live.
+    """
+    def __init__(self, patterns: List[list]):
+        # token trie: edges[t] = [(kind, payload, child)], loops[t], accepts[t] = pattern ids
+        self._edges: List[List[Tuple[str, object, int]]] = [[]]
+        self._loops: List[bool] = [False]
+        self._accepts: List[List[int]] = [[]]
+        for pid, tokens in enumerate(patterns):
+            t = 0
+            for kind, payload in tokens:
+                t = self._child(t, kind, payload)
+            self._accepts[t].append(pid)
+
+        # per token-trie node: its closure, the closures it moves to on a given
+        # char (LIT / SET edges) and on any char (ANY edges, or its own STAR loop)
+        n = len(self._edges)
+        self._close = [self._closure(t) for t in range(n)]
+        self._on_char: List[Dict[str, FrozenSet[int]]] = []
+        self._on_any: List[FrozenSet[int]] = []
+        for t in range(n):
+            on_char: Dict[str, set] = {}
+            on_any = set(self._close[t]) if self._loops[t] else set()
+            for kind, payload, child in self._edges[t]:
+                if kind == 'LIT':
+                    on_char.setdefault(payload, set()).update(self._close[child])
+                elif kind == 'SET':
+                    for ch in payload:
+                        on_char.setdefault(ch, set()).update(self._close[child])
+                elif kind == 'ANY':
+                    on_any.update(self._close[child])
+            self._on_char.append({ch: frozenset(ts) for ch, ts in on_char.items()})
+            self._on_any.append(frozenset(on_any))
+
+        # lazy DFA over sets of token-trie nodes; state 0 is dead
+        self._ids: Dict[FrozenSet[int], int] = {frozenset(): 0}
+        self._sets: List[FrozenSet[int]] = [frozenset()]
+        self.accepts: List[Tuple[int, ...]] = [()]
+        # literal chars that can leave a state, or None if any char might
+        self.literals: List[Optional[FrozenSet[str]]] = [frozenset()]
+        self.trans: List[Dict[str, int]] = [{}]
+        self.start = self._state(self._close[0])
+
+    def _child(self, t: int, kind: str, payload) -> int:
+        for k, p, child in self._edges[t]:
+            if k == kind and p == payload:
+                return child
+        child = len(self._edges)
+        self._edges.append([])
+        self._loops.append(kind == 'STAR')
+        self._accepts.append([])
+        self._edges[t].append((kind, payload, child))
+        return child
+
+    def _closure(self, t: int) -> FrozenSet[int]:
+        # a STAR may match zero characters
+        out = {t}
+        stack = [t]
+        while stack:
+            for kind, _, child in self._edges[stack.pop()]:
+                if kind == 'STAR' and child not in out:
+                    out.add(child)
+                    stack.append(child)
+        return frozenset(out)
+
+    def _state(self, ts: FrozenSet[int]) -> int:
+        sid = self._ids.get(ts)
+        if sid is not None:
+            return sid
+        sid = len(self._sets)
+        self._ids[ts] = sid
+        self._sets.append(ts)
+        self.accepts.append(tuple(p for t in ts for p in self._accepts[t]))
+        if any(self._on_any[t] for t in ts):
+            self.literals.append(None)
+        else:
+            self.literals.append(frozenset(ch for t in ts for ch in self._on_char[t]))
+        self.trans.append({})
+        return sid
+
+    def step(self, sid: int, ch: str) -> int:
+        """State after reading `ch` in state `sid` (0 once no pattern can match)."""
+        nxt = self.trans[sid].get(ch)
+        if nxt is None:
+            ts = self._sets[sid]
+            if len(ts) == 1:
+                (t,) = ts
+                hit = self._on_char[t].get(ch)
+                nts = self._on_any[t] | hit if hit else self._on_any[t]
+            else:
+                nts = frozenset().union(*[self._on_any[t] for t in ts],
+                                        *[self._on_char[t].get(ch, ()) for t in ts])
+            nxt = self._state(nts) if nts else 0
+            self.trans[sid][ch] = nxt
+        return nxt
+
+    def run(self, root, count: int) -> List[List[Tuple[str, int]]]:
+        """Walk the trie under `root` once; returns the (word, frequency) matches of each pattern."""
+        found: List[List[Tuple[str, int]]] = [[] for _ in range(count)]
+        accepts, literals, trans, step = self.accepts, self.literals, self.trans, self.step
+        stack = [(root, self.start, "")]
+        while stack:
+            node, sid, word = stack.pop()
+            if node.is_end:
+                for pid in accepts[sid]:
+                    found[pid].append((word, node.frequency))
+            children = node.children
+            lits = literals[sid]
+            if lits is None or len(lits) >= len(children):
+                edges = children.items()
+            else:
+                # fewer literal chars than children can continue: probe for them
+                edges = [(ch, children.get(ch)) for ch in lits]
+            moves = trans[sid]
+            for ch, child in edges:
+                if child is None:
+                    continue
+                nxt = moves.get(ch)
+                if nxt is None:
+                    nxt = step(sid, ch)
+                if nxt:
+                    stack.append((child, nxt, word + ch))
+        return found
@@ -0,0 +1,284 @@
+# src/features/glob_planner.py
+# Cost-based strategy choice for Glob+ queries (see features/pattern.glob_match).
+from __future__ import annotations
+import re
+import sys
+import weakref
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+# Rough per-unit costs (1 unit ~ 2us), calibrated on a 1M-word trie:
+DFS_COST = 3.0          # per word below the prefix node, per STAR (Python recursion)
+DFS_FIXED_COST = 0.5    # per word below the prefix node when the pattern has no STAR
+SCAN_COST = 0.05        # per candidate word checked by a C-level regex scan
+FIND_COST = 0.002       # per indexed character searched for a literal
+VERIFY_COST = 1.0       # per literal hit mapped back to its word and verified
+BUILD_COST = 2.5        # per word, to build the word index once per trie version
+WALK_TOKEN_COST = 20.0  # per pattern token, building glob_match_many's shared automaton lazily
+SAMPLE_SLICES = 16      # slices of the index text counted to estimate a literal's hits ...
+SAMPLE_CHARS = 4096     # ... of this many characters each
+
+
+class GlobShape:
+    """What a parsed Glob+ pattern requires of any matching word."""
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.stars = sum(1 for kind, _ in tokens if kind == 'STAR')
+        self.min_len = len(tokens) - self.stars
+        self.max_len: Optional[int] = None if self.stars else self.min_len
+        # maximal runs of literal tokens; the first one is the anchored prefix if at position 0
+        runs: List[str] = []
+        cur = ""
+        for kind, payload in tokens:
+            if kind == 'LIT':
+                cur += payload
+            else:
+                if cur:
+                    runs.append(cur)
+                cur = ""
+        if cur:
+            runs.append(cur)
+        self.literals = runs
+        self.prefix = ""
+        for kind, payload in tokens:
+            if kind != 'LIT':
+                break
+            self.prefix += payload
+
+    def regex(self) -> str:
+        parts = []
+        for kind, payload in self.tokens:
+            if kind == 'LIT':
+                parts.append(re.escape(payload))
+            elif kind == 'ANY':
+                parts.append('.')
+            elif kind == 'STAR':
+                parts.append('.*')
+            else:
+                parts.append('[' + ''.join(re.escape(c) for c in sorted(payload)) + ']' if payload else '(?!)')
+        return ''.join(parts)
+
+
+class WordIndex:
+    """
+    Flat view of every word for the scan strategies: all words joined by
+    newlines (for literal search), plus one newline-joined block per length.
+    """
+    def __init__(self, items: List[Tuple[str, int]]):
+        self.words = [w for w, _ in items]
+        self.freqs = [f for _, f in items]
+        self.text = "\n".join(self.words) + "\n"
+        self.starts = list(accumulate((len(w) + 1 for w in self.words), initial=0))
+        ids_by_len: Dict[int, List[int]] = {}
+        for i, w in enumerate(self.words):
+            ids_by_len.setdefault(len(w), []).append(i)
+        # no trailing newline, so '^...$' cannot match an empty line after the last word
+        self.by_len = {n: (ids, "\n".join(self.words[i] for i in ids))
+                       for n, ids in ids_by_len.items()}
+        # memory held on top of the trie (the words are copies, not the trie's keys)
+        self.nbytes = (sys.getsizeof(self.text) + sys.getsizeof(self.words) + sys.getsizeof(self.freqs)
+                       + sys.getsizeof(self.starts) + sum(map(sys.getsizeof, self.words))
+                       + sum(sys.getsizeof(ids) + sys.getsizeof(block) for ids, block in self.by_len.values()))
+        self._hits: Dict[str, float] = {}
+
+    def estimate_hits(self, literal: str) -> float:
+        """Occurrences of `literal` in the index text, extrapolated from evenly spaced samples."""
+        est = self._hits.get(literal)
+        if est is None:
+            text = self.text
+            sample = SAMPLE_SLICES * SAMPLE_CHARS
+            if len(text) <= sample:
+                est = float(text.count(literal))
+            else:
+                step = len(text) // SAMPLE_SLICES
+                found = sum(text.count(literal, i * step, i * step + SAMPLE_CHARS)
+                            for i in range(SAMPLE_SLICES))
+                est = found * len(text) / sample
+            self._hits[literal] = est
+        return est
+
+    def count_in_lengths(self, lo: int, hi: Optional[int]) -> int:
+        return sum(len(ids) for n, (ids, _) in self.by_len.items() if n >= lo and (hi is None or n <= hi))
+
+    def length_scan(self, shape: GlobShape) -> List[Tuple[str, int]]:
+        rx = re.compile(rf"^(?:{shape.regex()})$", re.M)
+        out = []
+        for n, (ids, block) in self.by_len.items():
+            if n < shape.min_len or (shape.max_len is not None and n > shape.max_len):
+                continue
+            for m in rx.finditer(block):
+                i = ids[m.start() // (n + 1)]
+                out.append((self.words[i], self.freqs[i]))
+        return out
+
+    def substring_scan(self, shape: GlobShape, literal: str) -> List[Tuple[str, int]]:
+        rx = re.compile(shape.regex())
+        text, starts, find = self.text, self.starts, self.text.find
+        out = []
+        last = -1
+        pos = find(literal)
+        while pos >= 0:
+            i = bisect_right(starts, pos) - 1
+            if i != last:
+                last = i
+                w = self.words[i]
+                if shape.min_len <= len(w) and rx.fullmatch(w):
+                    out.append((w, self.freqs[i]))
+            # continue after this word's line; later hits in it add nothing
+            pos = find(literal, starts[i] + len(self.words[i]) + 1)
+        return out
+
+
+class _TrieState:
+    """Per-trie planner data, rebuilt when the trie's version moves."""
+    def __init__(self, version: int):
+        self.version = version
+        self.index: Optional[WordIndex] = None
+        self.dfs_spent = 0.0        # estimated DFS cost of the queries planned at this version
+
+
+_states: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _state(trie) -> _TrieState:
+    st = _states.get(trie)
+    if st is None or st.version != trie.version:
+        st = _TrieState(trie.version)
+        _states[trie] = st
+    return st
+
+
+def index_bytes(trie) -> int:
+    """Memory held by the word index of `trie`'s current version (0 if none is built)."""
+    st = _states.get(trie)
+    if st is None or st.index is None or st.version != trie.version:
+        return 0
+    return st.index.nbytes
+
+
+def subtree_count(trie, node) -> int:
+    """Words below `node` (an aggregate kept on every node)."""
+    return node.count
+
+
+def word_index(trie) -> WordIndex:
+    st = _state(trie)
+    if st.index is None:
+        items: List[Tuple[str, int]] = []
+        stack = [(trie.root, "")]
+        while stack:
+            node, word = stack.pop()
+            if node.is_end:
+                items.append((word, node.frequency))
+            for ch, child in node.children.items():
+                stack.append((child, word + ch))
+        st.index = WordIndex(items)
+    return st.index
+
+
+class GlobPlan:
+    def __init__(self, shape: GlobShape, strategy: str, costs: Dict[str, float],
+                 prefix_words: int, literal: Optional[str], index_built: bool):
+        self.shape = shape
+        self.strategy = strategy        # 'empty' | 'dfs' | 'length_scan' | 'substring'
+        self.costs = costs
+        self.prefix_words = prefix_words
+        self.literal = literal
+        self.index_built = index_built
+
+    def explain(self) -> str:
+        s = self.shape
+        length = f"= {s.min_len}" if s.max_len is not None else f">= {s.min_len}"
+        lines = [
+            "tokens:    " + " ".join(_token_label(t) for t in s.tokens),
+            f"prefix:    {s.prefix!r} ({self.prefix_words} word(s) below it)",
+            f"literals:  {', '.join(repr(x) for x in s.literals) or '(none)'}",
+            f"length:    {length}",
+            "costs:     " + (", ".join(f"{k}={v:,.0f}" for k, v in self.costs.items()) or "-")
+            + ("" if self.index_built else "  (scans include building the word index)"),
+        ]
+        how = {
+            "empty": "no word has the literal prefix; nothing to do",
+            "dfs": "forward DFS from the prefix node",
+            "length_scan": "regex scan of the words with an allowed length",
+            "substring": f"find {self.literal!r} in the word index, verify each hit",
+        }[self.strategy]
+        lines.append(f"plan:      {self.strategy} — {how}")
+        return "\n".join(lines)
+
+
+def _token_label(tok) -> str:
+    kind, payload = tok
+    if kind == 'LIT':
+        return repr(payload)
+    if kind == 'SET':
+        return "[" + "".join(sorted(payload)) + "]"
+    return {'ANY': '?', 'STAR': '*'}[kind]
+
+
+def plan_glob(trie, tokens, record: bool = True) -> GlobPlan:
+    """
+    Pick the cheapest strategy for `tokens` on a PrefixTrie.
+
+    Every edit starts a new version and drops the word index, so a scan
+    that would have to build it is charged the build cost, less the DFS
+    cost already spent at this version (rent or buy): a read-mostly
+    session builds the index once repeated DFS work has paid for it, and a
+    session that edits between queries never pays more than about twice
+    what DFS alone would have cost. `record` (off for explain) adds a
+    chosen DFS to that tally.
+    """
+    shape = GlobShape(tokens)
+    node = trie.root
+    for ch in shape.prefix:
+        node = node.children.get(ch)
+        if node is None:
+            return GlobPlan(shape, "empty", {}, 0, None, False)
+    below = subtree_count(trie, node)
+
+    costs: Dict[str, float] = {}
+    costs["dfs"] = below * (DFS_COST * shape.stars if shape.stars else DFS_FIXED_COST)
+    st = _state(trie)
+    built = st.index is not None
+    # an anchored prefix already narrows DFS to one subtree; only a large one is worth a scan
+    if shape.stars or not shape.prefix:
+        total = subtree_count(trie, trie.root)
+        setup = 0.0 if built else max(0.0, BUILD_COST * total - st.dfs_spent)
+        if built:
+            in_range = st.index.count_in_lengths(shape.min_len, shape.max_len)
+        else:
+            in_range = total
+        costs["length_scan"] = setup + in_range * SCAN_COST * (1 + shape.stars)
+        inner = [lit for lit in shape.literals if lit != shape.prefix or not shape.prefix]
+        literal = max(inner, key=len) if inner else None
+        if literal and len(literal) >= 2:
+            chars = len(st.index.text) if built else total * 8
+            hits = st.index.estimate_hits(literal) if built else total * 0.05
+            costs["substring"] = setup + chars * FIND_COST + hits * VERIFY_COST
+    else:
+        literal = None
+
+    strategy = min(costs, key=costs.get)
+    if record and strategy == "dfs":
+        st.dfs_spent += costs["dfs"]
+    return GlobPlan(shape, strategy, costs, below, literal, built)
+
+
+def shares_walk(plan: GlobPlan) -> bool:
+    """
+    Whether a 'dfs' pattern is worth adding to glob_match_many's shared
+    automaton walk: only a STAR re-walks a whole subtree, and only a large
+    one repays building the automaton's states.
+    """
+    return plan.shape.stars > 0 and plan.costs["dfs"] > WALK_TOKEN_COST * len(plan.shape.tokens)
+
+
+def run_plan(trie, plan: GlobPlan) -> List[Tuple[str, int]]:
+    """Run an index strategy (the caller runs 'dfs' itself)."""
+    if plan.strategy == "empty":
+        return []
+    index = word_index(trie)
+    if plan.strategy == "length_scan":
+        return index.length_scan(plan.shape)
+    return index.substring_scan(plan.shape, plan.literal)
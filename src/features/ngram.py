@@ -0,0 +1,194 @@
+# src/features/ngram.py
+# Compact bigram/trigram store + context-aware (beam) restoration.
+from __future__ import annotations
+import math
+import re
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+_MASK64 = (1 << 64) - 1
+_MIX = 0x9E3779B97F4A7C15          # 64-bit golden-ratio multiplier
+_BOUNDARY = "<s>"                  # sentence boundary pseudo-word
+_WORD_RE = re.compile(r"[A-Za-z0-9']+|[.!?]")
+_MAGIC = b"NGM1"
+
+BACKOFF = 0.4           # "stupid backoff" penalty per dropped order
+UNIGRAM_WEIGHT = 1.0    # weight of the trie frequency prior vs. the n-gram score
+
+
+def _hid(word: str) -> int:
+    """32-bit hashed id of a (lowercased) word."""
+    return zlib.crc32(word.encode("utf-8"))
+
+
+def _key2(a: int, b: int) -> int:
+    return (a << 32) | b
+
+
+def _key3(a: int, b: int, c: int) -> int:
+    return ((((a << 32) | b) * _MIX) ^ c) & _MASK64
+
+
+def tokenize_clean(text: str) -> List[str]:
+    """Lowercased words with '.', '!' and '?' turned into sentence boundaries."""
+    out: List[str] = []
+    for tok in _WORD_RE.findall(text):
+        out.append(_BOUNDARY if tok in ".!?" else tok.lower())
+    return out
+
+
+class _CountTable:
+    """Sorted 64-bit keys with parallel counts; lookups are a binary search."""
+    def __init__(self, keys: array | None = None, counts: array | None = None):
+        self.keys = keys if keys is not None else array("Q")
+        self.counts = counts if counts is not None else array("Q")
+
+    @classmethod
+    def from_counter(cls, counter: Counter) -> "_CountTable":
+        items = sorted(counter.items())
+        return cls(array("Q", (k for k, _ in items)), array("Q", (c for _, c in items)))
+
+    def get(self, key: int) -> int:
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.counts[i]
+        return 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class NGramModel:
+    """
+    Unigram/bigram/trigram counts built from clean text. Words are hashed to
+    32-bit ids and every order is stored as a sorted array of 64-bit keys with
+    a parallel count array (no per-word dicts once built).
+    """
+    def __init__(self):
+        self._tables = [_CountTable(), _CountTable(), _CountTable()]
+        self.total = 0       # number of unigram tokens seen
+
+    # --- building --------------------------------------------------------
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "NGramModel":
+        uni: Counter = Counter()
+        bi: Counter = Counter()
+        tri: Counter = Counter()
+        for text in texts:
+            ids = [_hid(_BOUNDARY)] + [_hid(w) for w in tokenize_clean(text)]
+            uni.update(ids)
+            for a, b in zip(ids, ids[1:]):
+                bi[_key2(a, b)] += 1
+            for a, b, c in zip(ids, ids[1:], ids[2:]):
+                tri[_key3(a, b, c)] += 1
+        model = cls()
+        model._tables = [_CountTable.from_counter(uni), _CountTable.from_counter(bi),
+                         _CountTable.from_counter(tri)]
+        model.total = sum(uni.values())
+        return model
+
+    @classmethod
+    def from_files(cls, paths: Sequence[str]) -> "NGramModel":
+        def _read():
+            for p in paths:
+                with open(p, "r", encoding="utf-8") as f:
+                    yield f.read()
+        return cls.from_texts(_read())
+
+    # --- persistence -----------------------------------------------------
+
+    def save(self, filepath: str) -> None:
+        with open(filepath, "wb") as f:
+            f.write(_MAGIC)
+            array("Q", [self.total] + [len(t) for t in self._tables]).tofile(f)
+            for t in self._tables:
+                t.keys.tofile(f)
+                t.counts.tofile(f)
+
+    @classmethod
+    def load(cls, filepath: str) -> "NGramModel":
+        model = cls()
+        with open(filepath, "rb") as f:
+            if f.read(4) != _MAGIC:
+                raise ValueError("Not an n-gram model file")
+            header = array("Q")
+            header.fromfile(f, 4)
+            model.total = header[0]
+            tables = []
+            for n in header[1:]:
+                keys, counts = array("Q"), array("Q")
+                keys.fromfile(f, n)
+                counts.fromfile(f, n)
+                tables.append(_CountTable(keys, counts))
+            model._tables = tables
+        return model
+
+    # --- scoring ---------------------------------------------------------
+
+    def sizes(self) -> Tuple[int, int, int]:
+        return tuple(len(t) for t in self._tables)
+
+    def logprob(self, prev2: str, prev1: str, word: str) -> float:
+        """log P(word | prev2 prev1) with stupid backoff down to add-one unigrams."""
+        uni, bi, tri = self._tables
+        a, b, c = _hid(prev2), _hid(prev1), _hid(word)
+        c3 = tri.get(_key3(a, b, c))
+        if c3:
+            return math.log(c3 / max(bi.get(_key2(a, b)), c3))
+        c2 = bi.get(_key2(b, c))
+        if c2:
+            return math.log(BACKOFF * c2 / max(uni.get(b), c2))
+        vocab = len(uni)
+        return 2 * math.log(BACKOFF) + math.log((uni.get(c) + 1) / (self.total + vocab + 1))
+
+
+# --- context-aware restoration -------------------------------------------
+
+# One position in the document: candidate (word, freq) pairs, plus whether a
+# sentence boundary follows it. A clean token is a single candidate with freq None.
+Slot = Tuple[List[Tuple[str, Optional[int]]], bool]
+
+
+def beam_restore(slots: Sequence[Slot], model: NGramModel, beam: int = 8) -> List[int]:
+    """
+    Choose one candidate index per slot, maximising
+        sum(UNIGRAM_WEIGHT * log P_trie(cand) + log P_ngram(cand | two previous picks)).
+    Hypotheses sharing the same two-word history are recombined and only the
+    best `beam` survive each step, so the cost is O(len(slots) * beam * candidates).
+    """
+    # hypothesis: (score, prev2, prev1, backpointer index into `trail`)
+    hyps = [(0.0, _BOUNDARY, _BOUNDARY, -1)]
+    trail: List[Tuple[int, int]] = []     # (parent trail index, candidate index)
+
+    for cands, boundary_after in slots:
+        total = sum(f for _, f in cands if f) or 1
+        priors = [UNIGRAM_WEIGHT * math.log(f / total) if f else 0.0 for _, f in cands]
+        best: dict = {}
+        for score, p2, p1, back in hyps:
+            for ci, (word, _) in enumerate(cands):
+                s = score + priors[ci] + model.logprob(p2, p1, word)
+                if boundary_after:
+                    state = (word, _BOUNDARY)
+                    s += model.logprob(p1, word, _BOUNDARY)
+                else:
+                    state = (p1, word)
+                if state not in best or s > best[state][0]:
+                    best[state] = (s, back, ci)
+        ranked = sorted(best.items(), key=lambda kv: -kv[1][0])[:beam]
+        hyps = []
+        for (p2, p1), (s, back, ci) in ranked:
+            trail.append((back, ci))
+            hyps.append((s, p2, p1, len(trail) - 1))
+
+    picks: List[int] = []
+    idx = max(hyps, key=lambda h: h[0])[3] if slots else -1
+    while idx >= 0:
+        back, ci = trail[idx]
+        picks.append(ci)
+        idx = back
+    picks.reverse()
+    return picks
@@ -1,6 +1,9 @@
 # src/features/pattern.py
 from __future__ import annotations
-from typing import List, Tuple, Set, Optional
+from typing import Dict, Iterable, List, Tuple, Set, Optional
+from trie.match_cache import MISSING
+from features.glob_planner import plan_glob, run_plan, shares_walk
+from features.glob_multi import PatternAutomaton
 
 Token = Tuple[str, object]  # ('LIT', 'c') | ('ANY', None) | ('STAR', None) | ('SET', frozenset({...}))
 
@@ -65,14 +68,45 @@ def glob_match(trie, pattern: str, top_k: Optional[int] = None) -> List[Tuple[st
     Returns list of (word, frequency), sorted by:
       1) higher frequency first, 2) alphabetical.
     If `top_k` is given, returns at most top_k results.
+    Results are memoized in `trie.match_cache` (when present) until the trie changes.
+    The strategy (forward DFS or a scan of the word index) is chosen by
+    features.glob_planner; see explain_glob().
     """
+    # read-only layouts (e.g. FrozenDawg) run the match natively
+    if not hasattr(trie, "root"):
+        return trie.glob_match(pattern, top_k)
+
+    cache = getattr(trie, "match_cache", None)
+    if cache is not None:
+        key = ('glob', pattern, top_k, trie.version)
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return list(cached)
+
     tokens = _parse_pattern(pattern)
+    plan = plan_glob(trie, tokens)
+    if plan.strategy != 'dfs':
+        out = sorted(run_plan(trie, plan), key=lambda x: (-x[1], x[0]))
+        out = out[:top_k] if top_k is not None else out
+        if cache is not None:
+            cache.put(key, tuple(out))
+        return out
+
+    out = _dfs_match(trie, tokens)
+    out = out[:top_k] if top_k is not None else out
+    if cache is not None:
+        cache.put(key, tuple(out))
+    return out
+
+
+def _dfs_match(trie, tokens: List[Token]) -> List[Tuple[str, int]]:
+    """Forward DFS for one parsed pattern; all matches, ranked."""
     results: List[Tuple[str, int]] = []
 
     def dfs(node, ti: int, prefix: str) -> None:
         if ti == len(tokens):
-            if getattr(node, "is_end", False):
-                results.append((prefix, getattr(node, "frequency", 0)))
+            if node.is_end:
+                results.append((prefix, node.frequency))
             return
 
         kind, payload = tokens[ti]
@@ -109,5 +143,64 @@ def glob_match(trie, pattern: str, top_k: Optional[int] = None) -> List[Tuple[st
         if w not in best or f > best[w]:
             best[w] = f
 
-    sorted_items = sorted(best.items(), key=lambda x: (-x[1], x[0]))
-    return sorted_items[:top_k] if top_k is not None else sorted_items
+    return sorted(best.items(), key=lambda x: (-x[1], x[0]))
+
+
+def glob_match_many(trie, patterns: Iterable[str],
+                    top_k: Optional[int] = None) -> Dict[str, List[Tuple[str, int]]]:
+    """
+    glob_match for many patterns at once; returns {pattern: matches}.
+    Cached patterns are served from `trie.match_cache`, and patterns the
+    planner sends to a word-index scan or finds cheap to DFS run on their
+    own. The expensive DFS patterns are compiled into one PatternAutomaton
+    and matched in a single walk of the trie, so patterns sharing a literal
+    prefix share its descent and STAR loops are followed once for all.
+    Raises ValueError for a malformed pattern, like glob_match.
+    """
+    patterns = list(dict.fromkeys(patterns))
+    if not hasattr(trie, "root"):
+        return {p: trie.glob_match(p, top_k) for p in patterns}
+
+    out: Dict[str, List[Tuple[str, int]]] = {}
+    cache = getattr(trie, "match_cache", None)
+    walk: List[str] = []
+    walk_tokens: List[List[Token]] = []
+    for p in patterns:
+        key = ('glob', p, top_k, trie.version)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not MISSING:
+                out[p] = list(cached)
+                continue
+        tokens = _parse_pattern(p)
+        plan = plan_glob(trie, tokens)
+        if plan.strategy == 'dfs' and shares_walk(plan):
+            walk.append(p)
+            walk_tokens.append(tokens)
+            continue
+        if plan.strategy == 'dfs':
+            found = _dfs_match(trie, tokens)
+        else:
+            found = sorted(run_plan(trie, plan), key=lambda x: (-x[1], x[0]))
+        out[p] = found[:top_k] if top_k is not None else found
+        if cache is not None:
+            cache.put(key, tuple(out[p]))
+
+    if walk:
+        if len(walk) > 1:
+            results = PatternAutomaton(walk_tokens).run(trie.root, len(walk))
+        else:
+            results = [_dfs_match(trie, walk_tokens[0])]
+        for p, found in zip(walk, results):
+            found.sort(key=lambda x: (-x[1], x[0]))
+            out[p] = found[:top_k] if top_k is not None else found
+            if cache is not None:
+                cache.put(('glob', p, top_k, trie.version), tuple(out[p]))
+    return {p: out[p] for p in patterns}
+
+
+def explain_glob(trie, pattern: str) -> str:
+    """Describe how glob_match would run `pattern` on `trie` (the plan and its cost estimates)."""
+    if not hasattr(trie, "root"):
+        return "plan:      native match on a read-only layout"
+    return plan_glob(trie, _parse_pattern(pattern), record=False).explain()
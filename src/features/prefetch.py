@@ -0,0 +1,113 @@
+# src/features/prefetch.py
+# Candidate lists for interactive restore, computed ahead of the prompts.
+from __future__ import annotations
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from features.pattern import glob_match
+
+LOOKAHEAD = 16      # pattern tokens the worker may run ahead of the prompt
+
+
+class CandidatePrefetcher:
+    """
+    Runs glob_match for a document's pattern tokens (in document order) on
+    a worker thread while the user answers the prompts, so a prompt usually
+    finds its candidates ready instead of waiting on the trie walk.
+
+    At most `lookahead` results wait to be taken; the worker sleeps until
+    the prompts catch up, so memory stays bounded on long documents.
+    Repeated patterns are cheap: glob_match serves them from the trie's
+    match cache. While the worker runs, it is the only thread that touches
+    the trie (and its cache); close() stops it, after the match it is in
+    the middle of, before the session goes back to a menu that may edit
+    the trie. A result computed under an older trie version is recomputed.
+    """
+    def __init__(self, trie, patterns: List[str], top_k: Optional[int] = 5,
+                 lookahead: int = LOOKAHEAD):
+        self.trie = trie
+        self.patterns = list(patterns)
+        self.top_k = top_k
+        self.lookahead = max(1, lookahead)
+        # index -> (trie version, matches, error raised by glob_match)
+        self._ready: Dict[int, Tuple[int, list, Optional[Exception]]] = {}
+        self._cond = threading.Condition()
+        self._next = 0              # next index the worker computes
+        self._taken = 0             # first index the prompts have not taken yet
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self.served = 0             # results taken without waiting
+        self.waited = 0             # results the prompt had to wait for
+        self.wait_seconds = 0.0
+
+    def start(self, at: int = 0) -> "CandidatePrefetcher":
+        self._next = self._taken = at
+        self._stop = False
+        if at < len(self.patterns):
+            self._thread = threading.Thread(target=self._run, name="glob-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop the worker and wait for it to leave the trie."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._ready.clear()
+
+    def _match(self, i: int) -> Tuple[int, list, Optional[Exception]]:
+        version = self.trie.version
+        try:
+            return version, glob_match(self.trie, self.patterns[i], top_k=self.top_k), None
+        except Exception as e:      # re-raised by get(), as a direct call would
+            return version, [], e
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stop and self._next - self._taken >= self.lookahead:
+                    self._cond.wait()
+                if self._stop or self._next >= len(self.patterns):
+                    return
+                i = self._next
+            entry = self._match(i)
+            with self._cond:
+                if self._stop:
+                    return
+                self._ready[i] = entry
+                self._next = i + 1
+                self._cond.notify_all()
+
+    def get(self, i: int) -> list:
+        """The matches of pattern `i`; indices must be taken in increasing order."""
+        t0 = time.perf_counter()
+        with self._cond:
+            for k in [k for k in self._ready if k < i]:
+                del self._ready[k]          # skipped tokens
+            self._taken = i
+            self._cond.notify_all()
+            ready = i in self._ready
+            while i not in self._ready and self._thread is not None and self._thread.is_alive() \
+                    and self._next <= i:
+                self._cond.wait()
+            entry = self._ready.pop(i, None)
+            self._taken = i + 1
+            self._cond.notify_all()
+        if entry is None or entry[0] != self.trie.version:
+            # the worker is gone or behind the trie: match here, restart it past i
+            self.close()
+            entry = self._match(i)
+            self.start(i + 1)
+        if ready:
+            self.served += 1
+        else:
+            self.waited += 1
+            self.wait_seconds += time.perf_counter() - t0
+        version, matches, error = entry
+        if error is not None:
+            raise error
+        return matches
@@ -0,0 +1,452 @@
+# src/features/regex_search.py
+# Regular-expression queries answered by walking the trie with a lazy DFA.
+#
+#   cd src && python -m features.regex_search --trie ../docs/stopwordsFreq.txt "th(e|is|at)s?" "[^aeiou]{3,}"
+#
+# runs each pattern both ways (trie walk vs. dumping every word through `re`)
+# and prints the timings.
+from __future__ import annotations
+import argparse
+import gc
+import heapq
+import re
+import time
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from trie.match_cache import MISSING
+
+MAX_REPEAT = 32          # largest bound allowed in {m,n}
+MAX_NFA_STATES = 20000   # compiled size limit (bounded repeats copy their operand)
+
+REGEX_HELP = r"""
+Regex search (a safe subset of Python regular expressions)
+
+The whole word must match. Supported:
+  abc        literal characters             \.  \*  \\  escaped punctuation
+  .          any character                  \d \w \s  (and \D \W \S)
+  [a-z_]     one character from a class     [^aeiou]  negated class
+  (a|b)      grouping and alternation       (?:...)   non-capturing group
+  *  +  ?    repeats (lazy forms accepted)  {3}  {2,}  {2,5}  bounded repeats
+  ^ $        allowed at the ends only (the match is anchored anyway)
+
+Not supported: backreferences, lookarounds, \b and other zero-width tests.
+Matching is case-sensitive. Results are ranked by frequency (highest first).
+
+Differences from Python's re:
+  .          also matches a newline (like re.DOTALL)
+  \w         letters/digits by str.isalnum() plus '_'; may differ from re for
+             some Unicode marks
+  {,n}       rejected; write {0,n}.  A '{' that does not start a valid
+             repeat is an error, not a literal '{' (write \{)
+  {m,n}      bounds above %d are rejected
+""" % MAX_REPEAT
+
+_CATEGORIES = {
+    "d": lambda ch: ch.isdecimal(),
+    "w": lambda ch: ch.isalnum() or ch == "_",
+    "s": lambda ch: ch.isspace(),
+}
+_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "f": "\f", "v": "\v"}
+
+
+class CharClass:
+    """One character position: explicit chars, \\d\\w\\s categories, optionally negated."""
+    __slots__ = ("chars", "cats", "negated")
+
+    def __init__(self, chars=frozenset(), cats: Tuple[str, ...] = (), negated: bool = False):
+        self.chars = frozenset(chars)
+        self.cats = tuple(cats)
+        self.negated = negated
+
+    def __contains__(self, ch: str) -> bool:
+        hit = ch in self.chars or any(_CATEGORIES[c.lower()](ch) != c.isupper() for c in self.cats)
+        return hit != self.negated
+
+    def finite(self) -> Optional[FrozenSet[str]]:
+        """The exact set of matching chars, or None if it is open-ended."""
+        return None if self.negated or self.cats else self.chars
+
+
+_ANY = CharClass(negated=True)
+
+
+# --- parsing -------------------------------------------------------------------
+# AST: ('char', CharClass) | ('cat', [nodes]) | ('alt', [nodes]) | ('rep', node, lo, hi|None)
+
+class _Parser:
+    def __init__(self, pattern: str):
+        self.p = pattern
+        self.i = 0
+
+    def error(self, msg: str) -> ValueError:
+        return ValueError(f"{msg} at position {self.i} in {self.p!r}")
+
+    def peek(self) -> Optional[str]:
+        return self.p[self.i] if self.i < len(self.p) else None
+
+    def take(self) -> str:
+        ch = self.p[self.i]
+        self.i += 1
+        return ch
+
+    def parse(self):
+        if self.peek() == "^":
+            self.i += 1
+        node = self.alternation()
+        if self.peek() is not None:
+            raise self.error("Unbalanced ')'")
+        return node
+
+    def alternation(self):
+        branches = [self.concat()]
+        while self.peek() == "|":
+            self.i += 1
+            branches.append(self.concat())
+        return branches[0] if len(branches) == 1 else ("alt", branches)
+
+    def concat(self):
+        items = []
+        while self.peek() not in (None, "|", ")"):
+            if self.peek() == "$":
+                self.i += 1
+                if self.peek() not in (None, "|", ")"):
+                    raise self.error("'$' is only allowed at the end")
+                break
+            items.append(self.repeat())
+        return items[0] if len(items) == 1 else ("cat", items)
+
+    def repeat(self):
+        node = self.atom()
+        while self.peek() in ("*", "+", "?", "{"):
+            op = self.take()
+            if op == "*":
+                node = ("rep", node, 0, None)
+            elif op == "+":
+                node = ("rep", node, 1, None)
+            elif op == "?":
+                node = ("rep", node, 0, 1)
+            else:
+                lo, hi = self.bounds()
+                node = ("rep", node, lo, hi)
+            if self.peek() == "?":        # lazy: same set of full matches
+                self.i += 1
+        return node
+
+    def bounds(self) -> Tuple[int, Optional[int]]:
+        m = re.compile(r"(\d+)(,(\d*))?\}").match(self.p, self.i)
+        if not m:
+            raise self.error("Malformed {m,n} repeat")
+        self.i = m.end()
+        lo = int(m.group(1))
+        hi = lo if m.group(2) is None else (int(m.group(3)) if m.group(3) else None)
+        if max(lo, hi or 0) > MAX_REPEAT:
+            raise self.error(f"Repeat bound above {MAX_REPEAT}")
+        if hi is not None and hi < lo:
+            raise self.error("Repeat bounds out of order")
+        return lo, hi
+
+    def atom(self):
+        ch = self.take()
+        if ch == "(":
+            if self.p.startswith("?:", self.i):
+                self.i += 2
+            elif self.peek() == "?":
+                raise self.error("Only (?:...) groups are supported")
+            node = self.alternation()
+            if self.peek() != ")":
+                raise self.error("Missing ')'")
+            self.i += 1
+            return node
+        if ch == "[":
+            return ("char", self.charclass())
+        if ch == ".":
+            return ("char", _ANY)
+        if ch == "\\":
+            return ("char", self.escape())
+        if ch in "*+?{":
+            raise self.error(f"Nothing to repeat before {ch!r}")
+        if ch in "^$":
+            raise self.error(f"{ch!r} is only allowed at the ends")
+        return ("char", CharClass({ch}))
+
+    def escape(self) -> CharClass:
+        if self.peek() is None:
+            raise self.error("Trailing backslash")
+        ch = self.take()
+        if ch.lower() in _CATEGORIES:
+            return CharClass(cats=(ch,))
+        if ch in _ESCAPES:
+            return CharClass({_ESCAPES[ch]})
+        if ch.isalnum():
+            raise self.error(f"Unsupported escape '\\{ch}'")
+        return CharClass({ch})
+
+    def charclass(self) -> CharClass:
+        negated = self.peek() == "^"
+        if negated:
+            self.i += 1
+        chars, cats = set(), []
+        first = True
+        while True:
+            ch = self.peek()
+            if ch is None:
+                raise self.error("Unclosed character class")
+            if ch == "]" and not first:
+                self.i += 1
+                return CharClass(chars, cats, negated)
+            first = False
+            self.i += 1
+            if ch == "\\":
+                part = self.escape()
+                if part.cats:
+                    cats.extend(part.cats)
+                    continue
+                (ch,) = part.chars
+            # range like a-z (only if there's something after '-')
+            if self.peek() == "-" and self.i + 1 < len(self.p) and self.p[self.i + 1] != "]":
+                self.i += 1
+                end = self.take()
+                if end == "\\":
+                    part = self.escape()
+                    if part.cats:
+                        raise self.error("Bad character range")
+                    (end,) = part.chars
+                if ord(end) < ord(ch):
+                    raise self.error("Bad character range")
+                chars.update(chr(c) for c in range(ord(ch), ord(end) + 1))
+            else:
+                chars.add(ch)
+
+
+# --- automaton -------------------------------------------------------------------
+
+class RegexAutomaton:
+    """
+    Thompson NFA for a parsed pattern, determinised lazily while a trie is
+    walked: each distinct set of NFA states gets an integer DFA state and its
+    per-character transitions are memoised. State 0 is dead, so any subtree
+    reached in state 0 is pruned without being visited.
+    """
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self._eps: List[List[int]] = []
+        self._edges: List[List[Tuple[CharClass, int]]] = []
+        start, self._final = self._build(_Parser(pattern).parse())
+
+        self._ids: Dict[FrozenSet[int], int] = {frozenset(): 0}
+        self._sets: List[FrozenSet[int]] = [frozenset()]
+        self.accepting: List[bool] = [False]
+        # literal chars that can leave a state, or None if the state has an open-ended class
+        self.literals: List[Optional[FrozenSet[str]]] = [frozenset()]
+        self.trans: List[Dict[str, int]] = [{}]
+        self.start = self._state(self._closure([start]))
+
+    def _new(self) -> int:
+        if len(self._eps) >= MAX_NFA_STATES:
+            raise ValueError(f"Pattern too large (over {MAX_NFA_STATES} automaton states)")
+        self._eps.append([])
+        self._edges.append([])
+        return len(self._eps) - 1
+
+    def _build(self, node) -> Tuple[int, int]:
+        """Fragment (entry, exit) for an AST node."""
+        kind = node[0]
+        if kind == "char":
+            s, e = self._new(), self._new()
+            self._edges[s].append((node[1], e))
+            return s, e
+        if kind == "cat":
+            s = e = self._new()
+            for part in node[1]:
+                ps, pe = self._build(part)
+                self._eps[e].append(ps)
+                e = pe
+            return s, e
+        if kind == "alt":
+            s, e = self._new(), self._new()
+            for part in node[1]:
+                ps, pe = self._build(part)
+                self._eps[s].append(ps)
+                self._eps[pe].append(e)
+            return s, e
+        # ('rep', operand, lo, hi): lo mandatory copies, then optional ones or a loop
+        _, operand, lo, hi = node
+        s = e = self._new()
+        for _ in range(lo):
+            ps, pe = self._build(operand)
+            self._eps[e].append(ps)
+            e = pe
+        if hi is None:
+            ps, pe = self._build(operand)
+            self._eps[e].append(ps)
+            self._eps[pe].append(ps)
+            end = self._new()
+            self._eps[e].append(end)
+            self._eps[pe].append(end)
+            return s, end
+        end = self._new()
+        for _ in range(hi - lo):
+            self._eps[e].append(end)
+            ps, pe = self._build(operand)
+            self._eps[e].append(ps)
+            e = pe
+        self._eps[e].append(end)
+        return s, end
+
+    def _closure(self, states) -> FrozenSet[int]:
+        out = set(states)
+        stack = list(states)
+        while stack:
+            for nxt in self._eps[stack.pop()]:
+                if nxt not in out:
+                    out.add(nxt)
+                    stack.append(nxt)
+        return frozenset(out)
+
+    def _state(self, states: FrozenSet[int]) -> int:
+        sid = self._ids.get(states)
+        if sid is not None:
+            return sid
+        sid = len(self._sets)
+        self._ids[states] = sid
+        self._sets.append(states)
+        self.accepting.append(self._final in states)
+        lits: Optional[set] = set()
+        for s in states:
+            for cls, _ in self._edges[s]:
+                chars = cls.finite()
+                if chars is None:
+                    lits = None
+                    break
+                lits.update(chars)
+            if lits is None:
+                break
+        self.literals.append(None if lits is None else frozenset(lits))
+        self.trans.append({})
+        return sid
+
+    def step(self, sid: int, ch: str) -> int:
+        """State after reading `ch` in state `sid` (0 once no word can match)."""
+        nxt = self.trans[sid].get(ch)
+        if nxt is None:
+            targets = [t for s in self._sets[sid] for cls, t in self._edges[s] if ch in cls]
+            nxt = self._state(self._closure(targets)) if targets else 0
+            self.trans[sid][ch] = nxt
+        return nxt
+
+    def fullmatch(self, word: str) -> bool:
+        sid = self.start
+        for ch in word:
+            sid = self.step(sid, ch)
+            if not sid:
+                return False
+        return self.accepting[sid]
+
+    def run(self, root) -> List[Tuple[str, int]]:
+        """All (word, frequency) pairs under `root` that the pattern matches, in one pruned walk."""
+        found: List[Tuple[str, int]] = []
+        accepting, literals, trans, step = self.accepting, self.literals, self.trans, self.step
+        stack = [(root, self.start, "")]
+        while stack:
+            node, sid, word = stack.pop()
+            if node.is_end and accepting[sid]:
+                found.append((word, node.frequency))
+            children = node.children
+            lits = literals[sid]
+            if lits is None or len(lits) >= len(children):
+                edges = children.items()
+            else:
+                edges = [(ch, children.get(ch)) for ch in lits]
+            moves = trans[sid]
+            for ch, child in edges:
+                if child is None:
+                    continue
+                nxt = moves.get(ch)
+                if nxt is None:
+                    nxt = step(sid, ch)
+                if nxt:
+                    stack.append((child, nxt, word + ch))
+        return found
+
+
+@lru_cache(maxsize=64)
+def compile_regex(pattern: str) -> RegexAutomaton:
+    """Parse and compile `pattern` (ValueError if it is outside the supported subset)."""
+    return RegexAutomaton(pattern)
+
+
+def _ranked(found, top_k: Optional[int]) -> List[Tuple[str, int]]:
+    key = lambda x: (-x[1], x[0])
+    return heapq.nsmallest(top_k, found, key=key) if top_k is not None else sorted(found, key=key)
+
+
+def regex_match(trie, pattern: str, top_k: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    Words of `trie` that `pattern` matches in full, as (word, frequency)
+    sorted by frequency (highest first) then alphabetically; at most top_k.
+    Results are memoized in `trie.match_cache` (when present) until the trie changes.
+    Layouts without a node tree (FrozenDawg, ShardedTrie, DiskTrie) are
+    filtered word by word through the same automaton.
+    """
+    dfa = compile_regex(pattern)
+    if not hasattr(trie, "root"):
+        if hasattr(trie, "items"):
+            items = trie.items()
+        else:
+            words = trie.list_words()
+            items = zip(words, trie.get_frequencies(words))
+        return _ranked([(w, f) for w, f in items if dfa.fullmatch(w)], top_k)
+
+    cache = getattr(trie, "match_cache", None)
+    if cache is not None:
+        key = ('regex', pattern, top_k, trie.version)
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return list(cached)
+    out = _ranked(dfa.run(trie.root), top_k)
+    if cache is not None:
+        cache.put(key, tuple(out))
+    return out
+
+
+def regex_scan(trie, pattern: str, top_k: Optional[int] = None) -> List[Tuple[str, int]]:
+    """The dump-and-filter baseline: every word through Python's `re`."""
+    rx = re.compile(pattern)
+    words = trie.list_words()
+    return _ranked([(w, f) for w, f in zip(words, trie.get_frequencies(words)) if rx.fullmatch(w)], top_k)
+
+
+def main(argv=None) -> int:
+    from trie.prefix_trie import PrefixTrie
+
+    ap = argparse.ArgumentParser(description="Time regex_match against dump-and-filter.")
+    ap.add_argument("--trie", required=True, help="word,frequency file to load")
+    ap.add_argument("--top-k", type=int)
+    ap.add_argument("patterns", nargs="+")
+    args = ap.parse_args(argv)
+
+    trie = PrefixTrie()
+    trie.load_from_word_freq_file(args.trie)
+    trie.match_cache.maxsize = 0
+    status = 0
+    for pattern in args.patterns:
+        # a full collection pending from the load would otherwise land in one timing
+        compile_regex.cache_clear()
+        gc.collect()
+        t0 = time.perf_counter()
+        got = regex_match(trie, pattern, args.top_k)
+        t1 = time.perf_counter()
+        gc.collect()
+        t1b = time.perf_counter()
+        want = regex_scan(trie, pattern, args.top_k)
+        t2 = time.perf_counter()
+        same = got == want
+        status |= not same
+        print(f"{pattern!r}: {len(got)} match(es); trie walk {(t1 - t0) * 1000:.1f} ms, "
+              f"dump+re {(t2 - t1b) * 1000:.1f} ms{'' if same else '  RESULTS DIFFER'}")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+# src/features/restore.py
+# Whole-document (non-interactive) restore pipelines of the predict and
+# pattern menus; the evaluation harness runs the same functions.
+from __future__ import annotations
+from typing import Callable, List, Optional, Tuple
+
+from features.pattern import glob_match_many
+from features.ngram import NGramModel, beam_restore, tokenize_clean
+from features.tokenizer import GLOB_TOKENS, WILDCARD_TOKENS, apply_casing, splice
+
+CONTEXT_TOP_K = 5    # candidates per pattern considered by the context model
+
+Matches = List[Tuple[str, int]]
+Render = Callable[[str, str, str, Matches], Optional[str]]
+
+
+# --- predict menu ('*' = exactly one character) ------------------------------
+
+# '*' here matches exactly one character (Glob+ '?'); Glob+ marks are literal
+_AS_GLOB = str.maketrans({"*": "?", "?": "[?]", "[": "[[]"})
+
+
+def as_glob(core: str) -> str:
+    return core.lower().translate(_AS_GLOB)
+
+
+def _trie_order(trie, matches: Matches) -> Matches:
+    """
+    `matches` highest frequency first, equal frequencies in trie (DFS) order:
+    the order of trie.wildcard_match ranked by a stable frequency sort, which
+    best_match and the '$' listing use too. glob_match ranks ties
+    alphabetically instead.
+    """
+    if not hasattr(trie, "root"):
+        return matches          # read-only layouts store children sorted: DFS order is alphabetical
+
+    def path(word: str) -> tuple:
+        node, key = trie.root, []
+        for ch in word:
+            for i, c in enumerate(node.children):
+                if c == ch:
+                    key.append(i)
+                    break
+            node = node.children[ch]
+        return tuple(key)
+
+    return sorted(matches, key=lambda m: (-m[1], path(m[0])))
+
+
+def render_all(pre: str, core: str, post: str, matches: Matches) -> str:
+    return f"{pre}{[w for w, _ in matches]}{post}"
+
+
+def render_best(pre: str, core: str, post: str, matches: Matches) -> str | None:
+    if not matches:
+        return None
+    best = matches[0][0]
+    if core.isupper():
+        best = best.upper()
+    elif core[0].isupper():
+        best = best.capitalize()
+    return f"{pre}<{best}>{post}"
+
+
+def restore_wildcards(lines: List[str], trie, render: Render) -> List[str]:
+    """
+    Rewrite the wildcard tokens of every line with `render`; everything else
+    is copied verbatim. The matches of all distinct tokens come from one
+    glob_match_many walk of the trie, re-ranked into trie order (see
+    _trie_order) so ties come out as wildcard_match / best_match give them.
+    """
+    spans = [[(start, end, pre, core, post, as_glob(core))
+              for start, end, pre, core, post in WILDCARD_TOKENS.scan(line)] for line in lines]
+    found = glob_match_many(trie, {pattern for line_spans in spans for *_, pattern in line_spans})
+    found = {pattern: _trie_order(trie, matches) for pattern, matches in found.items()}
+    out = []
+    for line, line_spans in zip(lines, spans):
+        edits = []
+        for start, end, pre, core, post, pattern in line_spans:
+            repl = render(pre, core, post, found[pattern])
+            if repl is not None:
+                edits.append((start, end, repl))
+        out.append(splice(line, edits))
+    return out
+
+
+# --- pattern menu (Glob+) ----------------------------------------------------
+
+def scan_and_match(lines: List[str], trie, top_k: int):
+    """Pattern spans of every line, plus the matches of each distinct (lowercased) core from one batch."""
+    spans = [list(GLOB_TOKENS.scan(line)) for line in lines]
+    cores = {core.lower() for line_spans in spans for _, _, _, core, _ in line_spans}
+    return spans, glob_match_many(trie, cores, top_k=top_k)
+
+
+def restore_globs(lines: List[str], trie) -> List[str]:
+    """Auto-restore (top-1) the Glob+ tokens of a whole document; its patterns are matched together."""
+    spans, found = scan_and_match(lines, trie, top_k=5)
+    out = []
+    for line, line_spans in zip(lines, spans):
+        edits = []
+        for start, end, pre, core, post in line_spans:
+            matches = found[core.lower()]
+            if matches:
+                # top-1, keep casing & punctuation
+                edits.append((start, end, f"{pre}{apply_casing(core, matches[0][0])}{post}"))
+        out.append(splice(line, edits))
+    return out
+
+
+def restore_globs_in_context(lines: List[str], trie, model: NGramModel) -> List[str]:
+    """
+    Auto-restore a whole document (list of lines), choosing each pattern's
+    candidate with the n-gram model so the words before and after it count.
+    """
+    spans, found = scan_and_match(lines, trie, top_k=CONTEXT_TOP_K)
+    slots: list = []          # [candidates, boundary_after] per context word
+    pending = []              # (line idx, start, end, pre, core, post, matches, slot idx)
+
+    def add_clean(text: str) -> None:
+        for w in tokenize_clean(text):
+            if w == "<s>":
+                if slots:
+                    slots[-1][1] = True
+            else:
+                slots.append([[(w, None)], False])
+
+    for li, line in enumerate(lines):
+        last = 0
+        for start, end, pre, core, post in spans[li]:
+            add_clean(line[last:start])
+            last = end
+            matches = found[core.lower()]
+            if not matches:
+                add_clean(line[start:end])
+                continue
+            slots.append([matches, "<s>" in tokenize_clean(post)])
+            pending.append((li, start, end, pre, core, post, matches, len(slots) - 1))
+        add_clean(line[last:])
+
+    picks = beam_restore(slots, model)
+    edits: dict = {}
+    for li, start, end, pre, core, post, matches, si in pending:
+        chosen = apply_casing(core, matches[picks[si]][0])
+        edits.setdefault(li, []).append((start, end, f"{pre}{chosen}{post}"))
+    return [splice(line, edits.get(li, [])) for li, line in enumerate(lines)]
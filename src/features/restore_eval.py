@@ -0,0 +1,282 @@
+# src/features/restore_eval.py
+# Accuracy + throughput harness for the restore modes.
+#
+#   cd src && python -m features.restore_eval --trie ../docs/stopwordsFreq.txt --docs ../docs
+#
+# Prints (or writes with --out) a JSON report; with --baseline it exits 1 when
+# accuracy drops or throughput falls below the baseline by more than --tolerance.
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from trie.prefix_trie import PrefixTrie
+from features.pattern import glob_match, is_glob_pattern
+from features.ngram import NGramModel
+from features.restore import (render_all, render_best, restore_globs,
+                              restore_globs_in_context, restore_wildcards)
+from features.tokenizer import WILDCARD_CORE_CHARS, split_token
+
+_LIT_RUN = re.compile(r"[A-Za-z0-9]+")
+
+
+def pattern_shape(core: str) -> str:
+    """Collapse literal runs so 'th*s' and 'wh*n' share the shape 'L*L'."""
+    return _LIT_RUN.sub("L", core)
+
+
+def find_documents(docs_dir: str) -> List[dict]:
+    """Every post*_defect.txt with its _best / _restored references (if present)."""
+    docs = []
+    for defect in sorted(glob.glob(os.path.join(docs_dir, "*_defect.txt"))):
+        stem = defect[: -len("_defect.txt")]
+        docs.append({
+            "name": os.path.basename(stem),
+            "defect": defect,
+            "best": stem + "_best.txt" if os.path.exists(stem + "_best.txt") else None,
+            "restored": stem + "_restored.txt" if os.path.exists(stem + "_restored.txt") else None,
+        })
+    return docs
+
+
+def _read_lines(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def _tokens(lines: List[str], canon: Optional[Callable[[str], str]] = None) -> List[List[str]]:
+    return [(canon(line) if canon else line).split() for line in lines]
+
+
+# --- restore modes -----------------------------------------------------------
+# Each mode maps (lines, trie) -> restored lines and declares which reference
+# file it is judged against, how reference/output tokens are normalised before
+# comparing ("norm", "canon") and how to count candidates.
+
+def _predict_best(lines, trie, model):
+    return restore_wildcards(lines, trie, render_best)
+
+
+def _predict_all(lines, trie, model):
+    return restore_wildcards(lines, trie, render_all)
+
+
+def _pattern_auto(lines, trie, model):
+    return restore_globs(lines, trie)
+
+
+def _pattern_context(lines, trie, model):
+    return restore_globs_in_context(lines, trie, model)
+
+
+def _predict_core(tok: str) -> str:
+    return split_token(tok, WILDCARD_CORE_CHARS)[1]
+
+
+def _predict_candidates(core: str, trie) -> int:
+    return len(trie.wildcard_match(core.lower()))
+
+
+def _pattern_core(tok: str) -> str:
+    return split_token(tok)[1]
+
+
+def _pattern_candidates(core: str, trie) -> int:
+    return len(glob_match(trie, core.lower()))
+
+
+def _strip_marks(tok: str) -> str:
+    return tok.replace("<", "").replace(">", "")
+
+
+def _join_lists(text: str) -> str:
+    """"['this', 'thus']" -> "['this','thus']" so a printed list stays one token."""
+    return re.sub(r"',\s+'", "','", text)
+
+
+MODES: Dict[str, dict] = {
+    "predict_best": {"run": _predict_best, "reference": "best", "norm": None,
+                     "core": _predict_core, "is_pattern": lambda core: "*" in core,
+                     "candidates": _predict_candidates},
+    "predict_all": {"run": _predict_all, "reference": "restored", "norm": None, "canon": _join_lists,
+                    "core": _predict_core, "is_pattern": lambda core: "*" in core,
+                    "candidates": _predict_candidates},
+    "pattern_auto": {"run": _pattern_auto, "reference": "best", "norm": _strip_marks,
+                     "core": _pattern_core, "is_pattern": is_glob_pattern,
+                     "candidates": _pattern_candidates},
+    "pattern_context": {"run": _pattern_context, "reference": "best", "norm": _strip_marks,
+                        "core": _pattern_core, "is_pattern": is_glob_pattern,
+                        "candidates": _pattern_candidates,
+                        "needs_model": True},
+}
+
+
+# --- measurement -------------------------------------------------------------
+
+def _shape_latency(mode: dict, lines, trie, model) -> Dict[str, List[float]]:
+    """Time every pattern token on its own (cold cache) and bucket by shape."""
+    per_shape: Dict[str, List[float]] = {}
+    for line in lines:
+        for tok in line.split():
+            core = mode["core"](tok)
+            if not mode["is_pattern"](core):
+                continue
+            trie.match_cache.clear()
+            t0 = time.perf_counter()
+            mode["run"]([tok], trie, model)
+            per_shape.setdefault(pattern_shape(core), []).append(time.perf_counter() - t0)
+    return per_shape
+
+
+def evaluate_mode(name: str, docs: List[dict], trie: PrefixTrie,
+                  model: Optional[NGramModel] = None, repeats: int = 3) -> dict:
+    mode = MODES[name]
+    norm: Optional[Callable[[str], str]] = mode["norm"]
+    canon: Optional[Callable[[str], str]] = mode.get("canon")
+    totals = {"tokens": 0, "correct": 0, "pattern_tokens": 0, "pattern_correct": 0,
+              "ambiguous": 0, "seconds": 0.0}
+    shapes: Dict[str, List[float]] = {}
+    per_doc = {}
+
+    for doc in docs:
+        ref_path = doc[mode["reference"]]
+        if ref_path is None:
+            continue
+        lines = _read_lines(doc["defect"])
+        ref = _tokens(_read_lines(ref_path), canon)
+
+        best_secs = None
+        for _ in range(max(1, repeats)):
+            trie.match_cache.clear()
+            t0 = time.perf_counter()
+            out = mode["run"](lines, trie, model)
+            secs = time.perf_counter() - t0
+            best_secs = secs if best_secs is None else min(best_secs, secs)
+
+        got_lines = _tokens(out, canon)
+        d = {"tokens": 0, "correct": 0, "pattern_tokens": 0, "pattern_correct": 0, "ambiguous": 0}
+        for li, toks in enumerate(_tokens(lines)):
+            got = got_lines[li] if li < len(got_lines) else []
+            want = ref[li] if li < len(ref) else []
+            for ti, tok in enumerate(toks):
+                g = got[ti] if ti < len(got) else None
+                w = want[ti] if ti < len(want) else None
+                if norm is not None and w is not None:
+                    w = norm(w)
+                ok = g is not None and g == w
+                d["tokens"] += 1
+                d["correct"] += ok
+                core = mode["core"](tok)
+                if mode["is_pattern"](core):
+                    d["pattern_tokens"] += 1
+                    d["pattern_correct"] += ok
+                    d["ambiguous"] += mode["candidates"](core, trie) > 1
+
+        for sh, times in _shape_latency(mode, lines, trie, model).items():
+            shapes.setdefault(sh, []).extend(times)
+
+        per_doc[doc["name"]] = {
+            "token_accuracy": round(d["correct"] / d["tokens"], 4) if d["tokens"] else None,
+            "pattern_accuracy": round(d["pattern_correct"] / d["pattern_tokens"], 4) if d["pattern_tokens"] else None,
+            "ambiguous_rate": round(d["ambiguous"] / d["pattern_tokens"], 4) if d["pattern_tokens"] else None,
+            "tokens_per_sec": round(d["tokens"] / best_secs, 1) if best_secs else None,
+        }
+        for k in d:
+            totals[k] += d[k]
+        totals["seconds"] += best_secs
+
+    n, p = totals["tokens"], totals["pattern_tokens"]
+    return {
+        "documents": per_doc,
+        "total": {
+            "tokens": n,
+            "pattern_tokens": p,
+            "token_accuracy": round(totals["correct"] / n, 4) if n else None,
+            "pattern_accuracy": round(totals["pattern_correct"] / p, 4) if p else None,
+            "ambiguous_rate": round(totals["ambiguous"] / p, 4) if p else None,
+            "tokens_per_sec": round(n / totals["seconds"], 1) if totals["seconds"] else None,
+        },
+        "shape_latency_ms": {
+            sh: {"count": len(ts), "mean": round(1000 * sum(ts) / len(ts), 4),
+                 "max": round(1000 * max(ts), 4)}
+            for sh, ts in sorted(shapes.items())
+        },
+    }
+
+
+def evaluate(trie_path: str, docs_dir: str, model: Optional[NGramModel] = None,
+             modes: Optional[List[str]] = None, repeats: int = 3) -> dict:
+    trie = PrefixTrie()
+    trie.load_from_word_freq_file(trie_path)
+    docs = find_documents(docs_dir)
+    report = {"trie": trie_path, "documents": [d["name"] for d in docs], "modes": {}}
+    for name in modes or list(MODES):
+        if MODES[name].get("needs_model") and model is None:
+            continue
+        report["modes"][name] = evaluate_mode(name, docs, trie, model, repeats)
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.2) -> List[str]:
+    """Regressions of `report` vs `baseline`: any accuracy drop, or throughput below (1 - tolerance)."""
+    problems = []
+    for name, base in baseline.get("modes", {}).items():
+        cur = report["modes"].get(name)
+        if cur is None:
+            problems.append(f"{name}: missing from report")
+            continue
+        for key in ("token_accuracy", "pattern_accuracy"):
+            b, c = base["total"].get(key), cur["total"].get(key)
+            if b is not None and (c is None or c < b):
+                problems.append(f"{name}: {key} {b} -> {c}")
+        b, c = base["total"].get("tokens_per_sec"), cur["total"].get("tokens_per_sec")
+        if b and (c is None or c < b * (1 - tolerance)):
+            problems.append(f"{name}: tokens_per_sec {b} -> {c}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    here = os.path.dirname(os.path.abspath(__file__))
+    docs_default = os.path.normpath(os.path.join(here, "..", "..", "docs"))
+    ap = argparse.ArgumentParser(description="Evaluate restore modes against docs/*_defect.txt references.")
+    ap.add_argument("--trie", default=os.path.join(docs_default, "stopwordsFreq.txt"))
+    ap.add_argument("--docs", default=docs_default)
+    ap.add_argument("--mode", action="append", choices=list(MODES), help="repeatable; default: all")
+    ap.add_argument("--ngram-model", help="saved n-gram model for pattern_context")
+    ap.add_argument("--ngram-text", action="append", help="clean text to build the n-gram model from")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--out", help="write the JSON report here instead of stdout")
+    ap.add_argument("--baseline", help="JSON report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative throughput drop")
+    args = ap.parse_args(argv)
+
+    model = None
+    if args.ngram_model:
+        model = NGramModel.load(args.ngram_model)
+    elif args.ngram_text:
+        model = NGramModel.from_files(args.ngram_text)
+
+    report = evaluate(args.trie, args.docs, model, args.mode, args.repeats)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for p in problems:
+            print("REGRESSION:", p, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
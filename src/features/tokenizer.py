@@ -0,0 +1,91 @@
+# src/features/tokenizer.py
+# Single-pass scanner and token helpers shared by the restore pipelines.
+from __future__ import annotations
+import re
+from typing import Iterator, List, Tuple
+
+# (start, end, pre, core, post) of one pattern-bearing token in a line
+Span = Tuple[int, int, str, str, str]
+
+
+class PatternTokenizer:
+    """
+    Finds the whitespace-delimited tokens of a line whose core contains a
+    pattern mark, with one compiled regex and a single `finditer` pass.
+
+    A token is split into (pre, core, post): `core` is the run of core
+    characters and pre/post are the surrounding punctuation. A token that
+    has a mark but not that shape (e.g. 'a*b-c' for the '*' tokenizer) is
+    reported whole as its core, like the old per-token `re.match` fallback.
+    Clean text between matches is never touched, so whitespace is kept.
+
+    core_chars and marks are regex character-class bodies; marks must be a
+    subset of core_chars.
+    """
+    def __init__(self, core_chars: str, marks: str):
+        self.core_chars = core_chars
+        self.marks = marks
+        self._re = re.compile(
+            rf"(?<!\S)([^\s{core_chars}]*)([{core_chars}]*[{marks}][{core_chars}]*)([^\s{core_chars}]*)(?!\S)"
+            rf"|(?<!\S)\S*[{marks}]\S*"
+        )
+
+    def scan(self, line: str) -> Iterator[Span]:
+        for m in self._re.finditer(line):
+            core = m.group(2)
+            if core is None:
+                yield m.start(), m.end(), "", m.group(), ""
+            else:
+                yield m.start(), m.end(), m.group(1), core, m.group(3)
+
+
+# core characters of a Glob+ token (pattern menu) and of a '*' token (predict menu)
+GLOB_CORE_CHARS = r"A-Za-z0-9\?\*\[\]-"
+WILDCARD_CORE_CHARS = r"\w\*"
+
+# tokens whose core contains a Glob+ mark (?, * or [)
+GLOB_TOKENS = PatternTokenizer(GLOB_CORE_CHARS, r"\?\*\[")
+# tokens whose core ([\w*]+) contains a '*' wildcard
+WILDCARD_TOKENS = PatternTokenizer(WILDCARD_CORE_CHARS, r"*")
+
+
+def split_token(tok: str, core_chars: str = GLOB_CORE_CHARS) -> Tuple[str, str, str]:
+    """
+    Split one token into (pre, core, post), where core is the run of
+    `core_chars` and pre/post the punctuation around it.
+    Examples (Glob+ core):
+      'th**,'   -> ('', 'th**', ',')
+      '"H*se."' -> ('"', 'H*se', '."')
+      'word'    -> ('', 'word', '')
+    A token without that shape is returned whole as its core.
+    """
+    m = re.match(rf"^([^{core_chars}]*)([{core_chars}]+)([^{core_chars}]*)$", tok)
+    return m.groups() if m else ("", tok, "")
+
+
+def apply_casing(orig: str, repl: str) -> str:
+    """
+    Preserve casing style of 'orig' in 'repl':
+      - ALL CAPS -> upper()
+      - First letter capitalized -> capitalize()
+      - else -> as-is
+    """
+    if orig.isupper():
+        return repl.upper()
+    if orig[:1].isupper() and (len(orig) == 1 or orig[1:].islower()):
+        return repl.capitalize()
+    return repl
+
+
+def splice(line: str, edits: List[Tuple[int, int, str]]) -> str:
+    """Apply (start, end, text) replacements given in increasing, non-overlapping order."""
+    if not edits:
+        return line
+    out: List[str] = []
+    last = 0
+    for start, end, text in edits:
+        out.append(line[last:start])
+        out.append(text)
+        last = end
+    out.append(line[last:])
+    return "".join(out)
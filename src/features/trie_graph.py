@@ -32,8 +32,7 @@ def show_trie_graph(trie, prefix='', word=None):
     # 2) build graph (whole subtree), store terminal + freq
     G = nx.DiGraph()
     root = '' if prefix == '' else prefix   # blank root label
-    freq_of = lambda n: getattr(n, "frequency", 0)
-    G.add_node(root, terminal=getattr(node, 'is_end', False), freq=freq_of(node))
+    G.add_node(root, terminal=node.is_end, freq=node.frequency)
 
     q = deque([(node, prefix)])
     while q:
@@ -41,7 +40,7 @@ def show_trie_graph(trie, prefix='', word=None):
         parent = root if path == '' else path
         for ch, child in sorted(cur.children.items()):   # stable alphabetical rows
             nxt = path + ch
-            G.add_node(nxt, terminal=getattr(child, 'is_end', False), freq=freq_of(child))
+            G.add_node(nxt, terminal=child.is_end, freq=child.frequency)
             G.add_edge(parent, nxt)
             q.append((child, nxt))
 
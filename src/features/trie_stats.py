@@ -1,10 +1,12 @@
 # features/trie_stats.py
-# Dataset-centric Top-5 trie stats. No external imports.
+# Dataset-centric Top-5 trie stats.
+import heapq
 
 # Expected trie API:
 #   trie.root.children : dict[char -> node]
 #   node.is_end : bool
 #   node.frequency : int
+#   node.count / node.mass : words / frequency sum at or below the node
 
 def _walk_paths(trie):
     stack = [("", trie.root, 0)]
@@ -14,24 +16,19 @@ def _walk_paths(trie):
         for ch, child in node.children.items():
             stack.append((path + ch, child, depth + 1))
 
-def _postorder(root):
-    a = [root]; b = []
-    while a:
-        n = a.pop(); b.append(n)
-        for c in n.children.values():
-            a.append(c)
-    b.reverse()
-    return b
-
-def _subtree_word_count(root):
-    # node -> number of word-ends in subtree
-    count = {}
-    for node in _postorder(root):
-        total = 1 if getattr(node, "is_end", False) else 0
-        for child in node.children.values():
-            total += count[child]
-        count[node] = total
-    return count
+def _top_prefixes(root, top_k):
+    # best-first on the per-node word counts: a child never has more words
+    # than its parent and sorts after it, so pops come out in (-count, prefix)
+    # order and only about top_k * fanout nodes are looked at
+    heap = [(-child.count, ch, child) for ch, child in root.children.items()]
+    heapq.heapify(heap)
+    out = []
+    while heap and len(out) < top_k:
+        neg, p, node = heapq.heappop(heap)
+        out.append((p, -neg))
+        for ch, child in node.children.items():
+            heapq.heappush(heap, (-child.count, p + ch, child))
+    return out
 
 def compute_stats(trie, top_k=5):
     # pass 1: collect vocabulary + lengths + frequencies
@@ -43,8 +40,8 @@ def compute_stats(trie, top_k=5):
     longest_word = ""
 
     for path, node, depth in _walk_paths(trie):
-        if getattr(node, "is_end", False):
-            f = getattr(node, "frequency", 0)
+        if node.is_end:
+            f = node.frequency
             vocab.append((path, f))
             length_sum += depth
             if min_len is None or depth < min_len:
@@ -60,10 +57,7 @@ def compute_stats(trie, top_k=5):
     # average & median frequency
     if vocab_size:
         freqs = [f for _, f in vocab]
-        total_tokens = 0
-        for v in freqs:
-            total_tokens += v
-        avg_frequency = total_tokens / vocab_size
+        avg_frequency = trie.root.mass / vocab_size
         freqs.sort()
         mid = vocab_size // 2
         median_frequency = freqs[mid] if vocab_size % 2 == 1 else (freqs[mid - 1] + freqs[mid]) / 2
@@ -75,21 +69,11 @@ def compute_stats(trie, top_k=5):
         min_len = 0
         shortest_word = "-"
 
-    # pass 2: prefix coverage (word-count per prefix)
-    subtree_words = _subtree_word_count(trie.root)
-
-    path_of = {}
-    for path, node, _ in _walk_paths(trie):
-        path_of[node] = path
-
-    prefix_counts = []
-    for node, p in path_of.items():
-        if p != "":
-            prefix_counts.append((p, subtree_words[node]))
+    # prefix coverage (word-count per prefix), read off the node aggregates
+    prefix_counts = _top_prefixes(trie.root, top_k)
 
     # top lists + most/least frequent words
     vocab.sort(key=lambda x: (-x[1], x[0]))
-    prefix_counts.sort(key=lambda x: (-x[1], x[0]))
 
     if vocab_size:
         most_word, most_freq = vocab[0]
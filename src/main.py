@@ -6,6 +6,9 @@ from ui.predict_cli import run_predict_cli
 from ui.merge_cli import run_merge_cli
 from ui.trie_graph_cli import preview_trie_map
 from ui.stats_cli import show_stats_menu
+from ui.registry_cli import run_registry_cli
+from trie.registry import TrieRegistry
+from features.glob_planner import index_bytes
 
 def show_main_menu():
     border = "*" * 60
@@ -15,7 +18,7 @@ def show_main_menu():
     print("*  - Class DAAA/FT/2A/02".ljust(59) + "*")
     print(border)
     print()
-    print("Please select your choice ('1','2','3','4','5','6','7'):")
+    print("Please select your choice ('1','2','3','4','5','6','7','8'):")
     print("1. Construct/Edit Trie")
     print("2. Predict/Restore Text")
     print("-" * 44)
@@ -25,12 +28,17 @@ def show_main_menu():
     print("5. PrefixTree Visualizer (Tee Lin Kai):")
     print("6. Trie Stats (Tee Lin Kai):")
     print("-" * 44)
-    print("7. Exit")
+    print("7. Trie Registry (switch active trie)")
+    print("8. Exit")
     print("Enter choice: ", end="")
 
 def main():
-    trie = PrefixTrie()
+    registry = TrieRegistry(extra_bytes=index_bytes)
+    registry.add("default", PrefixTrie())
+    trie = registry.activate("default")
     while True:
+        for msg in registry.poll_loads():
+            print(msg)
         show_main_menu()
         choice = input().strip()
 
@@ -52,12 +60,16 @@ def main():
         elif choice == '6':    
             show_stats_menu(trie)
 
-        elif choice in ['7', 'exit', 'q', 'quit']:
+        elif choice == '7':
+            trie = run_registry_cli(registry)
+
+        elif choice in ['8', 'exit', 'q', 'quit']:
+            registry.close()
             print("Goodbye!")
             break
 
         else:
-            print("Invalid choice. Please select 1–7.")
+            print("Invalid choice. Please select 1–8.")
 
 if __name__ == "__main__":
     main()
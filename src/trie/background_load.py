@@ -0,0 +1,183 @@
+# src/trie/background_load.py
+# Load a word,frequency file into a PrefixTrie without blocking the session.
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+CHUNK_LINES = 50_000        # lines parsed per insert_many call on the worker
+
+
+def _parse_line(raw: bytes) -> Optional[Tuple[str, int]]:
+    """One 'word,freq' line -> (word, freq) like prefix_trie._read_word_freq, or None if blank."""
+    line = raw.decode("utf-8").strip()
+    if not line:
+        return None
+    parts = line.split(',')
+    try:
+        return parts[0], int(parts[1])
+    except (IndexError, ValueError):
+        return parts[0], 1
+
+
+def _outermost(prefixes: Iterable[str]) -> Tuple[str, ...]:
+    """Drop empty prefixes and those already covered by a shorter one ('th' under 't')."""
+    kept: List[str] = []
+    for p in sorted(set(p for p in prefixes if p)):
+        if not kept or not p.startswith(kept[-1]):
+            kept.append(p)
+    return tuple(kept)
+
+
+class BackgroundLoad:
+    """
+    Build a fresh trie from a word,frequency file on a worker thread while
+    the live trie keeps answering queries.
+
+    The worker only ever touches its own scratch PrefixTrie; the live trie is
+    changed solely by poll() and cancel(), which the session calls between
+    commands, so a query never sees a half-swapped root or a version that
+    does not match it. When the file is done, poll() installs the new root
+    in one step (see PrefixTrie._install_root); if reading fails or the load
+    is cancelled, the live trie is put back as it was. Edits made to the
+    live trie during the load are replaced by the file's contents, as with
+    a blocking load; the menus refuse them while a load is pending, and
+    poll() says so if the trie was changed anyway.
+
+    With `priority` prefixes the file is read twice: the first pass inserts
+    only words under those prefixes, and as soon as it finishes poll()
+    grafts the finished subtrees into the live trie so 'th*' can already
+    use the new data. The subtrees they replace are kept until the load
+    ends, so an error or cancel can graft them back. The second pass loads
+    everything else.
+    """
+    def __init__(self, trie, filepath: str, priority: Iterable[str] = (),
+                 chunk_lines: int = CHUNK_LINES):
+        from .prefix_trie import PrefixTrie
+        self.trie = trie
+        self.filepath = filepath
+        self.priority = _outermost(priority)
+        self.chunk_lines = chunk_lines
+        self.total_bytes = os.path.getsize(filepath) * (2 if self.priority else 1)
+        self.bytes_read = 0
+        self.words = 0
+        self.started = 0.0
+        self.finished: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self._fresh = PrefixTrie()
+        self._grafts_ready = False      # set by the worker after the priority pass
+        self._grafted = False           # set by poll() once they are live
+        self._replaced: List[Tuple[str, object]] = []   # (prefix, live subtree it replaced)
+        self._version = trie.version    # live trie version after our last change to it
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="trie-load", daemon=True)
+
+    def start(self) -> "BackgroundLoad":
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """Stop the worker and take back any priority grafts; call it on the session thread."""
+        self._cancel.set()
+        self._thread.join()
+        self._rollback()
+
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    # --- worker ------------------------------------------------------------
+
+    def _run(self) -> None:
+        # the collector is left alone: insert_many never touches it, and a
+        # pause here would be interpreter-wide, stopping collection for the
+        # session and prefetch threads for the whole load
+        try:
+            if self.priority:
+                self._pass(lambda w: w.startswith(self.priority))
+                self._grafts_ready = True
+                self._pass(lambda w: not w.startswith(self.priority))
+            else:
+                self._pass(None)
+        except BaseException as e:
+            self.error = e
+        self.finished = time.perf_counter()
+
+    def _pass(self, keep) -> None:
+        chunk: List[Tuple[str, int]] = []
+        with open(self.filepath, "rb") as f:
+            for raw in f:
+                self.bytes_read += len(raw)
+                item = _parse_line(raw)
+                if item is None or (keep is not None and not keep(item[0])):
+                    continue
+                chunk.append(item)
+                if len(chunk) >= self.chunk_lines:
+                    self._flush(chunk)
+                    chunk = []
+        self._flush(chunk)
+
+    def _flush(self, chunk: List[Tuple[str, int]]) -> None:
+        if self._cancel.is_set():
+            raise InterruptedError("load cancelled")
+        if chunk:
+            added, _ = self._fresh.insert_many(chunk)
+            self.words += added
+
+    # --- session side -------------------------------------------------------
+
+    def _rollback(self) -> None:
+        """Put back the live subtrees the priority grafts replaced."""
+        for prefix, old in reversed(self._replaced):
+            self.trie._graft(prefix, old, copy=False)
+        self._replaced.clear()
+
+    def progress(self) -> dict:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        elapsed = max(end - self.started, 1e-9)
+        return {"file": self.filepath, "bytes_read": self.bytes_read,
+                "total_bytes": self.total_bytes, "words": self.words,
+                "seconds": elapsed, "bytes_per_sec": self.bytes_read / elapsed,
+                "phase": ("priority" if self.priority and not self._grafts_ready else "full")}
+
+    def describe(self) -> str:
+        p = self.progress()
+        mib = 1024 * 1024
+        pct = 100.0 * p["bytes_read"] / p["total_bytes"] if p["total_bytes"] else 100.0
+        phase = f" [{'/'.join(self.priority)} first]" if p["phase"] == "priority" else ""
+        return (f"Loading {p['file']}{phase}: {p['bytes_read'] / mib:.1f} / "
+                f"{p['total_bytes'] / mib:.1f} MiB ({pct:.0f}%), "
+                f"{p['bytes_per_sec'] / mib:.1f} MiB/s, {p['words']:,} words, {p['seconds']:.1f} s")
+
+    def poll(self) -> Optional[str]:
+        """
+        Publish whatever the worker has finished into the live trie; call it
+        on the thread that serves queries. Returns a message to show when
+        something changed, else None.
+        """
+        if self._grafts_ready and not self._grafted:
+            self._grafted = True
+            if self.error is None and not self._cancel.is_set():
+                for prefix in self.priority:
+                    self._replaced.append((prefix, self.trie._node_at(prefix)))
+                    self.trie._graft(prefix, self._fresh._node_at(prefix))
+                self._version = self.trie.version
+                if not self.done:
+                    n = sum(self.trie.count_prefix(p) for p in self.priority)
+                    return f"Prefixes {', '.join(self.priority)} loaded early ({n:,} words)."
+        if not self.done or self._cancel.is_set():
+            return None
+        if self.error is not None:
+            self._rollback()
+            if isinstance(self.error, InterruptedError):
+                return None
+            return f"Error loading keywords: {self.error}; the trie keeps its previous keywords."
+        edited = self.trie.version != self._version
+        self._replaced.clear()
+        self.trie._install_root(self._fresh.root)
+        p = self.progress()
+        return (f"Keywords loaded from {self.filepath} into trie "
+                f"({p['words']:,} words in {p['seconds']:.1f} s)."
+                + (" Edits made during the load were replaced." if edited else ""))
@@ -0,0 +1,127 @@
+# src/trie/completion.py
+from __future__ import annotations
+import heapq
+from typing import List, Optional, Tuple
+
+from .trie_node import TrieNode
+
+TOPK_CACHED = 10            # completions kept per cached node
+TOPK_CACHE_NODES = 4096     # cache is dropped wholesale past this many nodes
+
+
+def _rank(item: Tuple[str, int]):
+    # highest frequency first, then alphabetical (same order as glob_match)
+    return -item[1], item[0]
+
+
+def subtree_topk(trie, node: TrieNode) -> Tuple[Tuple[str, int], ...]:
+    """
+    Top TOPK_CACHED (suffix, frequency) pairs of the words below `node`,
+    memoised in trie.topk_cache. Suffixes are relative to `node`, so an entry
+    stays valid for any prefix that reaches it. The scan reuses the cached
+    lists of descendants instead of walking their subtrees again.
+    """
+    cache = trie.topk_cache
+    top = cache.get(node)
+    if top is not None:
+        return top
+
+    def candidates():
+        stack = [(node, "")]
+        while stack:
+            n, suffix = stack.pop()
+            if n is not node:
+                hit = cache.get(n)
+                if hit is not None:
+                    for s, f in hit:
+                        yield suffix + s, f
+                    continue
+            if n.is_end:
+                yield suffix, n.frequency
+            for ch, child in n.children.items():
+                stack.append((child, suffix + ch))
+
+    top = tuple(heapq.nsmallest(TOPK_CACHED, candidates(), key=_rank))
+    if len(cache) >= TOPK_CACHE_NODES:
+        cache.clear()
+    cache[node] = top
+    return top
+
+
+class CompletionCursor:
+    """
+    Incremental prefix completion over a PrefixTrie.
+
+    The cursor keeps the node path of the prefix typed so far: push(ch) and
+    pop() move one edge, and completions() reads the per-node top-k cache,
+    so a keystroke costs O(1) descent plus a bounded fetch instead of a new
+    glob_match(prefix + '*') from the root. If the trie changes (its version
+    moves) the path is re-descended from the root on the next call.
+    """
+    def __init__(self, trie, k: int = 5):
+        self.trie = trie
+        self.k = k
+        self._chars: List[str] = []
+        # path[d] = node reached by the first d chars (None once off the trie)
+        self._path: List[Optional[TrieNode]] = [trie.root]
+        self._version = trie.version
+
+    @property
+    def prefix(self) -> str:
+        return "".join(self._chars)
+
+    @property
+    def node(self) -> Optional[TrieNode]:
+        self._sync()
+        return self._path[-1]
+
+    def _sync(self) -> None:
+        if self._version == self.trie.version:
+            return
+        path: List[Optional[TrieNode]] = [self.trie.root]
+        for ch in self._chars:
+            n = path[-1]
+            path.append(n.children.get(ch) if n is not None else None)
+        self._path = path
+        self._version = self.trie.version
+
+    def push(self, ch: str) -> bool:
+        """Extend the prefix by `ch`; returns False once the prefix has left the trie."""
+        self._sync()
+        n = self._path[-1]
+        nxt = n.children.get(ch) if n is not None else None
+        self._chars.append(ch)
+        self._path.append(nxt)
+        return nxt is not None
+
+    def pop(self) -> Optional[str]:
+        """Remove and return the last character (None at the empty prefix)."""
+        if not self._chars:
+            return None
+        self._path.pop()
+        return self._chars.pop()
+
+    def reset(self) -> None:
+        self._chars = []
+        self._path = [self.trie.root]
+        self._version = self.trie.version
+
+    def completions(self, k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Most frequent (word, frequency) pairs starting with the current prefix."""
+        k = self.k if k is None else k
+        n = self.node
+        if n is None or k <= 0:
+            return []
+        prefix = self.prefix
+        if k <= TOPK_CACHED:
+            return [(prefix + s, f) for s, f in subtree_topk(self.trie, n)[:k]]
+        # more than the cache holds: rank the whole subtree
+        found: List[Tuple[str, int]] = []
+        stack = [(n, prefix)]
+        while stack:
+            node, word = stack.pop()
+            if node.is_end:
+                found.append((word, node.frequency))
+            for ch, child in node.children.items():
+                stack.append((child, word + ch))
+        return heapq.nsmallest(k, found, key=_rank)
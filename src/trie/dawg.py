@@ -0,0 +1,278 @@
+# src/trie/dawg.py
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Tuple
+
+from .match_cache import MatchCache, MISSING
+from .prefix_trie import PrefixTrie
+
+
+class _BuildState:
+    """Temporary mutable state used while minimizing."""
+    __slots__ = ("edges", "final", "num")
+
+    def __init__(self):
+        self.edges: list = []     # [(char, _BuildState)] in sorted order
+        self.final = False
+        self.num = -1             # id once registered
+
+
+def _minimize(path: list, depth: int, register: dict) -> None:
+    """
+    Replace-or-register every state on `path` deeper than `depth`, bottom-up.
+    A state equivalent to an already registered one (same finality, same
+    labelled edges to the same registered targets) is replaced by it.
+    """
+    for i in range(len(path) - 1, depth, -1):
+        child, parent = path[i], path[i - 1]
+        sig = (child.final, tuple((ch, t.num) for ch, t in child.edges))
+        twin = register.get(sig)
+        if twin is not None:
+            parent.edges[-1] = (parent.edges[-1][0], twin)
+        else:
+            child.num = len(register)
+            register[sig] = child
+    del path[depth + 1:]
+
+
+class FrozenDawg:
+    """
+    Read-only minimized acyclic word graph (DAWG) built from sorted words.
+
+    Shared suffixes are stored once, so per-word frequencies cannot live on
+    states; instead every edge carries the number of words it skips in
+    lexicographic order, and the sum of those offsets along a word's path is
+    its index into the `freqs` array (minimal perfect hashing).
+
+    Layout (all flat sequences, root is state 0):
+      first[s] .. first[s+1]  edge range of state s (labels sorted)
+      final[s]                1 if state s ends a word
+      labels[e]               code point of edge e
+      targets[e]              destination state of edge e
+      offsets[e]              words skipped by taking edge e
+      freqs[i]                frequency of the i-th word in sorted order
+    """
+    def __init__(self, first, final, labels, targets, offsets, freqs):
+        self.first = first
+        self.final = final
+        self.labels = labels
+        self.targets = targets
+        self.offsets = offsets
+        self.freqs = freqs
+        # read-only: the version never changes, so the cache never goes stale
+        self.version = 0
+        self.match_cache = MatchCache()
+
+    # --- construction ----------------------------------------------------
+
+    @classmethod
+    def from_sorted_items(cls, items: Iterable[Tuple[str, int]]) -> "FrozenDawg":
+        """Build from (word, freq) pairs in strictly increasing word order."""
+        register: dict = {}
+        root = _BuildState()
+        path = [root]
+        prev = None
+        freqs = array("q")
+        for word, freq in items:
+            if prev is not None and word <= prev:
+                raise ValueError("Input must be sorted and free of duplicates")
+            common = 0
+            if prev is not None:
+                n = min(len(prev), len(word))
+                while common < n and prev[common] == word[common]:
+                    common += 1
+            _minimize(path, common, register)
+            node = path[-1]
+            for ch in word[common:]:
+                nxt = _BuildState()
+                node.edges.append((ch, nxt))
+                path.append(nxt)
+                node = nxt
+            node.final = True
+            freqs.append(freq)
+            prev = word
+        _minimize(path, 0, register)
+        return cls._flatten(root, freqs)
+
+    @classmethod
+    def _flatten(cls, root: _BuildState, freqs: array) -> "FrozenDawg":
+        # number states breadth-first from the root (root = 0)
+        order: list = [root]
+        num = {id(root): 0}
+        i = 0
+        while i < len(order):
+            for _, t in order[i].edges:
+                if id(t) not in num:
+                    num[id(t)] = len(order)
+                    order.append(t)
+            i += 1
+
+        # words in each state's right language; registration numbers are handed
+        # out children-first, so ascending `num` (root last) is bottom-up
+        count = [0] * len(order)
+        for st in sorted(order[1:], key=lambda st: st.num) + [root]:
+            count[num[id(st)]] = int(st.final) + sum(count[num[id(t)]] for _, t in st.edges)
+
+        first = array("I", [0])
+        final = bytearray(len(order))
+        labels, targets, offsets = array("I"), array("I"), array("I")
+        for s, st in enumerate(order):
+            final[s] = st.final
+            skip = int(st.final)
+            for ch, t in st.edges:
+                tn = num[id(t)]
+                labels.append(ord(ch))
+                targets.append(tn)
+                offsets.append(skip)
+                skip += count[tn]
+            first.append(len(labels))
+        return cls(first, bytes(final), labels, targets, offsets, freqs)
+
+    def thaw(self) -> PrefixTrie:
+        """Return a mutable PrefixTrie with the same words and frequencies."""
+        trie = PrefixTrie()
+        trie.insert_many(self.items())
+        return trie
+
+    # --- navigation ------------------------------------------------------
+
+    def _edge(self, state: int, ch: str) -> int:
+        """Index of the edge labelled `ch` out of `state`, or -1."""
+        lo, hi = self.first[state], self.first[state + 1]
+        code = ord(ch)
+        i = bisect_left(self.labels, code, lo, hi)
+        if i < hi and self.labels[i] == code:
+            return i
+        return -1
+
+    def _walk(self, word: str) -> Tuple[int, int]:
+        """Return (state, word index) after reading `word`, or (-1, -1)."""
+        state, idx = 0, 0
+        for ch in word:
+            e = self._edge(state, ch)
+            if e < 0:
+                return -1, -1
+            idx += self.offsets[e]
+            state = self.targets[e]
+        return state, idx
+
+    def _out(self, state: int):
+        """Yield (char, target, offset) for every edge out of `state`."""
+        for e in range(self.first[state], self.first[state + 1]):
+            yield chr(self.labels[e]), self.targets[e], self.offsets[e]
+
+    # --- queries ---------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.freqs)
+
+    def search(self, word: str) -> bool:
+        state, _ = self._walk(word)
+        return state >= 0 and bool(self.final[state])
+
+    def get_frequency(self, word: str) -> int:
+        state, idx = self._walk(word)
+        if state < 0 or not self.final[state]:
+            return 0
+        return self.freqs[idx]
+
+    def items(self) -> List[Tuple[str, int]]:
+        """All (word, frequency) pairs in sorted order."""
+        out: List[Tuple[str, int]] = []
+        stack = [(0, "", 0)]
+        while stack:
+            state, prefix, idx = stack.pop()
+            if self.final[state]:
+                out.append((prefix, self.freqs[idx]))
+            edges = list(self._out(state))
+            for ch, t, off in reversed(edges):
+                stack.append((t, prefix + ch, idx + off))
+        return out
+
+    def list_words(self) -> List[str]:
+        return [w for w, _ in self.items()]
+
+    def wildcard_match(self, pattern: str) -> List[str]:
+        """Words matching `pattern`, where '*' matches exactly one character."""
+        key = ('wildcard', pattern, None, self.version)
+        cached = self.match_cache.get(key)
+        if cached is not MISSING:
+            return list(cached)
+        results: List[str] = []
+
+        def _dfs(state: int, prefix: str, i: int) -> None:
+            if i == len(pattern):
+                if self.final[state]:
+                    results.append(prefix)
+                return
+            ch = pattern[i]
+            if ch == '*':
+                for c, t, _ in self._out(state):
+                    _dfs(t, prefix + c, i + 1)
+            else:
+                e = self._edge(state, ch)
+                if e >= 0:
+                    _dfs(self.targets[e], prefix + ch, i + 1)
+
+        _dfs(0, "", 0)
+        self.match_cache.put(key, tuple(results))
+        return results
+
+    def best_match(self, pattern: str) -> Optional[str]:
+        """Highest-frequency word for a '*' (single char) pattern."""
+        key = ('best', pattern, None, self.version)
+        cached = self.match_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        best_word, best_freq = None, -1
+        for word in self.wildcard_match(pattern):
+            f = self.get_frequency(word)
+            if f > best_freq:
+                best_word, best_freq = word, f
+        self.match_cache.put(key, best_word)
+        return best_word
+
+    def glob_match(self, pattern: str, top_k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Glob+ match (same syntax and ordering as features.pattern.glob_match)."""
+        from features.pattern import _parse_pattern
+
+        key = ('glob', pattern, top_k, self.version)
+        cached = self.match_cache.get(key)
+        if cached is not MISSING:
+            return list(cached)
+
+        tokens = _parse_pattern(pattern)
+        best: dict = {}
+
+        def dfs(state: int, ti: int, prefix: str, idx: int) -> None:
+            if ti == len(tokens):
+                if self.final[state]:
+                    best[prefix] = self.freqs[idx]
+                return
+            kind, payload = tokens[ti]
+            if kind == 'LIT':
+                e = self._edge(state, payload)
+                if e >= 0:
+                    dfs(self.targets[e], ti + 1, prefix + payload, idx + self.offsets[e])
+            elif kind == 'ANY':
+                for c, t, off in self._out(state):
+                    dfs(t, ti + 1, prefix + c, idx + off)
+            elif kind == 'SET':
+                for c in payload:
+                    e = self._edge(state, c)
+                    if e >= 0:
+                        dfs(self.targets[e], ti + 1, prefix + c, idx + self.offsets[e])
+            elif kind == 'STAR':
+                dfs(state, ti + 1, prefix, idx)
+                for c, t, off in self._out(state):
+                    dfs(t, ti, prefix + c, idx + off)
+
+        dfs(0, 0, "", 0)
+        ranked = sorted(best.items(), key=lambda x: (-x[1], x[0]))
+        out = ranked[:top_k] if top_k is not None else ranked
+        self.match_cache.put(key, tuple(out))
+        return out
+
+    def stats(self) -> dict:
+        return {"words": len(self.freqs), "states": len(self.final), "edges": len(self.labels)}
@@ -0,0 +1,210 @@
+# src/trie/delta.py
+# Diff two tries (or word,freq snapshots) into a delta file, and apply it.
+#
+#   cd src && python -m trie.delta diff OLD.txt NEW.txt OUT.delta
+#   cd src && python -m trie.delta apply BASE.txt IN.delta OUT.txt
+#
+# File format: one header line, then one line per changed word in sorted
+# order, front-coded against the previous word:
+#
+#   #delta v1<TAB>base=<words>,<mass><TAB>target=<words>,<mass>
+#   +<shared><TAB><suffix><TAB><freq>      word added with this frequency
+#   -<shared><TAB><suffix>                 word deleted
+#   =<shared><TAB><suffix><TAB><freq>      frequency changed to <freq>
+from __future__ import annotations
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from .prefix_trie import PrefixTrie
+
+MAGIC = "#delta v1"
+OP_ADD, OP_DELETE, OP_CHANGE = "+", "-", "="
+
+Change = Tuple[str, str, int]       # (op, word, new frequency; 0 for a delete)
+
+
+def _sorted_children(node):
+    kids = node.children
+    return sorted(kids.items()) if kids else ()
+
+
+def subtree_hash(node) -> int:
+    """
+    Hash of the words (and frequencies) at or below `node`, kept in
+    node.digest until an edit below clears it. Equal subtrees of two tries
+    hash alike, which is what lets diff() skip them.
+    """
+    h = node.digest
+    if h is None:
+        h = node.digest = hash((node.frequency if node.is_end else -1,
+                                tuple([(ch, subtree_hash(child)) for ch, child in _sorted_children(node)])))
+    return h
+
+
+def _as_trie(src) -> PrefixTrie:
+    """A PrefixTrie as is, or one loaded from a word,freq snapshot file."""
+    if isinstance(src, PrefixTrie):
+        return src
+    trie = PrefixTrie()
+    trie.load_from_word_freq_file(src)
+    return trie
+
+
+def _words_below(node, prefix: str) -> Iterator[Tuple[str, int]]:
+    """(word, freq) of a subtree, in sorted order."""
+    stack = [(node, prefix)]
+    while stack:
+        n, word = stack.pop()
+        if n.is_end:
+            yield word, n.frequency
+        stack.extend((child, word + ch) for ch, child in reversed(list(_sorted_children(n))))
+
+
+def diff(old, new) -> Iterator[Change]:
+    """
+    The changes that turn `old` into `new` (PrefixTries or snapshot files),
+    in word order. Both tries are walked together and a pair of subtrees
+    with equal hashes is skipped without being entered. Edits only clear
+    the hashes on their own paths, so diffing a trie again after a batch
+    of changes rehashes just those paths.
+    """
+    old, new = _as_trie(old), _as_trie(new)
+    stack = [(old.root, new.root, "")]
+    while stack:
+        a, b, word = stack.pop()
+        if a is None:
+            yield from ((OP_ADD, w, f) for w, f in _words_below(b, word))
+            continue
+        if b is None:
+            yield from ((OP_DELETE, w, 0) for w, _ in _words_below(a, word))
+            continue
+        if subtree_hash(a) == subtree_hash(b):
+            continue
+        if a.is_end and not b.is_end:
+            yield OP_DELETE, word, 0
+        elif b.is_end and not a.is_end:
+            yield OP_ADD, word, b.frequency
+        elif a.is_end and a.frequency != b.frequency:
+            yield OP_CHANGE, word, b.frequency
+        # pushed in reverse so the children pop in sorted order
+        for ch in sorted(set(a.children.keys()) | set(b.children.keys()), reverse=True):
+            stack.append((a.children.get(ch), b.children.get(ch), word + ch))
+
+
+def write_delta(old, new, path: str) -> dict:
+    """Write diff(old, new) to `path`; returns counts of each op, bytes and seconds."""
+    t0 = time.perf_counter()
+    old, new = _as_trie(old), _as_trie(new)
+    stats = {OP_ADD: 0, OP_DELETE: 0, OP_CHANGE: 0}
+    prev = ""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{MAGIC}\tbase={old.root.count},{old.root.mass}"
+                f"\ttarget={new.root.count},{new.root.mass}\n")
+        for op, word, freq in diff(old, new):
+            shared = 0
+            n = min(len(prev), len(word))
+            while shared < n and prev[shared] == word[shared]:
+                shared += 1
+            tail = "" if op == OP_DELETE else f"\t{freq}"
+            f.write(f"{op}{shared}\t{word[shared:]}{tail}\n")
+            stats[op] += 1
+            prev = word
+        size = f.tell()
+    return {"added": stats[OP_ADD], "deleted": stats[OP_DELETE], "changed": stats[OP_CHANGE],
+            "bytes": size, "seconds": time.perf_counter() - t0}
+
+
+def _parse_totals(field: str, name: str) -> Tuple[int, int]:
+    key, _, value = field.partition("=")
+    if key != name:
+        raise ValueError(f"Not a delta file: expected '{name}=' in the header")
+    words, _, mass = value.partition(",")
+    return int(words), int(mass)
+
+
+def read_delta(path: str) -> Tuple[Tuple[int, int], Tuple[int, int], List[Change]]:
+    """Return ((base words, base mass), (target words, target mass), changes) of a delta file."""
+    with open(path, "r", encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split("\t")
+        if header[0] != MAGIC or len(header) != 3:
+            raise ValueError(f"Not a delta file: {path}")
+        base = _parse_totals(header[1], "base")
+        target = _parse_totals(header[2], "target")
+        changes: List[Change] = []
+        prev = ""
+        for lineno, line in enumerate(f, 2):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            op = line[0]
+            parts = line[1:].split("\t")
+            try:
+                word = prev[:int(parts[0])] + parts[1]
+                freq = int(parts[2]) if op != OP_DELETE else 0
+            except (IndexError, ValueError):
+                raise ValueError(f"Malformed delta line {lineno}: {line!r}") from None
+            if op not in (OP_ADD, OP_DELETE, OP_CHANGE):
+                raise ValueError(f"Unknown delta op {op!r} on line {lineno}")
+            changes.append((op, word, freq))
+            prev = word
+    return base, target, changes
+
+
+def apply_delta(trie: PrefixTrie, path: str) -> dict:
+    """
+    Apply a delta file to `trie` with one delete_many and one insert_many
+    batch, so the cost follows the number of changes. The trie must hold
+    the delta's base (checked against the root's word count and frequency
+    mass before anything is changed). Returns op counts and seconds.
+    """
+    t0 = time.perf_counter()
+    base, target, changes = read_delta(path)
+    have = (trie.root.count, trie.root.mass)
+    if have != base:
+        raise ValueError(f"Delta does not apply: trie has {have[0]:,} words / mass {have[1]:,}, "
+                         f"the delta expects {base[0]:,} / {base[1]:,}")
+    deletes = [w for op, w, _ in changes if op == OP_DELETE]
+    adds = [(w, f) for op, w, f in changes if op == OP_ADD]
+    updates = [(w, f) for op, w, f in changes if op == OP_CHANGE]
+    if deletes:
+        trie.delete_many(deletes)
+    if updates:
+        # insert_many adds to a frequency, so send the difference
+        current = trie.get_frequencies([w for w, _ in updates])
+        adds += [(w, f - cur) for (w, f), cur in zip(updates, current)]
+    if adds:
+        trie.insert_many(adds)
+    got = (trie.root.count, trie.root.mass)
+    if got != target:
+        raise ValueError(f"Delta applied but the trie has {got[0]:,} words / mass {got[1]:,}, "
+                         f"not the expected {target[0]:,} / {target[1]:,}")
+    return {"added": len(adds) - len(updates), "deleted": len(deletes), "changed": len(updates),
+            "seconds": time.perf_counter() - t0}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="Diff word,freq snapshots into a delta file, or apply one.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    d = sub.add_parser("diff", help="write the delta from OLD to NEW")
+    d.add_argument("old"); d.add_argument("new"); d.add_argument("out")
+    a = sub.add_parser("apply", help="apply DELTA to BASE and save the result")
+    a.add_argument("base"); a.add_argument("delta"); a.add_argument("out")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "diff":
+        s = write_delta(args.old, args.new, args.out)
+        print(f"{s['added']:,} added, {s['deleted']:,} deleted, {s['changed']:,} changed; "
+              f"{s['bytes']:,} bytes in {s['seconds']:.2f} s", file=sys.stderr)
+    else:
+        trie = _as_trie(args.base)
+        s = apply_delta(trie, args.delta)
+        trie.save_to_file(args.out)
+        print(f"{s['added']:,} added, {s['deleted']:,} deleted, {s['changed']:,} changed "
+              f"in {s['seconds']:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
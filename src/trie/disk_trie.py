@@ -0,0 +1,525 @@
+# src/trie/disk_trie.py
+# Paged on-disk trie. Self-check against PrefixTrie on a dataset many times
+# larger than the page cache (exits 1 on any mismatch):
+#
+#   cd src && python -m trie.disk_trie --words 20000 --cache-pages 8 --page-nodes 32
+from __future__ import annotations
+import heapq
+import marshal
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .match_cache import MatchCache, MISSING
+from .prefix_trie import _read_word_freq
+
+PAGE_NODES = 256            # nodes per page (ids are assigned in depth-first order)
+CACHE_PAGES = 1024          # decoded pages kept in memory
+READAHEAD = 4               # pages fetched together on a miss
+SORT_CHUNK = 200_000        # (word, freq) pairs sorted in memory per run during a merge
+
+# node record: (is_end, frequency, count, child chars as a sorted str, child ids)
+_IS_END, _FREQ, _COUNT, _KEYS, _KIDS = range(5)
+
+
+def _sorted_runs(items: Iterable[Tuple[str, int]], tmpdir: str) -> Iterator[Tuple[str, int]]:
+    """
+    Yield `items` sorted by word with duplicate words summed. Input larger
+    than SORT_CHUNK is sorted in runs spilled to `tmpdir` and merged back.
+    """
+    runs: List[str] = []
+    chunk: List[Tuple[str, int]] = []
+
+    def spill() -> None:
+        chunk.sort()
+        path = os.path.join(tmpdir, f"run{len(runs)}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for w, fr in chunk:
+                f.write(f"{w}\t{fr}\n")
+        runs.append(path)
+        chunk.clear()
+
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= SORT_CHUNK:
+            spill()
+
+    def read_run(path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                w, _, fr = line.rstrip("\n").rpartition("\t")
+                yield w, int(fr)
+
+    if runs:
+        if chunk:
+            spill()
+        merged = heapq.merge(*(read_run(p) for p in runs))
+    else:
+        chunk.sort()
+        merged = iter(chunk)
+
+    prev, total = None, 0
+    for w, fr in merged:
+        if w == prev:
+            total += fr
+            continue
+        if prev is not None:
+            yield prev, total
+        prev, total = w, fr
+    if prev is not None:
+        yield prev, total
+
+
+class _PageWriter:
+    """Builds the paged node table from words arriving in sorted order."""
+    def __init__(self, conn: sqlite3.Connection, page_nodes: int):
+        self.conn = conn
+        self.page_nodes = page_nodes
+        self.next_id = 0
+        self.done: dict = {}        # page -> {node id: record} of finished nodes
+        self.path: list = []        # open nodes: [id, is_end, freq, keys, kids, count]
+        self.words = 0
+
+    def _new(self) -> list:
+        node = [self.next_id, False, 0, [], [], 0]
+        self.next_id += 1
+        return node
+
+    def _finish(self, node: list) -> None:
+        nid = node[0]
+        rec = (node[1], node[2], node[5], "".join(node[3]), tuple(node[4]))
+        page = nid // self.page_nodes
+        recs = self.done.setdefault(page, {})
+        recs[nid] = rec
+        if len(recs) == self.page_nodes:
+            self._write(page)
+
+    def _write(self, page: int) -> None:
+        recs = self.done.pop(page)
+        first = page * self.page_nodes
+        data = [recs[i] for i in range(first, first + len(recs))]
+        self.conn.execute("INSERT INTO pages (page, data) VALUES (?, ?)", (page, marshal.dumps(data)))
+
+    def _close_to(self, depth: int) -> None:
+        while len(self.path) > depth + 1:
+            node = self.path.pop()
+            self.path[-1][5] += node[5]
+            self._finish(node)
+
+    def add(self, word: str, freq: int, common: int) -> None:
+        """Add the next word; `common` = length of its common prefix with the previous word."""
+        if not self.path:
+            self.path.append(self._new())
+        self._close_to(common)
+        for ch in word[common:]:
+            child = self._new()
+            parent = self.path[-1]
+            parent[3].append(ch)
+            parent[4].append(child[0])
+            self.path.append(child)
+        node = self.path[-1]
+        node[1] = True
+        node[2] = freq
+        node[5] += 1
+        self.words += 1
+
+    def finish(self) -> None:
+        if not self.path:
+            self.path.append(self._new())
+        self._close_to(0)
+        self._finish(self.path.pop())
+        for page in sorted(self.done):
+            self._write(page)
+
+
+def _write_db(path: str, items: Iterable[Tuple[str, int]], page_nodes: int) -> int:
+    """Create a fresh database at `path` from sorted unique (word, freq) pairs; returns the word count."""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER)")
+        conn.execute("CREATE TABLE pages (page INTEGER PRIMARY KEY, data BLOB)")
+        writer = _PageWriter(conn, page_nodes)
+        prev = None
+        for word, freq in items:
+            common = 0
+            if prev is not None:
+                n = min(len(prev), len(word))
+                while common < n and prev[common] == word[common]:
+                    common += 1
+            writer.add(word, freq, common)
+            prev = word
+        writer.finish()
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                         [("page_nodes", page_nodes), ("nodes", writer.next_id), ("words", writer.words)])
+        conn.commit()
+        return writer.words
+    finally:
+        conn.close()
+
+
+class DiskTrie:
+    """
+    Trie stored in a SQLite file as fixed-size pages of node records.
+
+    Node ids follow depth-first (sorted) order, so a subtree sits in a run
+    of consecutive pages. Pages are decoded on demand into a bounded LRU
+    cache; a miss reads READAHEAD consecutive pages in one query (the rest
+    of a descent usually lives there), and fan-out steps of wildcard/glob
+    searches fetch the pages of all children at once. Only the cached pages
+    and the current search state are held in memory.
+
+    The file is read-only between merges: merge_many / merge_from_word_freq_file
+    stream the stored words and the (externally sorted) new ones into a new
+    file and swap it in.
+    """
+    def __init__(self, path: str, cache_pages: int = CACHE_PAGES, readahead: int = READAHEAD):
+        self.path = path
+        self.cache_pages = cache_pages
+        self.readahead = readahead
+        self.version = 0
+        self.match_cache = MatchCache()
+        self.hits = self.misses = self.reads = 0
+        self._pages: "OrderedDict[int, list]" = OrderedDict()
+        if not os.path.exists(path):
+            _write_db(path, [], PAGE_NODES)
+        self._open()
+
+    def _open(self) -> None:
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        self.page_nodes = meta["page_nodes"]
+        self.node_count = meta["nodes"]
+        self.word_count = meta["words"]
+        self._pages.clear()
+
+    @classmethod
+    def build(cls, path: str, items: Iterable[Tuple[str, int]],
+              page_nodes: int = PAGE_NODES, **kwargs) -> "DiskTrie":
+        """Create (or overwrite) `path` from (word, freq) pairs in any order."""
+        with tempfile.TemporaryDirectory(prefix="disktrie_") as tmp:
+            _write_db(path, _sorted_runs(items, tmp), page_nodes)
+        return cls(path, **kwargs)
+
+    @classmethod
+    def from_word_freq_file(cls, path: str, source: str, **kwargs) -> "DiskTrie":
+        return cls.build(path, _read_word_freq(source), **kwargs)
+
+    # --- page cache ----------------------------------------------------------
+
+    def _fetch(self, pages: List[int]) -> None:
+        """Read the given (uncached) pages in one query and cache them; pages[0] ends up most recent."""
+        self.reads += 1
+        marks = ",".join("?" * len(pages))
+        rows = self._conn.execute(f"SELECT page, data FROM pages WHERE page IN ({marks})", pages).fetchall()
+        rank = {p: i for i, p in enumerate(pages)}
+        for page, data in sorted(rows, key=lambda r: -rank[r[0]]):
+            self._pages[page] = marshal.loads(data)
+        while len(self._pages) > self.cache_pages:
+            self._pages.popitem(last=False)
+
+    def _node(self, nid: int) -> tuple:
+        page = nid // self.page_nodes
+        recs = self._pages.get(page)
+        if recs is None:
+            self.misses += 1
+            last = (self.node_count - 1) // self.page_nodes
+            ahead = min(self.readahead, self.cache_pages)
+            want = [p for p in range(page, min(page + ahead, last + 1)) if p not in self._pages]
+            self._fetch(want)
+            recs = self._pages[page]
+        else:
+            self.hits += 1
+            self._pages.move_to_end(page)
+        return recs[nid - page * self.page_nodes]
+
+    def _prefetch(self, ids) -> None:
+        """Make sure the pages holding `ids` are cached (one query for all misses)."""
+        want = sorted({i // self.page_nodes for i in ids} - self._pages.keys())
+        if want:
+            self._fetch(want[: max(1, self.cache_pages // 2)])
+
+    def cache_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"pages_cached": len(self._pages), "cache_pages": self.cache_pages,
+                "hits": self.hits, "misses": self.misses, "queries": self.reads,
+                "hit_rate": round(self.hits / total, 3) if total else None}
+
+    # --- queries -------------------------------------------------------------
+
+    def _walk(self, word: str) -> Optional[tuple]:
+        rec = self._node(0)
+        for ch in word:
+            i = rec[_KEYS].find(ch)
+            if i < 0:
+                return None
+            rec = self._node(rec[_KIDS][i])
+        return rec
+
+    def __len__(self) -> int:
+        return self.word_count
+
+    def search(self, word: str) -> bool:
+        rec = self._walk(word)
+        return rec is not None and rec[_IS_END]
+
+    def get_frequency(self, word: str) -> int:
+        rec = self._walk(word)
+        return rec[_FREQ] if rec is not None and rec[_IS_END] else 0
+
+    def items(self, prefix: str = "") -> Iterator[Tuple[str, int]]:
+        """(word, freq) pairs in sorted order, streamed from disk."""
+        rec = self._walk(prefix)
+        if rec is None:
+            return
+        stack = [(rec, prefix)]
+        while stack:
+            rec, word = stack.pop()
+            if rec[_IS_END]:
+                yield word, rec[_FREQ]
+            keys, kids = rec[_KEYS], rec[_KIDS]
+            for i in range(len(keys) - 1, -1, -1):
+                stack.append((self._node(kids[i]), word + keys[i]))
+
+    def list_words(self) -> List[str]:
+        return [w for w, _ in self.items()]
+
+    def wildcard_match(self, pattern: str) -> List[str]:
+        """Words matching `pattern`, where '*' matches exactly one character."""
+        key = ('wildcard', pattern, None, self.version)
+        cached = self.match_cache.get(key)
+        if cached is not MISSING:
+            return list(cached)
+        results: List[str] = []
+
+        def dfs(rec: tuple, prefix: str, i: int) -> None:
+            if i == len(pattern):
+                if rec[_IS_END]:
+                    results.append(prefix)
+                return
+            ch = pattern[i]
+            keys, kids = rec[_KEYS], rec[_KIDS]
+            if ch == '*':
+                self._prefetch(kids)
+                for c, kid in zip(keys, kids):
+                    dfs(self._node(kid), prefix + c, i + 1)
+            else:
+                j = keys.find(ch)
+                if j >= 0:
+                    dfs(self._node(kids[j]), prefix + ch, i + 1)
+
+        dfs(self._node(0), "", 0)
+        self.match_cache.put(key, tuple(results))
+        return results
+
+    def best_match(self, pattern: str) -> Optional[str]:
+        """Highest-frequency word for a '*' (single char) pattern."""
+        best_word, best_freq = None, -1
+        for word in self.wildcard_match(pattern):
+            f = self.get_frequency(word)
+            if f > best_freq:
+                best_word, best_freq = word, f
+        return best_word
+
+    def glob_match(self, pattern: str, top_k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Glob+ match (same syntax and ordering as features.pattern.glob_match)."""
+        from features.pattern import _parse_pattern
+
+        key = ('glob', pattern, top_k, self.version)
+        cached = self.match_cache.get(key)
+        if cached is not MISSING:
+            return list(cached)
+
+        tokens = _parse_pattern(pattern)
+        best: dict = {}
+
+        def dfs(rec: tuple, ti: int, prefix: str) -> None:
+            if ti == len(tokens):
+                if rec[_IS_END]:
+                    best[prefix] = rec[_FREQ]
+                return
+            kind, payload = tokens[ti]
+            keys, kids = rec[_KEYS], rec[_KIDS]
+            if kind == 'LIT':
+                j = keys.find(payload)
+                if j >= 0:
+                    dfs(self._node(kids[j]), ti + 1, prefix + payload)
+            elif kind == 'SET':
+                for j, c in enumerate(keys):
+                    if c in payload:
+                        dfs(self._node(kids[j]), ti + 1, prefix + c)
+            else:
+                self._prefetch(kids)
+                if kind == 'ANY':
+                    for c, kid in zip(keys, kids):
+                        dfs(self._node(kid), ti + 1, prefix + c)
+                else:   # STAR: consume nothing, or one char and stay
+                    dfs(rec, ti + 1, prefix)
+                    for c, kid in zip(keys, kids):
+                        dfs(self._node(kid), ti, prefix + c)
+
+        dfs(self._node(0), 0, "")
+        ranked = sorted(best.items(), key=lambda x: (-x[1], x[0]))
+        out = ranked[:top_k] if top_k is not None else ranked
+        self.match_cache.put(key, tuple(out))
+        return out
+
+    # --- bulk merge ----------------------------------------------------------
+
+    def merge_many(self, items: Iterable[Tuple[str, int]]) -> Tuple[int, int]:
+        """
+        Add (word, freq) pairs (frequencies of existing words are summed).
+        New pairs are sorted externally, merged with the stored words in one
+        streaming pass into a new file, which then replaces the old one.
+        Returns (new_words_added, existing_words_updated).
+        """
+        counts = [0, 0]
+
+        def combined(new: Iterator[Tuple[str, int]]):
+            old = self.items()
+            a, b = next(old, None), next(new, None)
+            while a is not None or b is not None:
+                if b is None or (a is not None and a[0] < b[0]):
+                    yield a
+                    a = next(old, None)
+                elif a is None or b[0] < a[0]:
+                    counts[0] += 1
+                    yield b
+                    b = next(new, None)
+                else:
+                    counts[1] += 1
+                    yield a[0], a[1] + b[1]
+                    a, b = next(old, None), next(new, None)
+
+        tmp_path = self.path + ".merge"
+        try:
+            with tempfile.TemporaryDirectory(prefix="disktrie_") as tmp:
+                _write_db(tmp_path, combined(_sorted_runs(items, tmp)), self.page_nodes)
+            self._conn.close()
+            os.replace(tmp_path, self.path)
+        finally:
+            # a failed merge leaves the stored file as it was and no half-written copy
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._open()
+        self.version += 1
+        return counts[0], counts[1]
+
+    def merge_from_word_freq_file(self, filepath: str) -> Tuple[int, int]:
+        return self.merge_many(_read_word_freq(filepath))
+
+    def merge_trie(self, other) -> Tuple[int, int]:
+        """Merge an in-memory PrefixTrie."""
+        words = other.list_words()
+        return self.merge_many(zip(words, other.get_frequencies(words)))
+
+    def close(self) -> None:
+        self._pages.clear()
+        self._conn.close()
+
+
+# --- self-check --------------------------------------------------------------
+
+def _random_words(rng: random.Random, n: int) -> List[Tuple[str, int]]:
+    # few letters and shared stems, so the trie has deep runs and wide fan-outs
+    stems = ["".join(rng.choice("abcdefgh") for _ in range(rng.randint(1, 4))) for _ in range(n // 20 + 1)]
+    return [(rng.choice(stems) + "".join(rng.choice("abcdefgh") for _ in range(rng.randint(0, 5))),
+             rng.randint(1, 1000)) for _ in range(n)]
+
+
+def _random_patterns(rng: random.Random, words: List[str], n: int) -> List[str]:
+    """'*' patterns made by blanking characters of stored (and some absent) words."""
+    out = []
+    for _ in range(n):
+        w = list(rng.choice(words) + ("" if rng.random() < 0.8 else "x"))
+        for i in rng.sample(range(len(w)), k=min(len(w), rng.randint(1, 3))):
+            w[i] = "*"
+        out.append("".join(w))
+    return out
+
+
+def check(n_words: int = 20_000, cache_pages: int = 8, page_nodes: int = 32,
+          queries: int = 100, seed: int = 0) -> List[str]:
+    """
+    Build a DiskTrie whose node pages far outnumber `cache_pages` and compare
+    it with a PrefixTrie of the same words: search, get_frequency,
+    wildcard_match, best_match and glob_match, before and after a merge_many
+    (also checked for its merge counts). Returns the mismatches found.
+    """
+    from features.pattern import glob_match
+    from .prefix_trie import PrefixTrie
+
+    rng = random.Random(seed)
+    base = _random_words(rng, n_words)
+    # one pair per word, so both sides count a repeated new word the same way
+    extra = list(dict(_random_words(rng, n_words // 4)).items())
+    mem = PrefixTrie()
+    mem.insert_many(base)
+    errors: List[str] = []
+
+    def compare(disk: "DiskTrie", stage: str) -> None:
+        words = mem.list_words()
+        if disk.node_count <= 4 * cache_pages * page_nodes:
+            errors.append(f"{stage}: {disk.node_count} nodes fit in the cache; raise --words")
+        if list(disk.items()) != sorted(zip(words, mem.get_frequencies(words))):
+            errors.append(f"{stage}: items() differ")
+        probes = rng.sample(words, min(queries, len(words))) + [w + "x" for w in words[:queries // 4]]
+        for w in probes:
+            if disk.search(w) != mem.search(w) or disk.get_frequency(w) != mem.get_frequency(w):
+                errors.append(f"{stage}: search/get_frequency({w!r}) differ")
+        for pat in _random_patterns(rng, words, queries):
+            if sorted(disk.wildcard_match(pat)) != sorted(mem.wildcard_match(pat)):
+                errors.append(f"{stage}: wildcard_match({pat!r}) differs")
+            # ties may break differently (insertion vs. sorted order); the best frequency must agree
+            got, want = disk.best_match(pat), mem.best_match(pat)
+            if (got and disk.get_frequency(got)) != (want and mem.get_frequency(want)):
+                errors.append(f"{stage}: best_match({pat!r}) = {got!r}, expected {want!r}")
+            glob = pat.replace("*", "?", pat.count("*") - 1)    # the last '*' matches any run
+            for top_k in (None, 5):
+                if disk.glob_match(glob, top_k) != glob_match(mem, glob, top_k):
+                    errors.append(f"{stage}: glob_match({glob!r}, top_k={top_k}) differs")
+        if len(disk._pages) > disk.cache_pages:
+            errors.append(f"{stage}: {len(disk._pages)} pages cached, limit {disk.cache_pages}")
+
+    with tempfile.TemporaryDirectory(prefix="disktrie_check_") as tmp:
+        path = os.path.join(tmp, "words.db")
+        disk = DiskTrie.build(path, base, page_nodes=page_nodes, cache_pages=cache_pages, readahead=2)
+        try:
+            compare(disk, "build")
+            got, want = disk.merge_many(extra), mem.insert_many(extra)
+            if got != tuple(want):
+                errors.append(f"merge_many: counts {got}, expected {tuple(want)}")
+            if os.path.exists(path + ".merge"):
+                errors.append("merge_many: left its .merge file behind")
+            compare(disk, "merge_many")
+            stats = disk.cache_stats()
+        finally:
+            disk.close()
+    print(f"{n_words:,} + {len(extra):,} words, {page_nodes} nodes/page, {cache_pages} cached pages: "
+          f"{stats['misses']:,} misses / {stats['queries']:,} reads, hit rate {stats['hit_rate']}; "
+          f"{len(errors)} mismatch(es)", file=sys.stderr)
+    return errors
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="Check DiskTrie against PrefixTrie with a small page cache.")
+    ap.add_argument("--words", type=int, default=20_000)
+    ap.add_argument("--cache-pages", type=int, default=8)
+    ap.add_argument("--page-nodes", type=int, default=32)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    errors = check(args.words, args.cache_pages, args.page_nodes, args.queries, args.seed)
+    for e in errors[:20]:
+        print(e)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
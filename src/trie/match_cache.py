@@ -0,0 +1,63 @@
+# src/trie/match_cache.py
+from __future__ import annotations
+from collections import OrderedDict
+
+# returned by MatchCache.get() on a miss (None is a valid cached best_match result)
+MISSING = object()
+
+
+class MatchCache:
+    """
+    Bounded LRU cache for pattern query results.
+    Keys are (kind, pattern, top_k, version). Any trie edit bumps the trie's
+    version, so entries from an older version can never be hit again; they are
+    dropped as soon as a key with a newer version shows up.
+    """
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _sync_version(self, version) -> None:
+        # a newer trie version makes every stored entry unreachable
+        if version != self._version:
+            self._data.clear()
+            self._version = version
+
+    def get(self, key):
+        """Return the cached value for `key` (kind, pattern, top_k, version) or MISSING."""
+        self._sync_version(key[-1])
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        """Store `value` under `key`, evicting the least-recently-used entry when full."""
+        if self.maxsize <= 0:
+            return
+        self._sync_version(key[-1])
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
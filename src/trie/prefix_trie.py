@@ -1,30 +1,188 @@
+import gc
+import operator
 from .trie_node import TrieNode
+from .match_cache import MatchCache, MISSING
+
+
+def _read_word_freq(filepath: str):
+    """Yield (word, freq) pairs from a word,frequency text file (freq defaults to 1)."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            parts = line.split(',')
+            word = parts[0]
+            try:
+                freq = int(parts[1])
+            except (IndexError, ValueError):
+                freq = 1
+            yield word, freq
+
+
+def _common_prefix_len(a: str, b: str, limit: int) -> int:
+    """Length of the common prefix of a and b, capped at `limit`."""
+    n = min(len(a), len(b), limit)
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class _Edits:
+    """Word-level changes made by one set operation: counts, plus the journal rows when `log`."""
+    __slots__ = ("log", "n", "added", "changed", "removed", "visited", "inserts", "deletes")
+
+    def __init__(self, log: bool):
+        self.log = log
+        self.n = 0                  # edits so far; a node whose subtree saw one is re-aggregated
+        self.added = self.changed = self.removed = self.visited = 0
+        self.inserts: list = []     # (word, frequency delta), as insert_many would log them
+        self.deletes: list = []
+
+    def set(self, node, word: str, freq: int) -> tuple[int, int]:
+        """
+        Give the word ending at `node` frequency `freq`; a frequency <= 0
+        removes it. Returns the (count, mass) change.
+        """
+        was = node.frequency if node.is_end else 0
+        if freq <= 0:
+            if not node.is_end:
+                return 0, 0
+            node.is_end = False
+            node.frequency = 0
+            self.n += 1
+            self.removed += 1
+            if self.log:
+                self.deletes.append(word)
+            return -1, -was
+        if not node.is_end:
+            node.is_end = True
+            node.frequency = freq
+            self.n += 1
+            self.added += 1
+            if self.log:
+                self.inserts.append((word, freq))
+            return 1, freq
+        if freq == was:
+            return 0, 0
+        node.frequency = freq
+        self.n += 1
+        self.changed += 1
+        if self.log:
+            self.inserts.append((word, freq - was))
+        return 0, freq - was
+
+    def drop(self, node, word: str) -> tuple[int, int]:
+        """A whole subtree is being cut off; returns its (count, mass) change."""
+        self.n += 1
+        self.removed += node.count
+        if self.log:
+            self.deletes.extend(w for w, _ in _items_below(node, word))
+        return -node.count, -node.mass
+
+    def adopt(self, node, word: str) -> tuple[int, int]:
+        """A whole subtree is being attached; returns its (count, mass) change."""
+        self.n += 1
+        self.added += node.count
+        if self.log:
+            self.inserts.extend(_items_below(node, word))
+        return node.count, node.mass
+
+
+def _items_below(node, word: str):
+    """(word, frequency) of every word in a subtree, depth first."""
+    stack = [(node, word)]
+    while stack:
+        n, w = stack.pop()
+        if n.is_end:
+            yield w, n.frequency
+        stack.extend((child, w + ch) for ch, child in n.children.items())
+
+
 class PrefixTrie:
     def __init__(self):
         self.root = TrieNode()
+        # bumped by every mutation (insert/delete/load/merge); keys the match cache
+        self.version = 0
+        self.match_cache = MatchCache()
+        # walk accounting of the last batch call (insert_many, get_frequencies, ...)
+        self.batch_stats: dict = {}
+        # optional TrieJournal (trie/wal.py); every mutation is appended to it
+        self.journal = None
+        # node → top-k (suffix, freq) of its subtree (trie/completion.py);
+        # insert/delete drop the entries on the word's path, other edits clear it
+        self.topk_cache: dict = {}
+        # BackgroundLoad (trie/background_load.py) filling a fresh root, if any
+        self.loader = None
+
+    def _drop_topk(self, word: str) -> None:
+        """Forget the cached top-k lists of every node on `word`'s path."""
+        cache = self.topk_cache
+        node = self.root
+        cache.pop(node, None)
+        for char in word:
+            node = node.children.get(char)
+            if node is None:
+                return
+            cache.pop(node, None)
+
+    def cursor(self, k: int = 5):
+        """Return a CompletionCursor for incremental prefix completion."""
+        from .completion import CompletionCursor
+        return CompletionCursor(self, k)
+
+    def clear(self) -> None:
+        """Remove every word."""
+        self.root = TrieNode()
+        self.version += 1
+        self.topk_cache.clear()
+        if self.journal is not None:
+            self.journal.log_reset()
 
     def insert(self, word: str, frequency: int = 1) -> None:
         """Insert a word with its frequency into the trie."""
+        if self.topk_cache:
+            self._drop_topk(word)
         node = self.root
+        path = [node]
         for char in word:
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
+            child = node.children.get(char)
+            if child is None:
+                child = node.add_child(char)
+            node = child
+            path.append(node)
+        new = not node.is_end
         node.is_end = True
+        for n in path:
+            n.count += new
+            n.mass += frequency
+            n.digest = None
         node.frequency += frequency
+        self.version += 1
+        if self.journal is not None:
+            self.journal.log_insert([(word, frequency)])
 
     def delete(self, word: str) -> bool:
         """Delete a word. Return True if the word existed and was deleted."""
+        lost = 0    # frequency of the deleted word, taken off every node on its path
+
         def _delete(node: TrieNode, depth: int) -> tuple[bool, bool]:
             """
             Returns (deleted, should_prune).
             deleted      -> whether we actually removed the word (unset is_end)
             should_prune -> whether this node can be pruned from its parent
             """
+            nonlocal lost
             if depth == len(word):
                 if not node.is_end:
                     return False, False
+                lost = node.frequency
                 node.is_end = False
+                node.frequency = 0
+                node.count -= 1
+                node.mass -= lost
+                node.digest = None
                 # prune only if this node has no children
                 return True, len(node.children) == 0
 
@@ -34,23 +192,33 @@ class PrefixTrie:
                 return False, False
 
             deleted, child_prune = _delete(child, depth + 1)
+            if deleted:
+                node.count -= 1
+                node.mass -= lost
+                node.digest = None
             if child_prune:
-                del node.children[ch]
+                node.remove_child(ch)
 
             # current node should be pruned if it's not end-of-word and lost its children
             prune_here = (not node.is_end) and (len(node.children) == 0)
             return deleted, prune_here
 
+        if self.topk_cache:
+            self._drop_topk(word)
         deleted, _ = _delete(self.root, 0)
+        if deleted:
+            self.version += 1
+            if self.journal is not None:
+                self.journal.log_delete([word])
         return deleted
 
     def search(self, word: str) -> bool:
         """Return True if the exact word is in the trie."""
         node = self.root
         for char in word:
-            if char not in node.children:
+            node = node.children.get(char)
+            if node is None:
                 return False
-            node = node.children[char]
         return node.is_end
 
     def wildcard_match(self, pattern: str) -> list[str]:
@@ -58,6 +226,10 @@ class PrefixTrie:
         Given a pattern with '*' as a single-character wildcard,
         return all matching words in the trie.
         """
+        key = ('wildcard', pattern, None, self.version)
+        cached = self.match_cache.get(key)
+        if cached is not MISSING:
+            return list(cached)
         results: list[str] = []
         def _dfs(node: TrieNode, prefix: str, idx: int) -> None:
             if idx == len(pattern):
@@ -74,13 +246,15 @@ class PrefixTrie:
                     return
                 _dfs(child, prefix + char, idx + 1)
         _dfs(self.root, "", 0)
+        self.match_cache.put(key, tuple(results))
         return results
 
     def save_to_file(self, filepath: str) -> None:
         """Save words+frequencies as plain text: one 'word,freq' per line."""
+        words = self.list_words()
         with open(filepath, "w", encoding="utf-8") as f:
-            for w in self.list_words():
-                f.write(f"{w},{self.get_frequency(w)}\n")
+            for w, freq in zip(words, self.get_frequencies(words)):
+                f.write(f"{w},{freq}\n")
     def save_display_to_file(self, filepath: str) -> None:
         """Save the ASCII display of the trie (same as print_trie)."""
         with open(filepath, "w", encoding="utf-8") as f:
@@ -96,26 +270,97 @@ class PrefixTrie:
         Load keywords + frequencies from a text file (word,frequency per line),
         clearing any existing data in the trie.
         """
-        from .trie_node import TrieNode
-        self.root = TrieNode()
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                parts = line.split(',')
-                word = parts[0]
-                try:
-                    freq = int(parts[1])
-                except (IndexError, ValueError):
-                    freq = 1
-                self.insert(word, frequency=freq)
+        self.clear()
+        # a blocking bulk build: trie nodes never form reference cycles, so
+        # collector passes over the growing trie are pure overhead (a 1M-word
+        # load took 2.5x as long). The pause is interpreter-wide and lasts
+        # only until this call returns.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.insert_many(_read_word_freq(filepath))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def load_in_background(self, filepath: str, priority=()):
+        """
+        Start loading a word,frequency file on a worker thread and return its
+        BackgroundLoad. The trie keeps its current words until poll_load()
+        installs the loaded root; words under `priority` prefixes are
+        published early. A load already in progress is cancelled (and its
+        early prefixes withdrawn).
+        """
+        from .background_load import BackgroundLoad
+        if self.loader is not None:
+            self.loader.cancel()
+        self.loader = BackgroundLoad(self, filepath, priority).start()
+        return self.loader
+
+    def poll_load(self) -> str | None:
+        """Apply the progress of a background load, if any; returns a message to show."""
+        if self.loader is None:
+            return None
+        msg = self.loader.poll()
+        if self.loader.done:
+            self.loader = None
+        return msg
+
+    def _install_root(self, root) -> None:
+        """Make `root` (a fully built tree with count/mass) the trie's contents."""
+        self.root = root
+        self.version += 1
+        self.topk_cache.clear()
+        if self.journal is not None:
+            self.journal.log_reset()
+            self.journal.log_insert(self.range())
+
+    def _graft(self, prefix: str, subtree, copy: bool = True) -> None:
+        """
+        Replace the words under non-empty `prefix` by a copy of `subtree`
+        (None removes them), keeping count/mass on the path right; with
+        copy=False `subtree` itself is attached (it must not belong to a
+        trie). Not journaled: a background load logs its words when the
+        full root is installed, and takes its grafts back otherwise.
+        """
+        new = self._clone_subtree(subtree) if subtree is not None and copy else subtree
+        path = [self.root]
+        for ch in prefix[:-1]:
+            child = path[-1].children.get(ch)
+            if child is None:
+                if new is None:
+                    return
+                child = path[-1].add_child(ch)
+            path.append(child)
+        parent, last = path[-1], prefix[-1]
+        old = parent.children.get(last)
+        d_count = (new.count if new else 0) - (old.count if old else 0)
+        d_mass = (new.mass if new else 0) - (old.mass if old else 0)
+        if new is not None:
+            parent.add_child(last, new)
+        elif old is not None:
+            parent.remove_child(last)
+        for n in path:
+            n.count += d_count
+            n.mass += d_mass
+            n.digest = None
+        # drop path nodes left without words
+        for d in range(len(path) - 1, 0, -1):
+            if path[d].count or path[d].is_end:
+                break
+            path[d - 1].remove_child(prefix[d - 1])
+        self.version += 1
+        self.topk_cache.clear()
 
     def best_match(self, pattern: str) -> str | None:
         """
         Return the single best match for a wildcard pattern
         (using '*' as the wildcard) based on highest frequency.
         """
+        key = ('best', pattern, None, self.version)
+        cached = self.match_cache.get(key)
+        if cached is not MISSING:
+            return cached
         matches = self.wildcard_match(pattern)
         best_word: str | None = None
         best_freq = -1
@@ -126,6 +371,7 @@ class PrefixTrie:
             if node.frequency > best_freq:
                 best_freq = node.frequency
                 best_word = word
+        self.match_cache.put(key, best_word)
         return best_word
 
     def list_words(self) -> list[str]:
@@ -145,11 +391,254 @@ class PrefixTrie:
         """Return the stored frequency of `word`, or 0 if it’s not in the trie."""
         node = self.root
         for char in word:
-            if char not in node.children:
+            node = node.children.get(char)
+            if node is None:
                 return 0
-            node = node.children[char]
         return node.frequency if node.is_end else 0
     
+    def freeze(self):
+        """
+        Return a read-only minimized word graph (FrozenDawg) of this trie.
+        Use FrozenDawg.thaw() to get a mutable PrefixTrie back.
+        """
+        from .dawg import FrozenDawg
+        words = sorted(self.list_words())
+        return FrozenDawg.from_sorted_items(zip(words, self.get_frequencies(words)))
+
+    # --- Batch API ---------------------------------------------------------
+    # Keys are visited in sorted order so consecutive keys reuse the descent
+    # along their common prefix; results come back in input order.
+
+    def _batch_walk(self, words: list[str], op: str, create: bool = False):
+        """
+        Yield (input_index, node, path) for each word in sorted order. `node`
+        is the word's final node, or None if the path does not exist
+        (create=False); `path` is the live list of nodes from the root to
+        `node`, valid until the next item.
+        """
+        order = sorted(range(len(words)), key=words.__getitem__)
+        path = [self.root]          # path[d] = node reached after d chars of prev
+        prev = ""
+        walked = saved = 0
+        for i in order:
+            word = words[i]
+            common = _common_prefix_len(prev, word, len(path) - 1)
+            del path[common + 1:]
+            saved += common
+            node = path[-1]
+            for ch in word[common:]:
+                child = node.children.get(ch)
+                if child is None:
+                    if not create:
+                        node = None
+                        break
+                    child = node.add_child(ch)
+                node = child
+                path.append(node)
+                walked += 1
+            prev = word
+            yield i, node, path
+        self.batch_stats = {"op": op, "keys": len(words), "steps": walked, "steps_saved": saved}
+
+    def insert_many(self, items) -> tuple[int, int]:
+        """
+        Insert an iterable of (word, frequency) pairs.
+        Returns (new_words_added, existing_words_updated).
+        """
+        items = list(items)
+        words = [w for w, _ in items]
+        added = updated = 0
+        for i, node, path in self._batch_walk(words, "insert_many", create=True):
+            freq = items[i][1]
+            if node.is_end:
+                updated += 1
+                for n in path:
+                    n.mass += freq
+                    n.digest = None
+            else:
+                node.is_end = True
+                for n in path:
+                    n.count += 1
+                    n.mass += freq
+                    n.digest = None
+                added += 1
+            node.frequency += freq
+        if items:
+            self.version += 1
+            self.topk_cache.clear()
+            if self.journal is not None:
+                self.journal.log_insert(items)
+        return added, updated
+
+    def delete_many(self, words) -> list[bool]:
+        """Delete many words; returns, in input order, whether each one was deleted."""
+        words = list(words)
+        results = [False] * len(words)
+        order = sorted(range(len(words)), key=words.__getitem__)
+        path = [self.root]
+        chars: list[str] = []       # chars[d] = edge label from path[d] to path[d+1]
+        prev = ""
+        walked = saved = 0
+
+        def _unwind(depth: int) -> None:
+            # leave nodes deeper than `depth`, pruning the ones left empty
+            while len(path) - 1 > depth:
+                node = path.pop()
+                ch = chars.pop()
+                if not node.is_end and not node.children:
+                    path[-1].remove_child(ch)
+
+        for i in order:
+            word = words[i]
+            common = _common_prefix_len(prev, word, len(path) - 1)
+            _unwind(common)
+            saved += common
+            node = path[-1]
+            for ch in word[common:]:
+                node = node.children.get(ch)
+                if node is None:
+                    break
+                path.append(node)
+                chars.append(ch)
+                walked += 1
+            else:
+                if node.is_end:
+                    freq = node.frequency
+                    node.is_end = False
+                    node.frequency = 0
+                    for n in path:
+                        n.count -= 1
+                        n.mass -= freq
+                        n.digest = None
+                    results[i] = True
+            prev = word
+        _unwind(0)
+
+        self.batch_stats = {"op": "delete_many", "keys": len(words), "steps": walked, "steps_saved": saved}
+        if any(results):
+            self.version += 1
+            self.topk_cache.clear()
+            if self.journal is not None:
+                self.journal.log_delete([w for w, ok in zip(words, results) if ok])
+        return results
+
+    def get_frequencies(self, words) -> list[int]:
+        """Return the frequency of each word (0 if absent), in input order."""
+        words = list(words)
+        out = [0] * len(words)
+        for i, node, _ in self._batch_walk(words, "get_frequencies"):
+            if node is not None and node.is_end:
+                out[i] = node.frequency
+        return out
+
+    def contains_many(self, words) -> list[bool]:
+        """Return, in input order, whether each word is in the trie."""
+        words = list(words)
+        out = [False] * len(words)
+        for i, node, _ in self._batch_walk(words, "contains_many"):
+            out[i] = node is not None and node.is_end
+        return out
+
+    # --- Aggregate queries -------------------------------------------------
+    # Every node keeps the word count (`count`) and frequency sum (`mass`) of
+    # its subtree, so these walk one root-to-node path and never a subtree.
+
+    def _node_at(self, prefix: str):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def count_prefix(self, prefix: str) -> int:
+        """Number of words starting with `prefix` (the empty prefix counts every word)."""
+        node = self._node_at(prefix)
+        return node.count if node is not None else 0
+
+    def frequency_mass(self, prefix: str = "") -> int:
+        """Sum of the frequencies of the words starting with `prefix`."""
+        node = self._node_at(prefix)
+        return node.mass if node is not None else 0
+
+    def rank(self, word: str) -> int:
+        """Number of words that sort before `word` (its index if present)."""
+        below = 0
+        node = self.root
+        for char in word:
+            if node.is_end:
+                below += 1          # a proper prefix sorts first
+            nxt = None
+            for ch, child in node.children.items():
+                if ch < char:
+                    below += child.count
+                elif ch == char:
+                    nxt = child
+            if nxt is None:
+                return below
+            node = nxt
+        return below
+
+    def select(self, k: int) -> str:
+        """The word at index `k` in sorted order (negative k counts from the end)."""
+        n = self.root.count
+        if k < 0:
+            k += n
+        if not 0 <= k < n:
+            raise IndexError(f"select index {k} out of range for {n} words")
+        node = self.root
+        chars: list[str] = []
+        while True:
+            if node.is_end:
+                if k == 0:
+                    return "".join(chars)
+                k -= 1
+            for ch, child in sorted(node.children.items()):
+                if k < child.count:
+                    chars.append(ch)
+                    node = child
+                    break
+                k -= child.count
+
+    def range(self, lo: str = "", hi: str | None = None, limit: int | None = None) -> list[tuple[str, int]]:
+        """
+        (word, frequency) pairs with lo <= word < hi in sorted order, at most
+        `limit` of them. Only the path to `lo` and the returned words are
+        visited; for the next page pass the last word + "\0" as `lo`.
+        """
+        out: list[tuple[str, int]] = []
+        if limit is not None and limit <= 0:
+            return out
+        # stack of (node, word) subtrees still to list, smallest on top: the
+        # siblings after lo's path, outermost first, then lo's own subtree
+        stack = []
+        node = self.root
+        for depth, char in enumerate(lo):
+            nxt = None
+            later = []
+            for ch, child in node.children.items():
+                if ch > char:
+                    later.append((ch, child))
+                elif ch == char:
+                    nxt = child
+            later.sort(reverse=True)
+            stack.extend((child, lo[:depth] + ch) for ch, child in later)
+            if nxt is None:
+                break
+            node = nxt
+        else:
+            stack.append((node, lo))
+        while stack:
+            node, word = stack.pop()
+            if hi is not None and word >= hi:
+                break
+            if node.is_end:
+                out.append((word, node.frequency))
+                if limit is not None and len(out) >= limit:
+                    break
+            stack.extend((child, word + ch) for ch, child in sorted(node.children.items(), reverse=True))
+        return out
+
     def print_trie(self):
         for line in self.as_ascii():
             print(line)
@@ -180,29 +669,214 @@ class PrefixTrie:
     def merge_from_word_freq_file(self, filepath: str) -> tuple[int, int]:
         """
         Merge words from a word,freq TXT into the current trie (no clearing).
-        Internally loads into a temporary trie and performs a fast structural merge.
+        Pairs are inserted straight into this trie in one sorted batch; no
+        temporary trie is built.
         Returns (new_words_added, existing_words_updated).
         """
-        tmp = PrefixTrie()              # same class, same module → safe to construct
-        tmp.load_from_word_freq_file(filepath)
-        return self.merge_trie(tmp)     # uses _merge_nodes/_clone_subtree/_count_words
+        return self.insert_many(_read_word_freq(filepath))
+
+    def merge_trie(self, other: "PrefixTrie", consume: bool = False) -> tuple[int, int]:
+        """
+        Merge `other` trie into this trie. Returns (added, updated).
+        With consume=True, subtrees missing here are moved over instead of
+        copied and `other` is left empty.
+        """
+        self.version += 1
+        self.topk_cache.clear()
+        if self.journal is not None:
+            words = other.list_words()
+            self.journal.log_insert(zip(words, other.get_frequencies(words)))
+        result = self._merge_nodes(self.root, other.root, consume)
+        if consume:
+            other.clear()
+        return result
+
+    # --- Set operations ------------------------------------------------
+    # Each is one top-down walk of this trie (alongside `other`) that fixes
+    # count/mass/digest on the way back up and prunes children left without
+    # words in the same pass; a subtree only one side has is dropped or
+    # copied whole. Words are only spelled out when a journal needs them.
+    # All return (added, changed, removed) word counts.
+
+    def _finish_edits(self, op: str, edits: _Edits) -> tuple[int, int, int]:
+        self.batch_stats = {"op": op, "nodes": edits.visited, "added": edits.added,
+                            "changed": edits.changed, "removed": edits.removed}
+        if edits.n:
+            self.version += 1
+            self.topk_cache.clear()
+            if self.journal is not None:
+                if edits.deletes:
+                    self.journal.log_delete(edits.deletes)
+                if edits.inserts:
+                    self.journal.log_insert(edits.inserts)
+        return edits.added, edits.changed, edits.removed
+
+    def difference(self, other: "PrefixTrie") -> tuple[int, int, int]:
+        """Remove every word that is also in `other` (e.g. a stopword list)."""
+        edits = _Edits(self.journal is not None)
+        log = edits.log
+
+        def walk(node, onode, word):
+            edits.visited += 1
+            n0 = edits.n
+            dc = dm = 0
+            if node.is_end and onode.is_end:
+                dc, dm = edits.set(node, word, 0)
+            kids, okids = node.children, onode.children
+            if kids and okids:
+                # only shared edges matter: look them up from the smaller side
+                if len(okids) <= len(kids):
+                    pairs = [(ch, kids.get(ch), oc) for ch, oc in okids.items()]
+                else:
+                    pairs = [(ch, c, okids.get(ch)) for ch, c in kids.items()]
+                for ch, c, oc in pairs:
+                    if c is None or oc is None:
+                        continue
+                    a, b = walk(c, oc, word + ch if log else word)
+                    dc += a
+                    dm += b
+                    if not c.count:
+                        node.remove_child(ch)
+            if edits.n != n0:
+                node.count += dc
+                node.mass += dm
+                node.digest = None
+            return dc, dm
+
+        walk(self.root, other.root, "")
+        return self._finish_edits("difference", edits)
+
+    def intersection(self, other: "PrefixTrie", combine=None) -> tuple[int, int, int]:
+        """
+        Keep only the words that are also in `other`. Their frequency stays,
+        or becomes combine(mine, theirs) when given (a result <= 0 removes
+        the word).
+        """
+        edits = _Edits(self.journal is not None)
+        log = edits.log
+
+        def walk(node, onode, word):
+            edits.visited += 1
+            n0 = edits.n
+            dc = dm = 0
+            if node.is_end:
+                if not onode.is_end:
+                    dc, dm = edits.set(node, word, 0)
+                elif combine is not None:
+                    dc, dm = edits.set(node, word, combine(node.frequency, onode.frequency))
+            okids = onode.children
+            dead = []
+            for ch, c in node.children.items():
+                oc = okids.get(ch)
+                if oc is None:
+                    a, b = edits.drop(c, word + ch)
+                    dead.append(ch)
+                else:
+                    a, b = walk(c, oc, word + ch if log else word)
+                    if not c.count:
+                        dead.append(ch)
+                dc += a
+                dm += b
+            for ch in dead:
+                node.remove_child(ch)
+            if edits.n != n0:
+                node.count += dc
+                node.mass += dm
+                node.digest = None
+            return dc, dm
+
+        walk(self.root, other.root, "")
+        return self._finish_edits("intersection", edits)
+
+    def union(self, other: "PrefixTrie", combine=operator.add) -> tuple[int, int, int]:
+        """
+        Add the words of `other`; a word in both gets combine(mine, theirs)
+        (default: the sum, like merge_trie; max, min or `lambda a, b: b`
+        also work). A combined frequency <= 0 removes the word.
+        """
+        edits = _Edits(self.journal is not None)
+        log = edits.log
 
-    def merge_trie(self, other: "PrefixTrie") -> tuple[int, int]:
-        """Merge `other` trie into this trie. Returns (added, updated)."""
-        return self._merge_nodes(self.root, other.root)
+        def walk(node, onode, word):
+            edits.visited += 1
+            n0 = edits.n
+            dc = dm = 0
+            if onode.is_end:
+                freq = combine(node.frequency, onode.frequency) if node.is_end else onode.frequency
+                dc, dm = edits.set(node, word, freq)
+            dead = []
+            for ch, oc in onode.children.items():
+                c = node.children.get(ch)
+                if c is None:
+                    c = node.add_child(ch, self._clone_subtree(oc))
+                    a, b = edits.adopt(c, word + ch)
+                else:
+                    a, b = walk(c, oc, word + ch if log else word)
+                    if not c.count:
+                        dead.append(ch)
+                dc += a
+                dm += b
+            for ch in dead:
+                node.remove_child(ch)
+            if edits.n != n0:
+                node.count += dc
+                node.mass += dm
+                node.digest = None
+            return dc, dm
+
+        walk(self.root, other.root, "")
+        return self._finish_edits("union", edits)
+
+    def map_frequency(self, fn, op: str = "map_frequency") -> tuple[int, int, int]:
+        """Replace every frequency f by fn(f); words mapped to <= 0 are removed."""
+        edits = _Edits(self.journal is not None)
+        log = edits.log
+
+        def walk(node, word):
+            edits.visited += 1
+            n0 = edits.n
+            dc = dm = 0
+            if node.is_end:
+                dc, dm = edits.set(node, word, fn(node.frequency))
+            dead = None
+            for ch, c in node.children.items():
+                a, b = walk(c, word + ch if log else word)
+                if edits.n != n0:
+                    dc += a
+                    dm += b
+                    if not c.count:
+                        dead = [ch] if dead is None else dead + [ch]
+            if dead:
+                for ch in dead:
+                    node.remove_child(ch)
+            if edits.n != n0:
+                node.count += dc
+                node.mass += dm
+                node.digest = None
+            return dc, dm
+
+        walk(self.root, "")
+        return self._finish_edits(op, edits)
+
+    def filter(self, min_freq: int) -> tuple[int, int, int]:
+        """Remove the words whose frequency is below `min_freq`."""
+        return self.map_frequency(lambda f: f if f >= min_freq else 0, "filter")
 
     # --- Internal: recursive structural merge --------------------------
 
-    def _merge_nodes(self, dst, src) -> tuple[int, int]:
+    def _merge_nodes(self, dst, src, consume: bool = False) -> tuple[int, int]:
         """
-        Merge src subtree into dst subtree.
-        Returns (new_words_added, existing_words_updated).
+        Merge src subtree into dst subtree (moving missing src subtrees when
+        `consume`). Returns (new_words_added, existing_words_updated).
         """
         added = updated = 0
+        # every src word's frequency lands somewhere below dst
+        dst.mass += src.mass
+        dst.digest = None
 
         # If src ends a word, add/accumulate at dst
-        if getattr(src, "is_end", False):
-            if getattr(dst, "is_end", False):
+        if src.is_end:
+            if dst.is_end:
                 dst.frequency += src.frequency
                 updated += 1
             else:
@@ -212,14 +886,15 @@ class PrefixTrie:
 
         for ch, src_child in src.children.items():
             if ch not in dst.children:
-                # Clone the entire subtree once (no shared refs)
-                dst.children[ch] = self._clone_subtree(src_child)
-                added += self._count_words(src_child)
+                # adopt the subtree, or clone it once (no shared refs)
+                dst.add_child(ch, src_child if consume else self._clone_subtree(src_child))
+                added += src_child.count
             else:
-                a, u = self._merge_nodes(dst.children[ch], src_child)
+                a, u = self._merge_nodes(dst.children[ch], src_child, consume)
                 added += a
                 updated += u
 
+        dst.count += added
         return added, updated
 
     def _clone_subtree(self, node):
@@ -228,13 +903,225 @@ class PrefixTrie:
         new = TrieNode()
         new.is_end = node.is_end
         new.frequency = node.frequency
+        new.count = node.count
+        new.mass = node.mass
+        new.digest = node.digest
         for ch, child in node.children.items():
-            new.children[ch] = self._clone_subtree(child)
+            new.add_child(ch, self._clone_subtree(child))
         return new
 
     def _count_words(self, node) -> int:
         """Count distinct words (end markers) in a subtree."""
-        cnt = 1 if getattr(node, "is_end", False) else 0
-        for child in node.children.values():
-            cnt += self._count_words(child)
-        return cnt
+        return node.count
+
+
+# --- self-check --------------------------------------------------------------
+#
+#   cd src && python -m trie.prefix_trie --ops 2000 --seed 0
+#
+# Runs random edits against a PrefixTrie and a plain dict, and after each one
+# compares the words, the count/mass aggregates of every node, and
+# count_prefix / frequency_mass / rank / select / range with brute force
+# (exits 1 on any mismatch).
+
+def _aggregate_errors(trie: PrefixTrie) -> list[str]:
+    """Nodes whose count/mass differ from their subtree's, or that hold no word."""
+    errors: list[str] = []
+
+    def walk(node, word: str) -> tuple[int, int]:
+        count, mass = (1, node.frequency) if node.is_end else (0, 0)
+        for ch, child in node.children.items():
+            c, m = walk(child, word + ch)
+            count += c
+            mass += m
+        if (node.count, node.mass) != (count, mass):
+            errors.append(f"node {word!r}: count/mass {node.count}/{node.mass}, subtree has {count}/{mass}")
+        if word and not count:
+            errors.append(f"node {word!r}: left in the trie without words")
+        return count, mass
+
+    walk(trie.root, "")
+    return errors
+
+
+def _query_errors(trie: PrefixTrie, ref: dict, rng, alphabet: str) -> list[str]:
+    """count_prefix / frequency_mass / rank / select / range against sorted(ref)."""
+    from bisect import bisect_left
+
+    errors: list[str] = []
+    words = sorted(ref)
+    got = sorted(zip(trie.list_words(), trie.get_frequencies(trie.list_words())))
+    if got != sorted(ref.items()):
+        errors.append(f"words differ: {len(got)} in the trie, {len(ref)} expected")
+        return errors
+
+    def probe() -> str:
+        if words and rng.random() < 0.6:
+            w = rng.choice(words)
+            return w[:rng.randint(0, len(w))] + ("" if rng.random() < 0.7 else rng.choice(alphabet))
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 4)))
+
+    for _ in range(20):
+        p = probe()
+        below = [w for w in words if w.startswith(p)]
+        if trie.count_prefix(p) != len(below):
+            errors.append(f"count_prefix({p!r}) = {trie.count_prefix(p)}, expected {len(below)}")
+        if trie.frequency_mass(p) != sum(ref[w] for w in below):
+            errors.append(f"frequency_mass({p!r}) = {trie.frequency_mass(p)}, "
+                          f"expected {sum(ref[w] for w in below)}")
+        if trie.rank(p) != bisect_left(words, p):
+            errors.append(f"rank({p!r}) = {trie.rank(p)}, expected {bisect_left(words, p)}")
+        lo, hi = sorted((p, probe()))
+        hi = None if rng.random() < 0.2 else hi
+        limit = rng.choice([None, 1, 3, 10])
+        want = [(w, ref[w]) for w in words if w >= lo and (hi is None or w < hi)][:limit]
+        if trie.range(lo, hi, limit) != want:
+            errors.append(f"range({lo!r}, {hi!r}, {limit}) differs")
+    for k in ([0, len(words) - 1, -1, rng.randrange(len(words))] if words else []):
+        if trie.select(k) != words[k]:
+            errors.append(f"select({k}) = {trie.select(k)!r}, expected {words[k]!r}")
+    for k in (len(words), -len(words) - 1):
+        try:
+            trie.select(k)
+            errors.append(f"select({k}) did not raise IndexError")
+        except IndexError:
+            pass
+    return errors
+
+
+def check(ops: int = 2000, seed: int = 0, alphabet: str = "abcd") -> list[str]:
+    """
+    Apply `ops` random edits (insert, insert_many, delete, delete_many,
+    merge_trie, difference, intersection, union, map_frequency, filter,
+    clear) to a PrefixTrie and to a dict, checking each edit's return value
+    and then the trie's aggregates and queries. Returns the mismatches found.
+    """
+    import random
+
+    rng = random.Random(seed)
+    trie, ref = PrefixTrie(), {}
+    errors: list[str] = []
+
+    def word() -> str:
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6)))
+
+    def other_trie() -> tuple[PrefixTrie, dict]:
+        pairs = {word(): rng.randint(1, 9) for _ in range(rng.randint(0, 30))}
+        if ref and rng.random() < 0.7:
+            pairs.update((w, rng.randint(1, 9)) for w in rng.sample(sorted(ref), min(len(ref), 10)))
+        other = PrefixTrie()
+        other.insert_many(pairs.items())
+        return other, pairs
+
+    def reshaped(new: dict) -> tuple[int, int, int]:
+        """Set ref to `new` (frequencies <= 0 dropped); the (added, changed, removed) of that."""
+        new = {w: f for w, f in new.items() if f > 0}
+        counts = (sum(w not in ref for w in new), sum(w in ref and ref[w] != f for w, f in new.items()),
+                  sum(w not in new for w in ref))
+        ref.clear()
+        ref.update(new)
+        return counts
+
+    combiners = [None, operator.add, max, min, lambda a, b: b, lambda a, b: a - b]
+    for step in range(ops):
+        kind = rng.choice(["insert", "insert", "insert_many", "insert_many", "delete", "delete_many",
+                           "merge_trie", "difference", "intersection", "union", "map_frequency",
+                           "filter", "clear"] if step % 50 == 49 else
+                          ["insert", "insert", "insert_many", "insert_many", "delete", "delete_many",
+                           "merge_trie", "difference", "intersection", "union", "map_frequency", "filter"])
+        if kind == "insert":
+            w, f = word(), rng.randint(1, 9)
+            trie.insert(w, f)
+            ref[w] = ref.get(w, 0) + f
+        elif kind == "insert_many":
+            items = [(word(), rng.randint(1, 9)) for _ in range(rng.randint(0, 20))]
+            got = trie.insert_many(items)
+            added = updated = 0
+            for w, f in items:
+                added, updated = (added, updated + 1) if w in ref else (added + 1, updated)
+                ref[w] = ref.get(w, 0) + f
+            if got != (added, updated):
+                errors.append(f"step {step}: insert_many returned {got}, expected {(added, updated)}")
+        elif kind == "delete":
+            w = rng.choice(sorted(ref)) if ref and rng.random() < 0.7 else word()
+            if trie.delete(w) != (w in ref):
+                errors.append(f"step {step}: delete({w!r}) returned {not (w in ref)}")
+            ref.pop(w, None)
+        elif kind == "delete_many":
+            ws = [rng.choice(sorted(ref)) if ref and rng.random() < 0.6 else word()
+                  for _ in range(rng.randint(0, 10))]
+            got = trie.delete_many(ws)
+            want = []
+            for w in ws:
+                want.append(w in ref)
+                ref.pop(w, None)
+            if got != want:
+                errors.append(f"step {step}: delete_many returned {got}, expected {want}")
+        elif kind == "merge_trie":
+            other, pairs = other_trie()
+            consume = rng.random() < 0.5
+            want = (sum(w not in ref for w in pairs), sum(w in ref for w in pairs))
+            got = trie.merge_trie(other, consume=consume)
+            for w, f in pairs.items():
+                ref[w] = ref.get(w, 0) + f
+            if got != want:
+                errors.append(f"step {step}: merge_trie returned {got}, expected {want}")
+            if consume and other.root.count:
+                errors.append(f"step {step}: merge_trie(consume=True) left words in the other trie")
+        elif kind in ("difference", "intersection", "union"):
+            other, pairs = other_trie()
+            if kind == "difference":
+                got, want = trie.difference(other), reshaped({w: f for w, f in ref.items() if w not in pairs})
+            elif kind == "intersection":
+                combine = rng.choice(combiners)
+                got = trie.intersection(other, combine)
+                want = reshaped({w: (f if combine is None else combine(f, pairs[w]))
+                                 for w, f in ref.items() if w in pairs})
+            else:
+                combine = rng.choice(combiners[1:])
+                got = trie.union(other, combine)
+                new = dict(ref)
+                for w, f in pairs.items():
+                    new[w] = combine(ref[w], f) if w in ref else f
+                want = reshaped(new)
+            if got != want:
+                errors.append(f"step {step}: {kind} returned {got}, expected {want}")
+        elif kind == "map_frequency":
+            shift = rng.randint(-3, 3)
+            got = trie.map_frequency(lambda f: f + shift)
+            want = reshaped({w: f + shift for w, f in ref.items()})
+            if got != want:
+                errors.append(f"step {step}: map_frequency returned {got}, expected {want}")
+        elif kind == "filter":
+            m = rng.randint(1, 12)
+            got = trie.filter(m)
+            want = reshaped({w: f for w, f in ref.items() if f >= m})
+            if got != want:
+                errors.append(f"step {step}: filter({m}) returned {got}, expected {want}")
+        else:
+            trie.clear()
+            ref.clear()
+
+        found = _aggregate_errors(trie) + _query_errors(trie, ref, rng, alphabet)
+        errors.extend(f"step {step} ({kind}): {e}" for e in found)
+        if len(errors) > 50:
+            break
+    return errors
+
+
+def main(argv=None) -> int:
+    import argparse
+    import sys
+    ap = argparse.ArgumentParser(description="Check PrefixTrie edits, aggregates and order queries against brute force.")
+    ap.add_argument("--ops", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    errors = check(args.ops, args.seed)
+    print(f"{args.ops:,} random edits: {len(errors)} mismatch(es)", file=sys.stderr)
+    for e in errors[:20]:
+        print(e)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
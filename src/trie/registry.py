@@ -0,0 +1,198 @@
+# src/trie/registry.py
+from __future__ import annotations
+import atexit
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .prefix_trie import PrefixTrie
+from .trie_node import EMPTY_CHILDREN
+
+
+def approx_trie_bytes(trie: PrefixTrie) -> int:
+    """
+    Rough memory footprint of a trie: node objects, children containers and
+    frequency ints (leaves share one empty map; single-char keys are shared by CPython).
+    """
+    total = 0
+    stack = [trie.root]
+    while stack:
+        node = stack.pop()
+        total += sys.getsizeof(node) + sys.getsizeof(node.frequency)
+        if node.children is not EMPTY_CHILDREN:
+            total += sys.getsizeof(node.children)
+        stack.extend(node.children.values())
+    return total
+
+
+class _Entry:
+    def __init__(self, name: str, source: str | None = None, trie: PrefixTrie | None = None):
+        self.name = name
+        self.source = source            # word,freq file for the first load
+        self.trie = trie                # None while not loaded / evicted
+        self.snapshot: str | None = None    # this entry's own file, named on first eviction
+        self.journal = None             # journal of an evicted trie, re-attached on reload
+        self.bytes = 0                  # last footprint estimate
+        self.measured_version = None    # trie.version the estimate belongs to
+
+
+class TrieRegistry:
+    """
+    Keeps several named tries. Tries are loaded on first use, and when the summed
+    footprint of loaded tries exceeds `memory_budget` the least-recently-used
+    ones (never the active one) are snapshotted to disk and dropped. An evicted
+    trie is reloaded from its snapshot the next time it is requested, with its
+    journal (if one was attached) attached again.
+
+    The budget is checked on registry operations (add, get/activate, budget
+    changes), not after every edit: measuring walks the whole trie.
+    `extra_bytes(trie)`, if given, adds memory held elsewhere on a trie's
+    behalf (e.g. features.glob_planner.index_bytes for its word index).
+    """
+    def __init__(self, memory_budget: int = 256 * 1024 * 1024, snapshot_dir: str | None = None,
+                 extra_bytes: Optional[Callable[[PrefixTrie], int]] = None):
+        self.memory_budget = memory_budget
+        self.extra_bytes = extra_bytes
+        self._own_dir = snapshot_dir is None
+        self.snapshot_dir = snapshot_dir or tempfile.mkdtemp(prefix="trie_registry_")
+        if self._own_dir:
+            atexit.register(self.close)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()   # LRU order, oldest first
+        self.active_name: str | None = None
+        self.loads = 0
+        self.evictions = 0
+        self._snapshots = 0             # numbers the snapshot files, so no two entries share one
+
+    # --- registration ----------------------------------------------------
+
+    def register(self, name: str, source: str) -> None:
+        """Register a word,freq file under `name`; it is loaded on first access."""
+        if name in self._entries:
+            raise ValueError(f"Trie '{name}' already registered")
+        if not os.path.isfile(source):
+            raise FileNotFoundError(source)
+        self._entries[name] = _Entry(name, source=source)
+
+    def add(self, name: str, trie: PrefixTrie) -> None:
+        """Register an already-built trie under `name`."""
+        if name in self._entries:
+            raise ValueError(f"Trie '{name}' already registered")
+        self._entries[name] = _Entry(name, trie=trie)
+        self.enforce_budget()
+
+    def remove(self, name: str) -> None:
+        if name == self.active_name:
+            raise ValueError("Cannot remove the active trie")
+        entry = self._entries.pop(name)
+        if entry.snapshot and os.path.exists(entry.snapshot):
+            os.remove(entry.snapshot)
+
+    def names(self) -> list[str]:
+        return list(self._entries)
+
+    # --- access ----------------------------------------------------------
+
+    def get(self, name: str) -> PrefixTrie:
+        """Return the trie named `name`, loading or reloading it if necessary."""
+        entry = self._entries[name]
+        if entry.trie is None:
+            trie = PrefixTrie()
+            trie.load_from_word_freq_file(entry.snapshot or entry.source)
+            # the journal already holds these words; it logs the edits from here on
+            trie.journal, entry.journal = entry.journal, None
+            entry.trie = trie
+            self.loads += 1
+        self._entries.move_to_end(name)
+        trie = entry.trie
+        self.enforce_budget(keep=name)
+        return trie
+
+    def activate(self, name: str) -> PrefixTrie:
+        """Make `name` the active (pinned) trie and return it."""
+        trie = self.get(name)
+        self.active_name = name
+        return trie
+
+    def active(self) -> PrefixTrie:
+        return self.get(self.active_name)
+
+    # --- memory accounting -------------------------------------------------
+
+    def _measure(self, entry: _Entry) -> int:
+        """Footprint of a loaded trie, plus its `extra_bytes`."""
+        if entry.trie is None:
+            return 0
+        if entry.measured_version != entry.trie.version:
+            entry.bytes = approx_trie_bytes(entry.trie)
+            entry.measured_version = entry.trie.version
+        return entry.bytes + (self.extra_bytes(entry.trie) if self.extra_bytes else 0)
+
+    def total_bytes(self) -> int:
+        return sum(self._measure(e) for e in self._entries.values())
+
+    def evict(self, name: str) -> None:
+        """Snapshot `name` to disk and drop it from memory."""
+        entry = self._entries[name]
+        if entry.trie is None:
+            return
+        if name == self.active_name:
+            raise ValueError("Cannot evict the active trie")
+        if entry.snapshot is None:
+            # the number keeps names that sanitize alike ('a/b', 'a b', 'a_b') apart
+            self._snapshots += 1
+            safe = re.sub(r"[^\w.-]", "_", name)
+            entry.snapshot = os.path.join(self.snapshot_dir, f"{self._snapshots:04d}_{safe}.txt")
+        entry.trie.save_to_file(entry.snapshot)
+        if entry.trie.journal is not None:
+            entry.trie.journal.commit()
+            entry.journal = entry.trie.journal
+        entry.trie = None
+        entry.bytes = 0
+        entry.measured_version = None
+        self.evictions += 1
+
+    def enforce_budget(self, keep: str | None = None) -> None:
+        """Evict least-recently-used tries (except the active one and `keep`) until within budget."""
+        total = self.total_bytes()
+        for name, entry in list(self._entries.items()):
+            if total <= self.memory_budget:
+                break
+            if entry.trie is None or name in (self.active_name, keep):
+                continue
+            if entry.trie.loader is not None:
+                continue        # still loading in the background
+            total -= self._measure(entry)
+            self.evict(name)
+
+    def poll_loads(self) -> list[str]:
+        """Apply finished background loads of every loaded trie; returns their messages."""
+        msgs = []
+        for name, entry in self._entries.items():
+            if entry.trie is not None:
+                msg = entry.trie.poll_load()
+                if msg:
+                    msgs.append(f"[{name}] {msg}")
+        return msgs
+
+    def status(self) -> list[dict]:
+        """One row per trie: name, active, loaded, approx bytes, snapshot and source paths."""
+        rows = []
+        for name, entry in self._entries.items():
+            rows.append({
+                "name": name,
+                "active": name == self.active_name,
+                "loaded": entry.trie is not None,
+                "bytes": self._measure(entry),
+                "snapshot": entry.snapshot,
+                "source": entry.source,
+            })
+        return rows
+
+    def close(self) -> None:
+        """Remove the snapshot directory if the registry created it."""
+        if self._own_dir:
+            shutil.rmtree(self.snapshot_dir, ignore_errors=True)
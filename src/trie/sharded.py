@@ -0,0 +1,485 @@
+# src/trie/sharded.py
+# Sharded trie: words are range-partitioned by leading prefix across several
+# PrefixTries, each held in this process, in a worker process or behind a
+# local socket.
+#
+#   cd src && TRIE_SHARD_AUTHKEY=<secret> python -m trie.sharded serve 127.0.0.1:6010
+#
+# A socket shard exchanges pickles, so it only listens on loopback addresses
+# or Unix socket paths, and every connection must prove the shared authkey
+# (there is no default key).
+from __future__ import annotations
+import heapq
+import ipaddress
+import os
+import pickle
+import sys
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from multiprocessing import AuthenticationError, Pipe, Process
+from multiprocessing.connection import Client, Listener
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .prefix_trie import PrefixTrie, _read_word_freq
+
+SHARD_PREFIX_LEN = 2        # shard boundaries are prefixes of at most this length
+LOAD_CHUNK = 50_000         # (word, freq) pairs routed per round while loading
+AUTHKEY_ENV = "TRIE_SHARD_AUTHKEY"    # where `serve` reads the authkey
+_GLOB_MARKS = "*?["
+
+
+def literal_prefix(pattern: str) -> str:
+    """Leading characters of a Glob+/wildcard pattern before its first mark."""
+    for i, ch in enumerate(pattern):
+        if ch in _GLOB_MARKS:
+            return pattern[:i]
+    return pattern
+
+
+def _rank(item: Tuple[str, int]):
+    return -item[1], item[0]
+
+
+# --- shard operations ----------------------------------------------------
+# Shared by every backend: the local shard calls them directly, the remote
+# ones run them in the server loop.
+
+def _op_glob(trie, pattern, top_k):
+    from features.pattern import glob_match
+    return glob_match(trie, pattern, top_k=top_k)
+
+
+def _op_best(trie, pattern):
+    word = trie.best_match(pattern)
+    return (word, trie.get_frequency(word)) if word else None
+
+
+def _op_size(trie):
+    return trie._count_words(trie.root)
+
+
+def _op_prefix_counts(trie, n):
+    """Word counts per leading prefix of length n (shorter words count under themselves)."""
+    counts: Counter = Counter()
+    stack = [(trie.root, "")]
+    while stack:
+        node, prefix = stack.pop()
+        if len(prefix) == n:
+            counts[prefix] = trie._count_words(node)
+            continue
+        if node.is_end:
+            counts[prefix] += 1
+        for ch, child in node.children.items():
+            stack.append((child, prefix + ch))
+    return counts
+
+
+def _op_extract(trie, lo, hi):
+    """Remove and return the (word, freq) pairs outside [lo, hi) (hi None = unbounded)."""
+    words = [w for w in trie.list_words() if w < lo or (hi is not None and w >= hi)]
+    items = list(zip(words, trie.get_frequencies(words)))
+    trie.delete_many(words)
+    return items
+
+
+def _op_items(trie):
+    words = trie.list_words()
+    return list(zip(words, trie.get_frequencies(words)))
+
+
+_OPS = {
+    "insert_many": PrefixTrie.insert_many,
+    "delete_many": PrefixTrie.delete_many,
+    "get_frequencies": PrefixTrie.get_frequencies,
+    "contains_many": PrefixTrie.contains_many,
+    "wildcard_match": PrefixTrie.wildcard_match,
+    "clear": PrefixTrie.clear,
+    "best": _op_best,
+    "glob": _op_glob,
+    "size": _op_size,
+    "prefix_counts": _op_prefix_counts,
+    "extract": _op_extract,
+    "items": _op_items,
+}
+
+
+def _sendable_error(e: Exception) -> Exception:
+    """`e` if it survives a pickle round trip, else a RuntimeError carrying its type and message."""
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        # e.g. it holds a lock, a file or a lambda, or its __init__ takes other arguments
+        return RuntimeError(f"{type(e).__name__}: {e}")
+
+
+def _serve_connection(trie: PrefixTrie, conn) -> None:
+    """Answer (op, args) requests on `conn` until it closes or sends 'close'."""
+    while True:
+        try:
+            op, args = conn.recv()
+        except EOFError:
+            return
+        if op == "close":
+            conn.send(("ok", None))
+            return
+        try:
+            conn.send(("ok", _OPS[op](trie, *args)))
+        except Exception as e:
+            conn.send(("err", _sendable_error(e)))
+
+
+def _serve_pipe(conn) -> None:
+    _serve_connection(PrefixTrie(), conn)
+    conn.close()
+
+
+def check_local_address(address) -> None:
+    """
+    Raise ValueError unless `address` is a Unix socket path (a str) or a
+    (host, port) pair on a loopback interface.
+    """
+    if isinstance(address, str):
+        return
+    host = address[0]
+    if host == "localhost":
+        return
+    try:
+        loopback = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError(f"Shard sockets are local only: {host!r} is not a loopback address")
+
+
+def _check_authkey(authkey: bytes) -> None:
+    if not authkey:
+        raise ValueError("A socket shard needs a non-empty authkey")
+
+
+def serve_shard(address, authkey: bytes) -> None:
+    """Hold one shard behind a local socket; clients are served one at a time."""
+    check_local_address(address)
+    _check_authkey(authkey)
+    trie = PrefixTrie()
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Shard listening on {listener.address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError):
+                continue        # a client without the key is dropped before anything is unpickled
+            with conn:
+                _serve_connection(trie, conn)
+
+
+# --- backends --------------------------------------------------------------
+# send() starts a request and recv() returns its result, so the facade can
+# have every shard working before it waits for the first answer.
+
+class LocalShard:
+    """Shard kept in this process."""
+    def __init__(self, trie: Optional[PrefixTrie] = None):
+        self.trie = trie if trie is not None else PrefixTrie()
+        self._result = None
+
+    def send(self, op: str, *args) -> None:
+        self._result = _OPS[op](self.trie, *args)
+
+    def recv(self):
+        result, self._result = self._result, None
+        return result
+
+    def call(self, op: str, *args):
+        self.send(op, *args)
+        return self.recv()
+
+    def close(self) -> None:
+        pass
+
+
+class _RemoteShard:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def send(self, op: str, *args) -> None:
+        self.conn.send((op, args))
+
+    def recv(self):
+        status, value = self.conn.recv()
+        if status == "err":
+            raise value
+        return value
+
+    def call(self, op: str, *args):
+        self.send(op, *args)
+        return self.recv()
+
+    def close(self) -> None:
+        if self.conn is None:
+            return
+        try:
+            self.call("close")
+        except (EOFError, OSError):
+            pass
+        self.conn.close()
+        self.conn = None
+
+
+class ProcessShard(_RemoteShard):
+    """Shard held by a dedicated worker process, reached through a pipe."""
+    def __init__(self):
+        parent, child = Pipe()
+        self.process = Process(target=_serve_pipe, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        super().__init__(parent)
+
+    def close(self) -> None:
+        super().close()
+        self.process.join(timeout=5)
+
+
+class SocketShard(_RemoteShard):
+    """Shard served by `serve_shard` on a local socket (loopback TCP or Unix path)."""
+    def __init__(self, address, authkey: bytes):
+        check_local_address(address)
+        _check_authkey(authkey)
+        super().__init__(Client(address, authkey=authkey))
+
+
+# --- facade ----------------------------------------------------------------
+
+class ShardedTrie:
+    """
+    PrefixTrie-like facade over range-partitioned shards.
+
+    Shard i holds the words w with bounds[i] <= w < bounds[i+1]; bounds are
+    short prefixes, so every word starting with a given literal prefix lives
+    in a contiguous run of shards (usually one). Lookups go to the owning
+    shard, patterns are routed by their literal prefix, and patterns
+    starting with '*', '?' or '[' fan out to every shard and the per-shard
+    top-k lists are merged. rebalance() moves the bounds to even out the
+    observed shard sizes.
+    """
+    def __init__(self, shards: Sequence, bounds: Optional[Sequence[str]] = None):
+        if not shards:
+            raise ValueError("A sharded trie needs at least one shard")
+        self.shards = list(shards)
+        self.bounds = list(bounds) if bounds is not None else self.even_bounds(len(self.shards))
+        if len(self.bounds) != len(self.shards) or self.bounds[0] != "":
+            raise ValueError("Need one bound per shard, starting with ''")
+
+    @classmethod
+    def local(cls, n: int) -> "ShardedTrie":
+        return cls([LocalShard() for _ in range(n)])
+
+    @classmethod
+    def processes(cls, n: int) -> "ShardedTrie":
+        return cls([ProcessShard() for _ in range(n)])
+
+    @classmethod
+    def sockets(cls, addresses: Sequence, authkey: bytes) -> "ShardedTrie":
+        return cls([SocketShard(a, authkey) for a in addresses])
+
+    @staticmethod
+    def even_bounds(n: int) -> List[str]:
+        """Split 'a'..'z' into n roughly equal letter ranges (before any size is known)."""
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        return [""] + [letters[len(letters) * i // n] for i in range(1, n)]
+
+    # --- routing -----------------------------------------------------------
+
+    def shard_of(self, word: str) -> int:
+        return bisect_right(self.bounds, word) - 1
+
+    def shards_for_prefix(self, prefix: str) -> range:
+        """Indices of the shards that can hold words starting with `prefix`."""
+        if not prefix:
+            return range(len(self.shards))
+        first = self.shard_of(prefix)
+        # the first bound not starting with `prefix` and above it ends the run
+        last = bisect_left(self.bounds, prefix + "\U0010ffff")
+        return range(first, max(first + 1, last))
+
+    def _partition(self, words: Iterable[str]) -> List[List[int]]:
+        """Input positions grouped by owning shard."""
+        groups: List[List[int]] = [[] for _ in self.shards]
+        for i, w in enumerate(words):
+            groups[self.shard_of(w)].append(i)
+        return groups
+
+    def _scatter(self, op: str, keys: list) -> list:
+        """Run a batch op on the owning shard of each key; results in input order."""
+        groups = self._partition(keys)
+        out = [None] * len(keys)
+        busy = []
+        for s, idx in enumerate(groups):
+            if idx:
+                self.shards[s].send(op, [keys[i] for i in idx])
+                busy.append((s, idx))
+        for s, idx in busy:
+            for i, r in zip(idx, self.shards[s].recv()):
+                out[i] = r
+        return out
+
+    def _gather(self, shard_ids, op: str, *args) -> list:
+        for s in shard_ids:
+            self.shards[s].send(op, *args)
+        return [self.shards[s].recv() for s in shard_ids]
+
+    # --- updates -----------------------------------------------------------
+
+    def insert(self, word: str, frequency: int = 1) -> None:
+        self.shards[self.shard_of(word)].call("insert_many", [(word, frequency)])
+
+    def insert_many(self, items) -> Tuple[int, int]:
+        """Insert (word, freq) pairs, each shard building its part in parallel."""
+        items = list(items)
+        groups = self._partition(w for w, _ in items)
+        busy = [s for s, idx in enumerate(groups) if idx]
+        for s in busy:
+            self.shards[s].send("insert_many", [items[i] for i in groups[s]])
+        added = updated = 0
+        for s in busy:
+            a, u = self.shards[s].recv()
+            added += a
+            updated += u
+        return added, updated
+
+    def delete(self, word: str) -> bool:
+        return self.shards[self.shard_of(word)].call("delete_many", [word])[0]
+
+    def delete_many(self, words) -> List[bool]:
+        return self._scatter("delete_many", list(words))
+
+    def clear(self) -> None:
+        self._gather(range(len(self.shards)), "clear")
+
+    def load_from_word_freq_file(self, filepath: str) -> None:
+        """Replace every shard's contents with the words of a word,freq file."""
+        self.clear()
+        self.merge_from_word_freq_file(filepath)
+
+    def merge_from_word_freq_file(self, filepath: str) -> Tuple[int, int]:
+        """Add a word,freq file chunk by chunk; each shard only receives its own words."""
+        added = updated = 0
+        chunk: list = []
+        for item in _read_word_freq(filepath):
+            chunk.append(item)
+            if len(chunk) >= LOAD_CHUNK:
+                a, u = self.insert_many(chunk)
+                added, updated, chunk = added + a, updated + u, []
+        a, u = self.insert_many(chunk)
+        return added + a, updated + u
+
+    def merge_trie(self, other) -> Tuple[int, int]:
+        """Merge a PrefixTrie (or another ShardedTrie) into the shards."""
+        if isinstance(other, ShardedTrie):
+            items = [it for part in other._gather(range(len(other.shards)), "items") for it in part]
+        else:
+            words = other.list_words()
+            items = list(zip(words, other.get_frequencies(words)))
+        return self.insert_many(items)
+
+    # --- queries -----------------------------------------------------------
+
+    def search(self, word: str) -> bool:
+        return self.shards[self.shard_of(word)].call("contains_many", [word])[0]
+
+    def get_frequency(self, word: str) -> int:
+        return self.shards[self.shard_of(word)].call("get_frequencies", [word])[0]
+
+    def contains_many(self, words) -> List[bool]:
+        return self._scatter("contains_many", list(words))
+
+    def get_frequencies(self, words) -> List[int]:
+        return self._scatter("get_frequencies", list(words))
+
+    def wildcard_match(self, pattern: str) -> List[str]:
+        """'*' = exactly one character; shards are visited in key order."""
+        parts = self._gather(self.shards_for_prefix(literal_prefix(pattern)), "wildcard_match", pattern)
+        return [w for part in parts for w in part]
+
+    def best_match(self, pattern: str) -> Optional[str]:
+        found = [b for b in self._gather(self.shards_for_prefix(literal_prefix(pattern)), "best", pattern) if b]
+        return max(found, key=lambda b: b[1])[0] if found else None
+
+    def glob_match(self, pattern: str, top_k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Glob+ match; each shard returns its own top_k and the lists are merged."""
+        parts = self._gather(self.shards_for_prefix(literal_prefix(pattern)), "glob", pattern, top_k)
+        merged = list(heapq.merge(*parts, key=_rank))
+        return merged[:top_k] if top_k is not None else merged
+
+    def list_words(self) -> List[str]:
+        return [w for part in self._gather(range(len(self.shards)), "items") for w, _ in part]
+
+    def sizes(self) -> List[int]:
+        return self._gather(range(len(self.shards)), "size")
+
+    def __len__(self) -> int:
+        return sum(self.sizes())
+
+    # --- rebalancing -------------------------------------------------------
+
+    def rebalance(self) -> List[int]:
+        """
+        Recompute the bounds so shards hold about the same number of words,
+        using per-prefix counts reported by the shards, then move only the
+        words whose owner changed. Returns the new shard sizes.
+        """
+        counts: Counter = Counter()
+        for part in self._gather(range(len(self.shards)), "prefix_counts", SHARD_PREFIX_LEN):
+            counts.update(part)
+        total = sum(counts.values())
+        n = len(self.shards)
+        bounds = [""]
+        seen = 0
+        for prefix in sorted(counts):
+            if len(bounds) < n and prefix > bounds[-1] and seen >= total * len(bounds) / n:
+                bounds.append(prefix)
+            seen += counts[prefix]
+        # fewer distinct prefixes than shards: keep the tail shards empty
+        while len(bounds) < n:
+            bounds.append(bounds[-1] + "\U0010ffff")
+
+        ranges = [(bounds[i], bounds[i + 1] if i + 1 < n else None) for i in range(n)]
+        moved = [it for part in self._gather_ranges(ranges) for it in part]
+        self.bounds = bounds
+        self.insert_many(moved)
+        return self.sizes()
+
+    def _gather_ranges(self, ranges) -> list:
+        for shard, (lo, hi) in zip(self.shards, ranges):
+            shard.send("extract", lo, hi)
+        return [shard.recv() for shard in self.shards]
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
+
+    def __enter__(self) -> "ShardedTrie":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _parse_address(text: str):
+    host, sep, port = text.rpartition(":")
+    return (host, int(port)) if sep and port.isdigit() else text
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "serve":
+        print(f"usage: {AUTHKEY_ENV}=<secret> python -m trie.sharded serve HOST:PORT|SOCKET_PATH")
+        sys.exit(2)
+    key = os.environ.get(AUTHKEY_ENV, "")
+    if not key:
+        print(f"Set {AUTHKEY_ENV} to the shared secret the clients will use.")
+        sys.exit(2)
+    try:
+        serve_shard(_parse_address(sys.argv[2]), key.encode())
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
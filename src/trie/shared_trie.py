@@ -0,0 +1,139 @@
+# src/trie/shared_trie.py
+from __future__ import annotations
+from array import array
+from multiprocessing import parent_process, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional
+
+from .dawg import FrozenDawg
+
+_MAGIC = int.from_bytes(b"SDAWG1\0\0", "little")
+_HEADER = 6                  # magic, first, final, edges, words, total bytes (all 8-byte)
+
+# (attribute, typecode) in block order; 8-byte arrays first keeps every array aligned
+_LAYOUT = (("freqs", "q"), ("first", "I"), ("labels", "I"), ("targets", "I"),
+           ("offsets", "I"), ("final", "B"))
+
+# blocks created by this process (already tracked here; the owner unlinks them)
+_published: set = set()
+
+
+def _open_existing(name: str) -> SharedMemory:
+    """Attach without making this process responsible for unlinking the block."""
+    try:
+        return SharedMemory(name=name, track=False)     # Python 3.13+
+    except TypeError:
+        shm = SharedMemory(name=name)
+        # multiprocessing children share the parent's tracker, where the block
+        # is already registered; an unrelated process would unlink it on exit
+        if parent_process() is None and shm.name not in _published:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedDawg(FrozenDawg):
+    """
+    A FrozenDawg whose flat arrays live in one multiprocessing.shared_memory
+    block. The publishing process copies the arrays in once; any other
+    process attaches by name and reads them in place through typed
+    memoryviews, so attaching costs no parsing, unpickling or per-process
+    copy. All FrozenDawg queries (search, wildcard_match, glob_match,
+    best_match, ...) work unchanged; each process keeps its own match cache.
+    """
+    def __init__(self, shm: SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        buf = shm.buf
+        header = buf[: _HEADER * 8].cast("Q")
+        if header[0] != _MAGIC:
+            header.release()
+            raise ValueError(f"Shared memory block {shm.name!r} does not hold a trie")
+        sizes = {"first": header[1], "final": header[2], "labels": header[3],
+                 "targets": header[3], "offsets": header[3], "freqs": header[4]}
+        header.release()
+
+        self._views: List[memoryview] = []
+        pos = _HEADER * 8
+        arrays = {}
+        for attr, code in _LAYOUT:
+            nbytes = sizes[attr] * array(code).itemsize
+            view = buf[pos: pos + nbytes].cast(code)
+            self._views.append(view)
+            arrays[attr] = view
+            pos += nbytes
+        super().__init__(arrays["first"], arrays["final"], arrays["labels"],
+                         arrays["targets"], arrays["offsets"], arrays["freqs"])
+
+    @classmethod
+    def publish(cls, source, name: Optional[str] = None) -> "SharedDawg":
+        """
+        Copy `source` (a PrefixTrie or FrozenDawg) into a new shared memory
+        block. The returned object owns the block: close() unlinks it.
+        """
+        dawg = source if isinstance(source, FrozenDawg) else source.freeze()
+        parts = {"first": array("I", dawg.first), "final": bytes(dawg.final),
+                 "labels": array("I", dawg.labels), "targets": array("I", dawg.targets),
+                 "offsets": array("I", dawg.offsets), "freqs": array("q", dawg.freqs)}
+        blobs = [memoryview(parts[attr]).cast("B") for attr, _ in _LAYOUT]
+        total = _HEADER * 8 + sum(len(b) for b in blobs)
+        header = array("Q", [_MAGIC, len(parts["first"]), len(parts["final"]),
+                             len(parts["labels"]), len(parts["freqs"]), total])
+
+        shm = SharedMemory(name=name, create=True, size=total)
+        _published.add(shm.name)
+        try:
+            buf = shm.buf
+            buf[: _HEADER * 8] = memoryview(header).cast("B")
+            pos = _HEADER * 8
+            for b in blobs:
+                buf[pos: pos + len(b)] = b
+                pos += len(b)
+            del buf
+            return cls(shm, owner=True)
+        except BaseException:
+            _published.discard(shm.name)
+            shm.close()
+            shm.unlink()
+            raise
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedDawg":
+        """Map a block published by another process (read-only by convention)."""
+        shm = _open_existing(name)
+        try:
+            return cls(shm, owner=False)
+        except BaseException:
+            shm.close()
+            raise
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def close(self) -> None:
+        """Drop this process's mapping; the owner also unlinks the block."""
+        if self._shm is None:
+            return
+        self.first = self.final = self.labels = self.targets = self.offsets = self.freqs = None
+        for view in self._views:
+            view.release()
+        self._views = []
+        self.match_cache.clear()
+        shm, self._shm = self._shm, None
+        shm.close()
+        if self._owner:
+            _published.discard(shm.name)
+            shm.unlink()
+
+    def __enter__(self) -> "SharedDawg":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __reduce__(self):
+        # pickling (e.g. as a Pool initarg) sends only the block name
+        return (SharedDawg.attach, (self.name,))
@@ -1,8 +1,68 @@
+class _EmptyChildren(dict):
+    """
+    The child map shared by every leaf: an empty dict that refuses writes.
+    Reads are plain dict reads; TrieNode.add_child gives a node its own dict
+    before the first child goes in, and remove_child hands this map back
+    once the last one is gone.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("EMPTY_CHILDREN is shared and read-only; use TrieNode.add_child")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    setdefault = update = pop = popitem = clear = _read_only
+
+    def __reduce__(self):
+        # pickle/deepcopy: the shared empty map stays shared
+        return "EMPTY_CHILDREN"
+
+
+# shared, read-only child map of every leaf
+EMPTY_CHILDREN = _EmptyChildren()
+
+
 class TrieNode:
+    __slots__ = ("children", "is_end", "frequency", "count", "mass", "digest")
+
     def __init__(self):
-        # child characters → TrieNode
-        self.children: dict[str, TrieNode] = {}
+        # child characters → TrieNode, in insertion order; read like a dict,
+        # change via add_child/remove_child
+        self.children: dict[str, TrieNode] = EMPTY_CHILDREN
         # marks end of a complete word
         self.is_end: bool = False
         # frequency count for word-restoration ranking
         self.frequency: int = 0
+        # words ending at or below this node, and the sum of their
+        # frequencies; both kept up to date by PrefixTrie
+        self.count: int = 0
+        self.mass: int = 0
+        # hash of the subtree (trie/delta.py); None until computed and after
+        # any edit below this node
+        self.digest: int | None = None
+
+    def __getstate__(self):
+        # the digest is left out: str hashes differ from one process to the next
+        return self.children, self.is_end, self.frequency, self.count, self.mass
+
+    def __setstate__(self, state) -> None:
+        self.children, self.is_end, self.frequency, self.count, self.mass = state
+        self.digest = None
+
+    def add_child(self, ch: str, node: "TrieNode | None" = None) -> "TrieNode":
+        """Attach `node` (or a new node) under `ch`, replacing any existing child; returns it."""
+        if node is None:
+            node = TrieNode()
+        if self.children is EMPTY_CHILDREN:
+            self.children = {}
+        self.children[ch] = node
+        return node
+
+    def remove_child(self, ch: str) -> None:
+        """Detach the child under `ch` (KeyError if absent)."""
+        kids = self.children
+        if kids is EMPTY_CHILDREN:
+            raise KeyError(ch)
+        del kids[ch]
+        if not kids:
+            self.children = EMPTY_CHILDREN
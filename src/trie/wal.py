@@ -0,0 +1,326 @@
+# src/trie/wal.py
+from __future__ import annotations
+import atexit
+import os
+import re
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+SNAPSHOT = "snapshot.txt"
+LOG = "journal.log"
+FOLDING = "journal.old"     # log segment being folded into the snapshot
+
+OP_INSERT = "+"             # payload: word, freq (frequency is added)
+OP_DELETE = "-"             # payload: word
+OP_RESET = "!"              # no payload: trie cleared (e.g. before a load)
+
+# words are written with backslash, tab and line breaks escaped, so any word
+# fits on one line and the tab between word and frequency stays unambiguous
+_ESCAPE = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+_UNESCAPE = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+_ESCAPED = re.compile(r"\\(.)")
+
+
+def _escape(word: str) -> str:
+    return word.translate(_ESCAPE)
+
+
+def _unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    return _ESCAPED.sub(lambda m: _UNESCAPE.get(m.group(1), m.group(1)), text)
+
+
+def _read_snapshot(path: str) -> Tuple[int, List[Tuple[str, int]]]:
+    """Return (last folded seq, [(word, freq)]) from a snapshot file."""
+    if not os.path.exists(path):
+        return 0, []
+    items: List[Tuple[str, int]] = []
+    seq = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("#seq="):
+                seq = int(line[5:])
+                continue
+            if not line:
+                continue
+            word, _, freq = line.rpartition(",")
+            items.append((_unescape(word), int(freq)))
+    return seq, items
+
+
+def _read_batches(path: str) -> Iterator[Tuple[int, str, List[List[str]]]]:
+    """
+    Yield (seq, op, payload rows) for every complete batch in a log file.
+    A batch is a header line "seq<TAB>op<TAB>count" followed by `count`
+    payload lines; a torn batch at the end of the file is ignored.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            header = f.readline()
+            if not header.endswith("\n"):
+                return
+            seq, op, count = header.rstrip("\n").split("\t")
+            rows = []
+            for _ in range(int(count)):
+                line = f.readline()
+                if not line.endswith("\n"):
+                    return
+                rows.append([_unescape(field) for field in line.rstrip("\n").split("\t")])
+            yield int(seq), op, rows
+
+
+def _write_snapshot(path: str, seq: int, items: Iterable[Tuple[str, int]]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(f"#seq={seq}\n")
+        for word, freq in items:
+            f.write(f"{_escape(word)},{freq}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class TrieJournal:
+    """
+    Write-ahead log + snapshot for a PrefixTrie.
+
+    Every mutation is appended to journal.log as one batch (insert, delete,
+    reset); batches are buffered and written with a single fsync per group
+    (group commit), so a save costs O(size of the change). On startup the
+    last snapshot is loaded and newer batches are replayed on top of it.
+    When the log grows past `compact_bytes` it is rotated and a background
+    thread folds it into a fresh snapshot without touching the live trie.
+    A fold that fails keeps journal.old and is recorded in
+    `compaction_error`; the next compaction trigger (or the next open)
+    folds journal.old again before the log is rotated any further.
+    """
+    def __init__(self, directory: str, commit_interval: float = 0.05,
+                 group_size: int = 64, compact_bytes: int = 4 * 1024 * 1024):
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.group_size = group_size
+        self.compact_bytes = compact_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pending: List[str] = []       # encoded batches not yet written
+        self._pending_since = 0.0
+        self._seq = 0
+        self._fh = None
+        self._compactor: Optional[threading.Thread] = None
+        self._closed = False
+        self._trie = None               # trie this journal is attached to
+        self._started = False           # flusher thread running, close() registered at exit
+        self.compaction_error: Optional[BaseException] = None
+        self.batches_written = 0
+        self.fsyncs = 0
+        self.compactions = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # --- startup -------------------------------------------------------------
+
+    def has_state(self) -> bool:
+        return any(os.path.exists(self._path(n)) for n in (SNAPSHOT, LOG, FOLDING))
+
+    def attach(self, trie) -> int:
+        """
+        Attach to `trie`. If the directory already holds a journal the trie is
+        rebuilt from it (see replay_into); otherwise the trie's current words
+        become the initial snapshot. Returns the number of batches replayed.
+        """
+        if self.has_state():
+            return self.replay_into(trie)
+        words = trie.list_words()
+        _write_snapshot(self._path(SNAPSHOT), 0, zip(words, trie.get_frequencies(words)))
+        return self.replay_into(trie)
+
+    def replay_into(self, trie) -> int:
+        """
+        Rebuild `trie` from snapshot + log(s), then attach this journal to it
+        (detaching it from a trie it was attached to before). Returns the
+        number of batches replayed.
+        """
+        with self._lock:
+            self._flush_locked()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._trie is not None:
+            self._trie.journal = None
+        trie.journal = None
+        seq, items = _read_snapshot(self._path(SNAPSHOT))
+        trie.clear()
+        trie.insert_many(items)
+        replayed = 0
+        for name in (FOLDING, LOG):
+            for bseq, op, rows in _read_batches(self._path(name)):
+                if bseq <= seq:
+                    continue
+                if op == OP_INSERT:
+                    trie.insert_many((w, int(f)) for w, f in rows)
+                elif op == OP_DELETE:
+                    trie.delete_many(w for (w,) in rows)
+                elif op == OP_RESET:
+                    trie.clear()
+                seq = bseq
+                replayed += 1
+        self._seq = seq
+
+        # finish a compaction that was interrupted by a crash or failed
+        if os.path.exists(self._path(FOLDING)):
+            self._fold()
+        self._fh = open(self._path(LOG), "a", encoding="utf-8")
+        self._trie = trie
+        trie.journal = self
+        if not self._started:
+            self._started = True
+            threading.Thread(target=self._flusher, daemon=True).start()
+            atexit.register(self.close)
+        return replayed
+
+    # --- logging -------------------------------------------------------------
+
+    def _append(self, op: str, rows: List[str]) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._seq += 1
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(f"{self._seq}\t{op}\t{len(rows)}\n" + "".join(rows))
+            if len(self._pending) >= self.group_size:
+                self._flush_locked()
+
+    def log_insert(self, items: Iterable[Tuple[str, int]]) -> None:
+        rows = [f"{_escape(w)}\t{f}\n" for w, f in items]
+        if rows:
+            self._append(OP_INSERT, rows)
+
+    def log_delete(self, words: Iterable[str]) -> None:
+        rows = [f"{_escape(w)}\n" for w in words]
+        if rows:
+            self._append(OP_DELETE, rows)
+
+    def log_reset(self) -> None:
+        self._append(OP_RESET, [])
+
+    # --- group commit --------------------------------------------------------
+
+    def _flush_locked(self) -> None:
+        if not self._pending or self._fh is None:
+            return
+        self._fh.write("".join(self._pending))
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self.batches_written += len(self._pending)
+        self.fsyncs += 1
+        self._pending.clear()
+        if self._fh.tell() >= self.compact_bytes:
+            self._start_compaction_locked()
+
+    def commit(self) -> None:
+        """Write and fsync every pending batch now."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flusher(self) -> None:
+        while True:
+            time.sleep(self.commit_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                if self._pending and time.monotonic() - self._pending_since >= self.commit_interval:
+                    self._flush_locked()
+
+    # --- compaction ----------------------------------------------------------
+
+    def compact(self, wait: bool = False) -> bool:
+        """Rotate the log and fold it into a new snapshot in the background."""
+        with self._lock:
+            self._flush_locked()
+            started = self._start_compaction_locked()
+            worker = self._compactor
+        if wait and worker is not None:
+            worker.join()
+        return started
+
+    def _start_compaction_locked(self) -> bool:
+        if self._compactor is not None and self._compactor.is_alive():
+            return False
+        if os.path.exists(self._path(FOLDING)):
+            # an earlier fold failed: retry it; the log rotates once it is done
+            self._compactor = threading.Thread(target=self._fold, daemon=True)
+            self._compactor.start()
+            return True
+        if self._fh.tell() == 0:
+            return False
+        self._fh.close()
+        os.replace(self._path(LOG), self._path(FOLDING))
+        self._fh = open(self._path(LOG), "a", encoding="utf-8")
+        self._compactor = threading.Thread(target=self._fold, daemon=True)
+        self._compactor.start()
+        return True
+
+    def _fold(self) -> None:
+        """
+        snapshot + journal.old -> new snapshot; replays the same semantics as
+        the trie. On failure journal.old is kept and the error recorded; the
+        fold can simply run again (batches already in the snapshot are skipped).
+        """
+        try:
+            self._fold_once()
+        except Exception as e:
+            self.compaction_error = e
+        else:
+            self.compaction_error = None
+
+    def _fold_once(self) -> None:
+        seq, items = _read_snapshot(self._path(SNAPSHOT))
+        words = dict(items)
+        for bseq, op, rows in _read_batches(self._path(FOLDING)):
+            if bseq <= seq:
+                continue
+            if op == OP_INSERT:
+                for w, f in rows:
+                    words[w] = words.get(w, 0) + int(f)
+            elif op == OP_DELETE:
+                for (w,) in rows:
+                    words.pop(w, None)
+            elif op == OP_RESET:
+                words.clear()
+            seq = bseq
+        _write_snapshot(self._path(SNAPSHOT), seq, sorted(words.items()))
+        os.remove(self._path(FOLDING))
+        self.compactions += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._closed = True
+            if self._fh is not None:
+                self._fh.close()
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def stats(self) -> dict:
+        log = self._path(LOG)
+        return {
+            "seq": self._seq,
+            "pending": len(self._pending),
+            "batches_written": self.batches_written,
+            "fsyncs": self.fsyncs,
+            "compactions": self.compactions,
+            "compaction_error": None if self.compaction_error is None else str(self.compaction_error),
+            "log_bytes": os.path.getsize(log) if os.path.exists(log) else 0,
+        }
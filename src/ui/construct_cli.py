@@ -1,5 +1,6 @@
 # ui/construct_cli.py
 from trie.prefix_trie import PrefixTrie
+from trie.wal import TrieJournal
 
 def show_instructions():
     print(r"""
@@ -9,8 +10,9 @@ Construct/Edit Trie Commands:
   ?<word>        (search for a keyword)
   #              (display Trie)
   @              (write Trie display to file)
-  ~              (load keywords from file)
+  ~              (load keywords from file in the background; again: show progress)
   =              (dump keywords (word,frequency) to file)
+  %              (attach a journal directory: replay saved edits, then log every edit)
   !              (print these instructions)
   \              (exit back to Main Menu)
 """)
@@ -39,6 +41,22 @@ def _prompt_filepath(prompt: str, must_exist: bool = False) -> str | None:
         else:
             return path
 
+def _show_load(trie: PrefixTrie) -> None:
+    """Print the progress of the running background load and offer to cancel it."""
+    print(trie.loader.describe())
+    if input("Cancel this load? (y/N): ").strip().lower() == 'y':
+        trie.loader.cancel()
+        trie.poll_load()
+        print("Load cancelled; the trie keeps its current keywords.")
+
+def _load_pending(trie: PrefixTrie) -> bool:
+    """True (after saying why) while a background load would overwrite an edit."""
+    if trie.loader is None:
+        return False
+    print("A background load is in progress; its keywords replace the trie when it finishes, "
+          "so edits are disabled until then. Enter '~' for progress or to cancel it.")
+    return True
+
 def run_construct_cli(trie: PrefixTrie):
     show_instructions()
     while True:
@@ -46,12 +64,18 @@ def run_construct_cli(trie: PrefixTrie):
         if not cmd:
             continue
 
+        msg = trie.poll_load()
+        if msg:
+            print(msg)
+
         op, arg = cmd[0], cmd[1:].strip()
 
         if op == '+':
             if not arg:
                 print("Usage: +<keyword>")
                 continue
+            if _load_pending(trie):
+                continue
             trie.insert(arg, 1)
             print(f"Added '{arg}' (1).")
 
@@ -59,6 +83,8 @@ def run_construct_cli(trie: PrefixTrie):
             if not arg:
                 print("Usage: -<keyword>")
                 continue
+            if _load_pending(trie):
+                continue
             deleted = trie.delete(arg)
             print(f"Deleted '{arg}'." if deleted else f"Keyword \"{arg}\" is not found")
 
@@ -83,13 +109,18 @@ def run_construct_cli(trie: PrefixTrie):
                 print(f"Error saving trie: {e}")
 
         elif op == '~':
+            if trie.loader is not None:
+                _show_load(trie)
+                continue
             # NEW: prompt like Predict does
             path = _prompt_filepath("Please enter input file (word,frequency)", must_exist=True)
             if not path:
                 print("Load cancelled."); continue
+            priority = input("Prefixes to load first (space-separated, Enter for none): ").split()
             try:
-                trie.load_from_word_freq_file(path)
-                print(f"Keywords loaded from {path} into trie.")
+                trie.load_in_background(path, priority)
+                print(f"Loading {path} in the background; the current keywords stay "
+                      f"available until it finishes. Enter '~' for progress.")
             except Exception as e:
                 print(f"Error loading keywords: {e}")
 
@@ -104,6 +135,36 @@ def run_construct_cli(trie: PrefixTrie):
             except Exception as e:
                 print(f"Error dumping keywords: {e}")
 
+        elif op == '%':
+            if trie.journal is not None:
+                trie.journal.commit()
+                s = trie.journal.stats()
+                print(f"Journal: {trie.journal.directory} (seq {s['seq']}, "
+                      f"{s['log_bytes']} bytes in log, {s['compactions']} compaction(s))")
+                if s['compaction_error']:
+                    print(f"Last compaction failed ({s['compaction_error']}); "
+                          f"it is retried at the next compaction.")
+                continue
+            if _load_pending(trie):
+                continue
+            path = _prompt_filepath("Please enter journal directory")
+            if not path:
+                print("Journal cancelled."); continue
+            try:
+                journal = TrieJournal(path)
+                existing = journal.has_state()
+                if existing and trie.root.count and input(
+                        f"{path} already holds a journal; its keywords replace the "
+                        f"{trie.root.count} current one(s). Continue? (y/N): ").strip().lower() != 'y':
+                    print("Journal cancelled."); continue
+                replayed = journal.attach(trie)
+                if existing:
+                    print(f"Journal restored from {path} ({replayed} batch(es) replayed on the snapshot).")
+                else:
+                    print(f"Journal started in {path}; current keywords saved as the first snapshot.")
+            except Exception as e:
+                print(f"Error attaching journal: {e}")
+
         elif op == '!':
             show_instructions()
 
@@ -1,20 +1,89 @@
 # src/ui/merge_cli.py
 from __future__ import annotations
+import glob
+from trie.prefix_trie import PrefixTrie
+from features.corpus_ingest import ingest, describe
+from trie.delta import write_delta, apply_delta
+
+_COMBINERS = {"sum": lambda a, b: a + b, "max": max, "min": min, "theirs": lambda a, b: b}
+
+
+def _load_pending(trie) -> bool:
+    """True (after saying why) while a background load would overwrite an edit."""
+    msg = trie.poll_load()
+    if msg:
+        print(msg)
+    if trie.loader is None:
+        return False
+    print("A background load is in progress; its keywords replace the trie when it finishes, "
+          "so merges and edits are disabled until then (see '~' in Construct or Predict).")
+    return True
+
+
+def _set_operations_menu(trie) -> None:
+    """Difference / intersection / union with a word,freq TXT, or filter / scale frequencies."""
+    print("  d) difference   - remove the words listed in a TXT (e.g. stopwords)")
+    print("  i) intersection - keep only the words listed in a TXT")
+    print("  u) union        - add a TXT's words, combining shared frequencies")
+    print("  f) filter       - remove words below a minimum frequency")
+    print("  s) scale        - multiply every frequency (words rounding to 0 are removed)")
+    sub = input("Choose (Enter to go back): ").strip().lower()
+    try:
+        if sub in ('d', 'i', 'u'):
+            path = input("Enter TXT path (each line: word,frequency): ").strip()
+            other = PrefixTrie()
+            other.load_from_word_freq_file(path)
+            if sub == 'd':
+                result = trie.difference(other)
+            elif sub == 'i':
+                result = trie.intersection(other)
+            else:
+                how = input("Shared words: sum / max / min / theirs (Enter for sum): ").strip().lower() or "sum"
+                if how not in _COMBINERS:
+                    print("Unknown choice."); return
+                result = trie.union(other, _COMBINERS[how])
+        elif sub == 'f':
+            result = trie.filter(int(input("Minimum frequency: ").strip()))
+        elif sub == 's':
+            factor = float(input("Factor (e.g. 0.5): ").strip())
+            result = trie.map_frequency(lambda f: int(f * factor))
+        else:
+            return
+        added, changed, removed = result
+        print(f"Done. Added: {added}, frequency changed: {changed}, removed: {removed} "
+              f"({trie.batch_stats['nodes']} nodes visited).")
+    except FileNotFoundError:
+        print("File not found.")
+    except ValueError as e:
+        print(f"Invalid input: {e}")
+    except Exception as e:
+        print(f"Error: {e}")
+
 
 def run_merge_cli(trie) -> None:
     """
     Merge Manager (TXT only)
     1) Merge from word,freq TXT (no clearing)
     2) Show trie stats
-    3) Back to main
+    3) Ingest raw text files (count words, then merge)
+    4) Write a delta file (changes since a word,freq snapshot)
+    5) Apply a delta file
+    6) Set operations (difference / intersection / union / filter / scale)
+    7) Back to main
     """
     while True:
         print("\n" + "-" * 44)
         print("Merge Manager")
         print("1. Merge from word,freq TXT (no clearing)")
         print("2. Show trie stats")
-        print("3. Back to main")
+        print("3. Ingest raw text files (count words, then merge)")
+        print("4. Write a delta file (changes since a word,freq snapshot)")
+        print("5. Apply a delta file")
+        print("6. Set operations (difference / intersection / union / filter / scale)")
+        print("7. Back to main")
         choice = input("Enter choice: ").strip()
+        if choice in ('1', '3', '5', '6') and _load_pending(trie):
+            continue
 
         if choice == '1':
             path = input("Enter TXT path (each line: word,frequency): ").strip()
@@ -28,12 +97,61 @@ def run_merge_cli(trie) -> None:
 
         elif choice == '2':
             words = trie.list_words()
-            total_freq = sum(trie.get_frequency(w) for w in words)
+            total_freq = sum(trie.get_frequencies(words))
             print(f"Distinct words: {len(words)}")
             print(f"Total frequency: {total_freq}")
             print("Preview (first 10):", ", ".join(words[:10]) if words else "(empty)")
+            cs = trie.match_cache.stats()
+            print(f"Query cache: {cs['size']}/{cs['maxsize']} entries, "
+                  f"hits={cs['hits']}, misses={cs['misses']}, evictions={cs['evictions']}")
 
         elif choice == '3':
+            raw = input("Enter text file paths or globs (space-separated): ").split()
+            paths = sorted({p for pat in raw for p in (glob.glob(pat) or [pat])})
+            if not paths:
+                print("No files given.")
+                continue
+            cap = input("Keep only the N most frequent words (bounded memory; Enter for exact counts): ").strip()
+            low = input("Minimum count to add a word (Enter for 1): ").strip()
+            try:
+                stats = ingest(trie, paths, capacity=int(cap) if cap else None,
+                               min_count=int(low) if low else 1)
+                print(describe(stats))
+                print(f"Merged. New words added: {stats['added']}, existing updated: {stats['updated']}.")
+            except FileNotFoundError as e:
+                print(f"File not found: {e.filename}")
+            except ValueError as e:
+                print(f"Invalid number: {e}")
+            except Exception as e:
+                print(f"Error: {e}")
+
+        elif choice == '4':
+            base = input("Enter the snapshot TXT the replicas hold (word,frequency): ").strip()
+            out = input("Enter delta output path: ").strip()
+            try:
+                s = write_delta(base, trie, out)
+                print(f"Delta written: {s['added']} added, {s['deleted']} deleted, "
+                      f"{s['changed']} changed ({s['bytes']} bytes, {s['seconds']:.2f} s).")
+            except FileNotFoundError:
+                print("File not found.")
+            except Exception as e:
+                print(f"Error: {e}")
+
+        elif choice == '5':
+            path = input("Enter delta path: ").strip()
+            try:
+                s = apply_delta(trie, path)
+                print(f"Applied: {s['added']} added, {s['deleted']} deleted, "
+                      f"{s['changed']} changed ({s['seconds']:.2f} s).")
+            except FileNotFoundError:
+                print("File not found.")
+            except Exception as e:
+                print(f"Error: {e}")
+
+        elif choice == '6':
+            _set_operations_menu(trie)
+
+        elif choice == '7':
             break
         else:
-            print("Invalid choice. Please select 1–3.")
+            print("Invalid choice. Please select 1–7.")
@@ -1,9 +1,14 @@
 from __future__ import annotations
 from typing import List, Tuple
-from features.pattern import glob_match, is_glob_pattern
-import re
+from features.pattern import glob_match, explain_glob
+from features.ngram import NGramModel
+from features.tokenizer import GLOB_TOKENS, apply_casing, splice
+from features.restore import restore_globs, restore_globs_in_context
+from features.regex_search import compile_regex, regex_match, REGEX_HELP
+from features.prefetch import CandidatePrefetcher
 
-_CORE_CHARS = r"A-Za-z0-9\?\*\[\]-"
+# optional n-gram model used by auto restore (option 4); kept across menu visits
+_context_model: NGramModel | None = None
 
 GLOB_HELP = r"""
 How to use Advanced Pattern Search (Glob+)
@@ -17,34 +22,8 @@ Syntax:
 Notes:
   • Case-sensitive: use the same case as your trie words.
   • Results are ranked by frequency (highest first).
+  • Prefix a pattern with "explain " to see how it would be searched.
 """
-def _split_token(tok: str) -> tuple[str, str, str]:
-    """
-    Split token into (pre, core, post), where core may include Glob+ chars.
-    Examples:
-      'th**,'   -> ('', 'th**', ',')
-      '"H*se."' -> ('"', 'H*se', '."')
-      'word'    -> ('', 'word', '')
-    """
-    # pre:     any chars NOT in core set
-    # core:    one or more chars from core set
-    # post:    any chars NOT in core set
-    m = re.match(rf"^([^{_CORE_CHARS}]*)([{_CORE_CHARS}]+)([^{_CORE_CHARS}]*)$", tok)
-    return m.groups() if m else ("", tok, "")
-
-def _apply_casing(orig: str, repl: str) -> str:
-    """
-    Preserve casing style of 'orig' in 'repl':
-      - ALL CAPS -> upper()
-      - First letter capitalized -> capitalize()
-      - else -> as-is
-    """
-    if orig.isupper():
-        return repl.upper()
-    if orig[:1].isupper() and (len(orig) == 1 or orig[1:].islower()):
-        return repl.capitalize()
-    return repl
-
 def _print_results(matches: List[Tuple[str, int]], max_rows: int | None = None) -> None:
     if not matches:
         print("No matches.")
@@ -56,56 +35,137 @@ def _print_results(matches: List[Tuple[str, int]], max_rows: int | None = None)
     if max_rows is not None and len(matches) > max_rows:
         print(f"... and {len(matches) - max_rows} more.")
 
-def _restore_tokens(tokens: List[str], trie, interactive: bool) -> List[str]:
-    restored: List[str] = []
-    for tok in tokens:
-        pre, core, post = _split_token(tok)
-        # only treat the core as a pattern, not punctuation
-        if is_glob_pattern(core):
-            # case-insensitive match by lowercasing the core pattern
-            pat = core.lower()
-            matches = glob_match(trie, pat, top_k=5)
-            if not matches:
-                restored.append(tok)
-                continue
+def _read_top_k() -> int | None:
+    top_k = None
+    topk_raw = input("Enter top_k (blank for all): ").strip()
+    if topk_raw:
+        try:
+            top_k = int(topk_raw)
+            if top_k <= 0:
+                print("top_k must be positive; showing all."); top_k = None
+        except ValueError:
+            print("Invalid top_k; showing all."); top_k = None
+    return top_k
 
-            def pick_word(idx: int) -> str:
-                chosen = matches[idx][0]  # raw word from trie (likely lowercase)
-                chosen = _apply_casing(core, chosen)
-                return f"{pre}{chosen}{post}"
+class _StopRestore(Exception):
+    """Raised at an interactive pick when the user asks to stop restoring."""
 
-            if interactive:
-                print(f"\nPattern: {core}")
-                _print_results(matches, max_rows=None)
-                choice = input("Pick # to replace, 0 to keep original, or Enter for top-1: ").strip()
-                if choice == "":
-                    restored.append(pick_word(0))
-                else:
-                    try:
-                        n = int(choice)
-                        if n == 0:
-                            restored.append(tok)
-                        elif 1 <= n <= len(matches):
-                            restored.append(pick_word(n - 1))
-                        else:
-                            print("Invalid number, keeping original.")
-                            restored.append(tok)
-                    except ValueError:
-                        print("Invalid input, keeping original.")
-                        restored.append(tok)
-            else:
-                restored.append(pick_word(0))  # auto: top-1, keep casing & punctuation
-        else:
-            restored.append(tok)
-    return restored
+def _restore_match(pre: str, core: str, post: str, matches: List[Tuple[str, int]],
+                   interactive: bool) -> str | None:
+    """
+    Replacement for one pattern token given its matches, or None to keep it
+    as it was. Raises _StopRestore when the user answers 'q' at a pick.
+    """
+    if not matches:
+        return None
+
+    def pick_word(idx: int) -> str:
+        chosen = matches[idx][0]  # raw word from trie (likely lowercase)
+        chosen = apply_casing(core, chosen)
+        return f"{pre}{chosen}{post}"
 
-def _apply_restore_file(in_path: str, out_path: str, trie, interactive: bool) -> None:
-    """Read full text line-by-line, restore tokens that look like Glob+ patterns, write output file."""
-    with open(in_path, 'r', encoding='utf-8') as fin, open(out_path, 'w', encoding='utf-8') as fout:
-        for line in fin:
-            tokens = line.rstrip("\n").split()
-            out_tokens = _restore_tokens(tokens, trie, interactive=interactive)
-            fout.write(" ".join(out_tokens) + "\n")
+    if not interactive:
+        return pick_word(0)  # auto: top-1, keep casing & punctuation
+    print(f"\nPattern: {core}")
+    _print_results(matches, max_rows=None)
+    choice = input("Pick # to replace, 0 to keep original, q to stop, or Enter for top-1: ").strip()
+    if choice == "":
+        return pick_word(0)
+    if choice.lower() == "q":
+        raise _StopRestore
+    try:
+        n = int(choice)
+    except ValueError:
+        print("Invalid input, keeping original.")
+        return None
+    if n == 0:
+        return None
+    if 1 <= n <= len(matches):
+        return pick_word(n - 1)
+    print("Invalid number, keeping original.")
+    return None
+
+def _restore_interactive(lines: List[str], trie) -> List[str]:
+    """
+    Restore a document with a pick per pattern token. The candidates are
+    matched by a CandidatePrefetcher a few tokens ahead of the prompts, so
+    expensive patterns are usually ready when their turn comes. Answering
+    'q' keeps the rest of the text as it is.
+    """
+    spans = [list(GLOB_TOKENS.scan(line)) for line in lines]
+    # case-insensitive match by lowercasing the core pattern
+    cores = [core.lower() for line_spans in spans for _, _, _, core, _ in line_spans]
+    prefetch = CandidatePrefetcher(trie, cores, top_k=5).start()
+    out: List[str] = []
+    i = 0
+    try:
+        for line, line_spans in zip(lines, spans):
+            edits = []
+            try:
+                for start, end, pre, core, post in line_spans:
+                    repl = _restore_match(pre, core, post, prefetch.get(i), interactive=True)
+                    i += 1
+                    if repl is not None:
+                        edits.append((start, end, repl))
+            except _StopRestore:
+                out.append(splice(line, edits))
+                out.extend(lines[len(out):])
+                print("Restore stopped; the rest of the text is kept as it was.")
+                break
+            out.append(splice(line, edits))
+    finally:
+        prefetch.close()
+    if prefetch.waited or prefetch.served:
+        print(f"Matches ready for {prefetch.served} of {prefetch.served + prefetch.waited} "
+              f"pattern(s); waited {prefetch.wait_seconds:.2f} s in total.")
+    return out
+
+def _apply_restore_file(in_path: str, out_path: str, trie, interactive: bool,
+                        model: NGramModel | None = None) -> None:
+    """Read the full text, restore tokens that look like Glob+ patterns, write output file."""
+    with open(in_path, 'r', encoding='utf-8') as fin:
+        lines = fin.readlines()
+    if interactive:
+        restored = _restore_interactive(lines, trie)
+    else:
+        # batch: all patterns of the document are matched together
+        restored = restore_globs_in_context(lines, trie, model) if model is not None else restore_globs(lines, trie)
+    with open(out_path, 'w', encoding='utf-8') as fout:
+        fout.writelines(restored)
+
+def _context_model_menu() -> None:
+    """Build, load, save or drop the n-gram model used by auto restore."""
+    global _context_model
+    print("Context model:", "none" if _context_model is None else
+          "uni/bi/tri = %d/%d/%d entries" % _context_model.sizes())
+    print("  b) build from clean text file(s)   l) load saved model")
+    print("  s) save current model              d) disable")
+    sub = input("Choose (Enter to go back): ").strip().lower()
+    try:
+        if sub == 'b':
+            raw = input("Clean text file path(s), comma-separated: ").strip()
+            paths = [p.strip().strip('"').strip("'") for p in raw.split(',') if p.strip()]
+            if not paths:
+                print("Cancelled."); return
+            _context_model = NGramModel.from_files(paths)
+            print("Built model: uni/bi/tri = %d/%d/%d entries" % _context_model.sizes())
+        elif sub == 'l':
+            path = input("Model file path: ").strip().strip('"').strip("'")
+            _context_model = NGramModel.load(path)
+            print("Loaded model: uni/bi/tri = %d/%d/%d entries" % _context_model.sizes())
+        elif sub == 's':
+            if _context_model is None:
+                print("No model to save."); return
+            path = input("Output model file path: ").strip().strip('"').strip("'")
+            _context_model.save(path)
+            print(f"Model saved to {path}")
+        elif sub == 'd':
+            _context_model = None
+            print("Context model disabled; auto restore uses frequency only.")
+    except FileNotFoundError:
+        print("File not found.")
+    except Exception as e:
+        print(f"Error: {e}")
 
 def run_pattern_cli(trie) -> None:
     """
@@ -113,8 +173,10 @@ def run_pattern_cli(trie) -> None:
     1) Helper (How this feature works)
     2) Find matches for a pattern
     3) Restore a text (interactive picks)
-    4) Restore a text (auto: pick top-1)
-    5) Back to main
+    4) Restore a text (auto: pick top-1, or context model if loaded)
+    5) Context model (n-gram) for auto restore
+    6) Find matches for a regular expression
+    7) Back to main
     """
     while True:
         print("\n" + "-" * 44)
@@ -122,8 +184,10 @@ def run_pattern_cli(trie) -> None:
         print("1. Helper (How this feature works)")
         print("2. Find matches for a pattern")
         print("3. Restore a text (interactive picks)")
-        print("4. Restore a text (auto: pick top-1)")
-        print("5. Back to main")
+        print("4. Restore a text (auto: pick top-1, or context model if loaded)")
+        print("5. Context model (n-gram) for auto restore")
+        print("6. Find matches for a regular expression")
+        print("7. Back to main")
         choice = input("Enter choice: ").strip()
 
         if choice == '1':
@@ -134,15 +198,13 @@ def run_pattern_cli(trie) -> None:
             pat = input("Enter Glob+ pattern: ").strip()
             if not pat:
                 print("No pattern entered."); continue
-            top_k = None
-            topk_raw = input("Enter top_k (blank for all): ").strip()
-            if topk_raw:
+            if pat.lower().startswith("explain "):
                 try:
-                    top_k = int(topk_raw)
-                    if top_k <= 0:
-                        print("top_k must be positive; showing all."); top_k = None
-                except ValueError:
-                    print("Invalid top_k; showing all."); top_k = None
+                    print(explain_glob(trie, pat[8:].strip().lower()))
+                except ValueError as e:
+                    print(f"Pattern error: {e}")
+                continue
+            top_k = _read_top_k()
             try:
                 matches = glob_match(trie, pat.lower(), top_k=top_k)  # <-- case-insensitive
                 _print_results(matches, max_rows=None)
@@ -168,14 +230,29 @@ def run_pattern_cli(trie) -> None:
             if not in_f or not out_f:
                 print("Cancelled."); continue
             try:
-                _apply_restore_file(in_f, out_f, trie, interactive=False)
-                print(f"Auto restore (top-1) complete → {out_f}")
+                _apply_restore_file(in_f, out_f, trie, interactive=False, model=_context_model)
+                mode = "top-1" if _context_model is None else "context model"
+                print(f"Auto restore ({mode}) complete → {out_f}")
             except FileNotFoundError:
                 print("File not found.")
             except Exception as e:
                 print(f"Error: {e}")
 
         elif choice == '5':
+            _context_model_menu()
+
+        elif choice == '6':
+            print(REGEX_HELP)
+            pat = input("Enter regex: ").strip()
+            if not pat:
+                print("No pattern entered."); continue
+            try:
+                compile_regex(pat)
+            except ValueError as e:
+                print(f"Pattern error: {e}"); continue
+            _print_results(regex_match(trie, pat, top_k=_read_top_k()), max_rows=None)
+
+        elif choice == '7':
             break
         else:
-            print("Invalid choice. Please select 1–5.")
+            print("Invalid choice. Please select 1–7.")
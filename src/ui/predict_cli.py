@@ -1,17 +1,24 @@
+from itertools import islice
+
 from trie.prefix_trie import PrefixTrie
-import re
+from features.tokenizer import WILDCARD_CORE_CHARS, split_token
+from features.restore import render_all, render_best, restore_wildcards
+
+CHUNK_LINES = 10_000    # lines read, matched together and written per batch by '&' / '@'
 
 
 def show_predict_menu():
     print(r"""
 ----------------------------------------------------------------
 Predict/Restore Text Commands:
-  '~', '#', '$', '?', '&', '@', '!', '\'
+  '~', '#', '$', '?', '^', '&', '@', '!', '\'
 ----------------------------------------------------------------
-~                     (read keywords from file to make Trie)
+~                     (read keywords from file to make Trie, in the background;
+                       again: show progress)
 #                     (display Trie)
 $ra*nb*w              (list all possible matching keywords)
 ?ra*nb*w              (restore a word using best keyword match)
+^                     (autocomplete: type letters, '<' deletes one, '.' ends)
 &                     (restore a text using all matching keywords)
 @                     (restore a text using best keyword matches)
 !                     (print instructions)
@@ -46,41 +53,60 @@ def _prompt_filepath(prompt: str, must_exist: bool = False) -> str | None:
 
 def _extract(tok: str):
     """Strip leading/trailing punctuation (but keep '*') → return (pre, core, post)."""
-    m = re.match(r"^([^\w\*]*)([\w\*]+)([^\w\*]*)$", tok)
-    return m.groups() if m else ("", tok, "")
-
-
-def _process_all(tok: str, trie: PrefixTrie) -> str:
-    pre, core, post = _extract(tok)
-    core_l = core.lower()
-    if "*" in core_l:
-        matches = trie.wildcard_match(core_l)
-        matches.sort(key=lambda w: trie.get_frequency(w), reverse=True)
-        return f"{pre}{matches}{post}"
-    return tok
-
-
-def _process_best(tok: str, trie: PrefixTrie) -> str:
-    pre, core, post = _extract(tok)
-    core_l = core.lower()
-    if "*" in core_l:
-        best = trie.best_match(core_l)
-        if best:
-            if core.isupper():
-                best = best.upper()
-            elif core[0].isupper():
-                best = best.capitalize()
-            return f"{pre}<{best}>{post}"
-    return tok
-
-
-def _apply_restore(in_path: str, out_path: str, trie: PrefixTrie, processor):
-    """Read each token from in_path, process with `processor`, write to out_path."""
+    return split_token(tok, WILDCARD_CORE_CHARS)
+
+
+def _rank_by_frequency(trie: PrefixTrie, words: list[str]) -> list[tuple[str, int]]:
+    """Pair words with their frequencies (one batch lookup) and sort highest first."""
+    pairs = list(zip(words, trie.get_frequencies(words)))
+    pairs.sort(key=lambda p: p[1], reverse=True)
+    return pairs
+
+
+def _apply_restore(in_path: str, out_path: str, trie: PrefixTrie, render):
+    """
+    Restore every wildcard token of in_path with `render`, write to out_path
+    (spacing kept). The file is streamed CHUNK_LINES lines at a time; the
+    patterns of a chunk are matched together.
+    """
     with open(in_path, 'r', encoding='utf-8') as fin, \
          open(out_path, 'w', encoding='utf-8') as fout:
-        for line in fin:
-            parts = [processor(tok, trie) for tok in line.rstrip("\n").split()]
-            fout.write(" ".join(parts) + "\n")
+        while True:
+            lines = list(islice(fin, CHUNK_LINES))
+            if not lines:
+                break
+            fout.writelines(restore_wildcards(lines, trie, render))
+
+
+def _autocomplete(trie: PrefixTrie, start: str = "") -> None:
+    """
+    Keystroke-style completion: each entry's characters are pushed onto one
+    cursor ('<' pops one), and the top suggestions for the prefix are shown.
+    """
+    cur = trie.cursor(k=5)
+    for ch in start.lower():
+        cur.push(ch)
+    while True:
+        matches = cur.completions()
+        shown = ", ".join(f"{w}({f})" for w, f in matches) if matches else "(no completions)"
+        print(f"[{cur.prefix}] {shown}")
+        keys = input("^ ").strip()
+        if keys == ".":
+            break
+        for ch in keys.lower():
+            if ch == "<":
+                cur.pop()
+            else:
+                cur.push(ch)
+
+
+def _show_load(trie: PrefixTrie) -> None:
+    """Print the progress of the running background load and offer to cancel it."""
+    print(trie.loader.describe())
+    if input("Cancel this load? (y/N): ").strip().lower() == 'y':
+        trie.loader.cancel()
+        trie.poll_load()
+        print("Load cancelled; the trie keeps its current keywords.")
 
 
 def run_predict_cli(trie: PrefixTrie):
@@ -90,18 +116,27 @@ def run_predict_cli(trie: PrefixTrie):
         if not cmd:
             continue
 
+        msg = trie.poll_load()
+        if msg:
+            print(msg)
+
         op = cmd[0]
         arg = cmd[1:].strip()  # pattern for $ / ?, otherwise usually empty
 
         # ~ : load keywords (word,frequency) from file
         if op == '~':
+            if trie.loader is not None:
+                _show_load(trie)
+                continue
             path = _prompt_filepath("Please enter input file", must_exist=True)
             if not path:
                 print("Load cancelled.")
             else:
+                priority = input("Prefixes to load first (space-separated, Enter for none): ").split()
                 try:
-                    trie.load_from_word_freq_file(path)
-                    print(f"Keywords loaded from {path} into trie.")
+                    trie.load_in_background(path, priority)
+                    print(f"Loading {path} in the background; the current keywords stay "
+                          f"available until it finishes. Enter '~' for progress.")
                 except Exception as e:
                     print(f"Error loading keywords: {e}")
 
@@ -115,9 +150,8 @@ def run_predict_cli(trie: PrefixTrie):
                 print("Usage: $<pattern-with-*>   e.g. $ca*")
                 continue
             patt = arg.lower()
-            matches = trie.wildcard_match(patt)
-            matches.sort(key=lambda w: trie.get_frequency(w), reverse=True)
-            print(",".join(f"[{w},{trie.get_frequency(w)}]" for w in matches) if matches else "")
+            matches = _rank_by_frequency(trie, trie.wildcard_match(patt))
+            print(",".join(f"[{w},{f}]" for w, f in matches) if matches else "")
 
         # ?<pattern> : best match for a single word
         elif op == '?':
@@ -138,6 +172,10 @@ def run_predict_cli(trie: PrefixTrie):
                 else:
                     print("No match found.")
 
+        # ^ : incremental autocomplete
+        elif op == '^':
+            _autocomplete(trie, arg)
+
         # & : restore a whole text (all matches)
         elif op == '&':
             in_f = _prompt_filepath("Please enter input file", must_exist=True)
@@ -149,7 +187,7 @@ def run_predict_cli(trie: PrefixTrie):
                 print("Restore cancelled.")
                 continue
             try:
-                _apply_restore(in_f, out_f, trie, _process_all)
+                _apply_restore(in_f, out_f, trie, render_all)
                 print(f"All matches restored and saved to {out_f}")
             except Exception as e:
                 print(f"Error during restore: {e}")
@@ -165,7 +203,7 @@ def run_predict_cli(trie: PrefixTrie):
                 print("Restore cancelled.")
                 continue
             try:
-                _apply_restore(in_f, out_f, trie, _process_best)
+                _apply_restore(in_f, out_f, trie, render_best)
                 print(f"Best matches restored and saved to {out_f}")
             except Exception as e:
                 print(f"Error during restore: {e}")
@@ -0,0 +1,101 @@
+# src/ui/registry_cli.py
+from __future__ import annotations
+from trie.prefix_trie import PrefixTrie
+from trie.registry import TrieRegistry
+
+
+def _fmt_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:,.0f} {unit}" if unit == "B" else f"{n:,.1f} {unit}"
+        n /= 1024
+
+
+def _print_status(registry: TrieRegistry) -> None:
+    rows = registry.status()
+    if not rows:
+        print("(no tries registered)")
+        return
+    for row in rows:
+        mark = "*" if row["active"] else " "
+        state = "loaded" if row["loaded"] else ("on disk" if row["snapshot"] else "not loaded")
+        print(f" {mark} {row['name']:<20} {state:<11} {_fmt_bytes(row['bytes']):>12}")
+    print(f"Total in memory: {_fmt_bytes(registry.total_bytes())} "
+          f"/ budget {_fmt_bytes(registry.memory_budget)}")
+
+
+def run_registry_cli(registry: TrieRegistry) -> PrefixTrie:
+    """
+    Trie Registry
+    1) List tries
+    2) Register a word,freq file as a named trie
+    3) Create an empty named trie
+    4) Switch active trie
+    5) Set memory budget (MB)
+    6) Back to main
+    Returns the (possibly new) active trie.
+    """
+    while True:
+        print("\n" + "-" * 44)
+        print(f"Trie Registry (active: {registry.active_name})")
+        print("1. List tries")
+        print("2. Register a word,freq file as a named trie")
+        print("3. Create an empty named trie")
+        print("4. Switch active trie")
+        print("5. Set memory budget (MB)")
+        print("6. Back to main")
+        choice = input("Enter choice: ").strip()
+
+        if choice == '1':
+            _print_status(registry)
+
+        elif choice == '2':
+            name = input("Name: ").strip()
+            path = input("Enter TXT path (each line: word,frequency): ").strip().strip('"').strip("'")
+            if not name or not path:
+                print("Cancelled."); continue
+            try:
+                registry.register(name, path)
+                print(f"Registered '{name}' (loaded on first use).")
+            except FileNotFoundError:
+                print("File not found.")
+            except ValueError as e:
+                print(f"Error: {e}")
+
+        elif choice == '3':
+            name = input("Name: ").strip()
+            if not name:
+                print("Cancelled."); continue
+            try:
+                registry.add(name, PrefixTrie())
+                print(f"Created empty trie '{name}'.")
+            except ValueError as e:
+                print(f"Error: {e}")
+
+        elif choice == '4':
+            _print_status(registry)
+            name = input("Switch to: ").strip()
+            if name not in registry.names():
+                print("No trie with that name."); continue
+            try:
+                registry.activate(name)
+                print(f"Active trie is now '{name}'.")
+            except Exception as e:
+                print(f"Error loading '{name}': {e}")
+
+        elif choice == '5':
+            raw = input("Memory budget in MB: ").strip()
+            try:
+                mb = float(raw)
+                if mb <= 0:
+                    raise ValueError
+            except ValueError:
+                print("Budget must be a positive number."); continue
+            registry.memory_budget = int(mb * 1024 * 1024)
+            registry.enforce_budget()
+            print(f"Budget set to {_fmt_bytes(registry.memory_budget)}.")
+
+        elif choice == '6':
+            return registry.active()
+        else:
+            print("Invalid choice. Please select 1–6.")
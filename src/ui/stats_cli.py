@@ -1,8 +1,41 @@
 # ui/stats_top5_cli.py
-# Print-once Top-5 dashboard (dataset-centric).
+# Print-once Top-5 dashboard (dataset-centric), then prefix queries.
 
 from features.trie_stats import compute_stats, pretty_print
 
+PAGE_SIZE = 10
+
+def _prefix_queries(trie):
+    """Answer prefix / rank questions from the per-node aggregates until Enter."""
+    print("Query: a prefix (counts + first words), '#N' (N-th word), '=word' (its rank).")
+    while True:
+        q = input("Query (Enter to go back): ").strip()
+        if not q:
+            break
+        if q.startswith("#"):
+            try:
+                n = int(q[1:])
+            except ValueError:
+                print("Usage: #N with N a number, e.g. #1")
+                continue
+            if n < 1:
+                print("Usage: #N with N >= 1 (#1 is the first word)")
+                continue
+            try:
+                print(f"#{n}: {trie.select(n - 1)}")
+            except IndexError:
+                print(f"Out of range: the trie holds {trie.count_prefix(''):,} words.")
+        elif q.startswith("="):
+            word = q[1:]
+            where = "at" if trie.search(word) else "would be at"
+            print(f"{word!r} {where} #{trie.rank(word) + 1:,} of {trie.count_prefix(''):,}")
+        else:
+            print(f"{q!r}: {trie.count_prefix(q):,} word(s), total frequency {trie.frequency_mass(q):,}")
+            hi = q[:-1] + chr(ord(q[-1]) + 1)
+            for w, f in trie.range(q, hi, PAGE_SIZE):
+                print(f"  {w} ({f:,})")
+
 def show_stats_menu(trie):
     stats = compute_stats(trie, top_k=5)
-    pretty_print(stats)
\ No newline at end of file
+    pretty_print(stats)
+    _prefix_queries(trie)